@@ -0,0 +1,731 @@
+# bench/bench_bot.py
+"""
+Benchmark offline de los handlers de bot.py, sin conexión a Discord.
+Monta guilds, miembros, roles y canales falsos sobre una capa REST simulada (latencia con jitter
+y buckets por ruta que responden como Discord: esperar o devolver 429) y lanza los handlers
+reales (on_message, on_raw_reaction_add, on_audit_log_entry_create, apply_plan, !warn).
+
+Escenarios:
+  flood    avalancha de mensajes con algunos spammers (auto-mute incluido)
+  tickets  tormenta de reacciones en los paneles de tickets
+  nuke     borrado masivo de canales por un atacante (ban + contención)
+  rebuild  reconstrucción completa de la estructura y re-ejecución sin cambios
+  warn     latencia de !warn (SQLite + embed + log)
+  raid     oleada de bots que entran a la vez y escriben (bans en paralelo)
+  close    !close con transcript de un ticket corto y uno largo (memoria pico)
+  clear    !clear en segundo plano con mensajes recientes y de más de 14 días, y cancelación
+  priority avalancha de !hug y logs mientras salta el Anti-Nuke, con y sin el scheduler REST
+
+Uso: python bench/bench_bot.py [--json] [--scenario flood,nuke] [--latency 0.05] [--route-rate 10]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("BOT_TOKEN", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench-bot-"))  # bot.py crea sus ficheros de datos en el cwd
+
+import discord  # noqa: E402
+
+import bot  # noqa: E402
+
+_ids = itertools.count(10 ** 17)
+
+
+# ---------------- REST simulado ----------------
+class _Response:
+    status = 429
+    reason = "Too Many Requests"
+
+
+class FakeREST:
+    # cada ruta (por guild) admite `rate` llamadas por segundo; al pasarse, o se espera como hace
+    # el bucket interno de discord.py ("sleep") o se lanza un 429 como los que se le escapan ("raise").
+    # Además hay un límite global de `global_rate` llamadas/s para todo el bot (0 = sin límite), y cada
+    # llamada pasa antes por bot.rest_scheduler igual que el http.request envuelto en setup_hook.
+    def __init__(self, latency: float, jitter: float, rate: int, mode: str, rng: random.Random,
+                 global_rate: int = 0, scheduled: bool = True):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.mode = mode
+        self.rng = rng
+        self.global_rate = global_rate
+        self.scheduler = bot.rest_scheduler if scheduled else None
+        self.buckets = {}
+        self.global_bucket = []
+        self.calls = {}
+        self.ratelimited = 0
+
+    async def call(self, route: str, guild_id: int = 0):
+        if self.scheduler is None:
+            return await self._call(route, guild_id)
+        return await self.scheduler.run(lambda: self._call(route, guild_id), guild_id=guild_id)
+
+    async def _call(self, route: str, guild_id: int):
+        loop = asyncio.get_running_loop()
+        bucket = self.buckets.setdefault((route, guild_id), [])
+        while True:
+            now = loop.time()
+            bucket[:] = [t for t in bucket if now - t < 1.0]
+            self.global_bucket[:] = [t for t in self.global_bucket if now - t < 1.0]
+            if self.global_rate and len(self.global_bucket) >= self.global_rate:
+                # límite global: discord.py siempre espera
+                self.ratelimited += 1
+                await asyncio.sleep(1.0 - (now - self.global_bucket[0]))
+                continue
+            if len(bucket) < self.rate:
+                break
+            retry_after = 1.0 - (now - bucket[0])
+            self.ratelimited += 1
+            if self.mode == "raise":
+                e = discord.HTTPException(_Response(), {"message": "You are being rate limited.", "code": 0})
+                e.retry_after = retry_after
+                raise e
+            await asyncio.sleep(retry_after)
+        bucket.append(now)
+        self.global_bucket.append(now)
+        self.calls[route] = self.calls.get(route, 0) + 1
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def snapshot(self):
+        return {"calls": sum(self.calls.values()), "by_route": dict(sorted(self.calls.items())),
+                "ratelimited": self.ratelimited}
+
+    def reset(self):
+        self.buckets.clear()
+        self.global_bucket.clear()
+        self.calls.clear()
+        self.ratelimited = 0
+
+
+# ---------------- Objetos de Discord falsos ----------------
+# Los canales y roles heredan de las clases de discord.py para que los isinstance() de bot.py
+# (channel_kind, ticket_registry.category, get_log_channel...) se comporten igual que en producción.
+class FakeMessage:
+    def __init__(self, rest, channel, author=None, content=""):
+        self.rest = rest
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.created_at = discord.utils.utcnow()
+        self.edited_at = None
+        self.attachments = []
+        self.embeds = []
+        self._state = None
+
+    async def add_reaction(self, emoji):
+        await self.rest.call("reaction_add", self.guild.id)
+
+    async def remove_reaction(self, emoji, member):
+        await self.rest.call("reaction_remove", self.guild.id)
+
+    async def edit(self, content=None, **kwargs):
+        await self.rest.call("message_edit", self.guild.id)
+        self.content = content
+
+    async def delete(self, delay=None):
+        if delay is None:
+            await self.rest.call("message_delete", self.guild.id)
+            self.channel.messages.remove(self)
+
+
+class FakeChannelMixin:
+    def _setup(self, guild, name: str, category=None, position: int = 0):
+        self.rest = guild.rest
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.position = position or 0
+        self.category_id = category.id if category else None
+        self.messages = []
+        guild._channels[self.id] = self
+
+    async def delete(self, reason=None):
+        await self.rest.call("channel_delete", self.guild.id)
+        self.guild._channels.pop(self.id, None)
+        await bot.bot.on_guild_channel_delete(self)
+
+    async def edit(self, category=None, position=None, reason=None, **kwargs):
+        await self.rest.call("channel_edit", self.guild.id)
+        if category is not None:
+            self.category_id = category.id
+        if position is not None:
+            self.position = position
+
+    async def set_permissions(self, target, reason=None, **kwargs):
+        await self.rest.call("overwrite", self.guild.id)
+
+
+class FakeCategory(FakeChannelMixin, discord.CategoryChannel):
+    def __init__(self, guild, name, category=None, position=0):
+        self._setup(guild, name, None, position)
+
+
+class FakeTextChannel(FakeChannelMixin, discord.TextChannel):
+    def __init__(self, guild, name, category=None, position=0):
+        self._setup(guild, name, category, position)
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await self.rest.call("message_send", self.guild.id)
+        msg = FakeMessage(self.rest, self, self.guild.me, content or "")
+        self.messages.append(msg)
+        return msg
+
+    def get_partial_message(self, message_id):
+        return next((m for m in self.messages if m.id == message_id), None) or FakeMessage(self.rest, self)
+
+    async def delete_messages(self, messages, reason=None):
+        await self.rest.call("bulk_delete", self.guild.id)
+        gone = {m.id for m in messages}
+        self.messages = [m for m in self.messages if m.id not in gone]
+
+    def history(self, limit=100, oldest_first=False, before=None, **kwargs):
+        # como discord.py: se pide por lotes de 100 (una llamada REST por lote)
+        async def pages():
+            ordered = [m for m in self.messages if before is None or m.id < before.id]
+            ordered = ordered if oldest_first else ordered[::-1]
+            ordered = ordered if limit is None else ordered[:limit]
+            for start in range(0, len(ordered), 100):
+                await self.rest.call("message_history", self.guild.id)
+                for m in ordered[start:start + 100]:
+                    yield m
+        return pages()
+
+
+class FakeVoiceChannel(FakeChannelMixin, discord.VoiceChannel):
+    def __init__(self, guild, name, category=None, position=0):
+        self._setup(guild, name, category, position)
+
+
+class FakeRole(discord.Role):
+    def __init__(self, guild, name: str, position: int, permissions: int = 0, managed: bool = False):
+        self.rest = guild.rest
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self._permissions = permissions
+        self.managed = managed
+
+    async def edit(self, permissions=None, reason=None, **kwargs):
+        await self.rest.call("role_edit", self.guild.id)
+        if permissions is not None:
+            self._permissions = permissions.value
+
+
+class FakeMember:
+    def __init__(self, guild, name: str, is_bot: bool = False, permissions: int = 0):
+        self.rest = guild.rest
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.bot = is_bot
+        self.mention = f"<@{self.id}>"
+        self.guild_permissions = discord.Permissions(permissions)
+        self.roles = []
+        self.top_role = None
+        guild._members[self.id] = self
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        await self.rest.call("member_role", self.guild.id)
+        self.roles.extend(roles)
+
+    async def send(self, *args, **kwargs):
+        await self.rest.call("dm")
+
+
+class FakeGuild:
+    def __init__(self, rest: FakeREST, name: str):
+        self.rest = rest
+        self.id = next(_ids)
+        self.name = name
+        self._channels = {}
+        self._members = {}
+        self._roles = {}
+        self.bans = set()
+        self.default_role = self._add_role(FakeRole(self, "@everyone", 0))
+        self.me = FakeMember(self, "femb-bot", is_bot=True, permissions=discord.Permissions.all().value)
+        self.me.top_role = self._add_role(FakeRole(self, "femb-bot", 1000, discord.Permissions.all().value, managed=True))
+        self.owner_id = None
+
+    def _add_role(self, role: FakeRole) -> FakeRole:
+        self._roles[role.id] = role
+        return role
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    @property
+    def text_channels(self):
+        return [c for c in self._channels.values() if isinstance(c, discord.TextChannel)]
+
+    @property
+    def categories(self):
+        return [c for c in self._channels.values() if isinstance(c, discord.CategoryChannel)]
+
+    @property
+    def roles(self):
+        return sorted(self._roles.values(), key=lambda r: r.position)
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    async def fetch_member(self, user_id):
+        await self.rest.call("member_fetch", self.id)
+        return self._members[user_id]
+
+    async def create_category(self, name, position=None, reason=None, **kwargs):
+        await self.rest.call("channel_create", self.id)
+        return FakeCategory(self, name, position=position)
+
+    async def create_text_channel(self, name, category=None, position=None, reason=None, **kwargs):
+        await self.rest.call("channel_create", self.id)
+        return FakeTextChannel(self, name, category, position)
+
+    async def create_voice_channel(self, name, category=None, position=None, reason=None, **kwargs):
+        await self.rest.call("channel_create", self.id)
+        return FakeVoiceChannel(self, name, category, position)
+
+    async def create_role(self, name, reason=None, **kwargs):
+        await self.rest.call("role_create", self.id)
+        return self._add_role(FakeRole(self, name, len(self._roles)))
+
+    async def ban(self, user, reason=None, **kwargs):
+        await self.rest.call("ban", self.id)
+        self.bans.add(user.id)
+
+
+class FakePayload:
+    def __init__(self, guild, member, message, emoji):
+        self.guild_id = guild.id
+        self.user_id = member.id
+        self.member = member
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.emoji = emoji
+
+
+class FakeAuditEntry:
+    def __init__(self, guild, user, action=discord.AuditLogAction.channel_delete):
+        self.guild = guild
+        self.user = user
+        self.user_id = user.id
+        self.action = action
+
+
+class FakeContext:
+    def __init__(self, guild, author, channel, message=None):
+        self.guild = guild
+        self.author = author
+        self.channel = channel
+        self.message = message
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class World:
+    def __init__(self, rest: FakeREST):
+        self.rest = rest
+        self.guilds = {}
+        bot.bot.get_guild = self.guilds.get
+        bot.bot._connection.user = FakeMember(FakeGuild(rest, "bot-home"), "femb-bot", is_bot=True)
+
+    def guild(self, name: str, text_channels: int = 0) -> FakeGuild:
+        guild = FakeGuild(self.rest, name)
+        self.guilds[guild.id] = guild
+        FakeTextChannel(guild, bot.LOG_CHANNEL_NAME)
+        for i in range(text_channels):
+            FakeTextChannel(guild, f"general-{i}")
+        guild._add_role(FakeRole(guild, bot.STAFF_ROLE_NAME, 10))
+        return guild
+
+
+# ---------------- Utilidades ----------------
+def percentiles(samples, *qs):
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{int(q * 100)}_ms": 0.0 for q in qs}
+    return {f"p{int(q * 100)}_ms": round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3) for q in qs}
+
+
+async def timed_call(coro, latencies, errors):
+    # un handler que revienta (p.ej. un 429 sin reintento) se cuenta, no aborta el escenario
+    started = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+    latencies.append(time.perf_counter() - started)
+
+
+async def drain():
+    # espera a las tareas en segundo plano de bot.py (overwrites de Muted, tickets, progreso...)
+    while bot.background_tasks:
+        await asyncio.gather(*list(bot.background_tasks), return_exceptions=True)
+
+
+# ---------------- Escenarios ----------------
+async def scenario_flood(world: World, args, rng: random.Random):
+    guild = world.guild("flood", text_channels=20)
+    channels = guild.text_channels[1:]
+    users = [FakeMember(guild, f"user{i}") for i in range(args.users)]
+    spammers = users[:args.spammers]
+    events = []
+    for user in users:
+        per_user = bot.SPAM_LIMIT * 3 if user in spammers else rng.randint(1, bot.SPAM_LIMIT - 1)
+        events.extend(FakeMessage(world.rest, rng.choice(channels), user, f"hola {i}") for i in range(per_user))
+    rng.shuffle(events)
+
+    # CPU por mensaje en el camino normal (sin spam ni comandos), secuencial
+    quiet = [FakeMessage(world.rest, channels[0], u, "hola") for u in users[args.spammers:]] * 5
+    started = time.perf_counter()
+    for msg in quiet:
+        await bot.bot.on_message(msg)
+    cpu_per_message = (time.perf_counter() - started) / len(quiet)
+
+    # avalancha: una tarea por evento, como el dispatch del gateway
+    bot.spam_tracker.buckets.clear()
+    world.rest.reset()
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(timed_call(bot.bot.on_message(m), latencies, errors) for m in events))
+    handled = time.perf_counter() - started
+    await drain()
+    return {"messages": len(events), "spammers": len(spammers), "wall_s": round(time.perf_counter() - started, 3),
+            "handlers_s": round(handled, 3), "msgs_per_s": round(len(events) / handled),
+            "cpu_us_per_message": round(cpu_per_message * 1e6, 1),
+            "mutes": sum(1 for u in spammers for r in u.roles if r.name == bot.MUTED_ROLE_NAME),
+            **percentiles(latencies, 0.5, 0.95, 0.99), "errors": errors, "rest": world.rest.snapshot()}
+
+
+async def scenario_tickets(world: World, args, rng: random.Random):
+    guild = world.guild("tickets")
+    panel_ch = FakeTextChannel(guild, "tickets")
+    keys = list(bot.TICKET_TEMPLATES)[:3]
+    panels = []
+    for key in keys:
+        msg = FakeMessage(world.rest, panel_ch, guild.me)
+        bot.ticket_message_map[str(msg.id)] = key
+        panels.append((msg, bot.TICKET_TEMPLATES[key]["reaction"]))
+    users = [FakeMember(guild, f"user{i}") for i in range(args.users)]
+    payloads = [FakePayload(guild, u, msg, emoji) for u in users for msg, emoji in panels
+                for _ in range(args.reactions)]
+    rng.shuffle(payloads)
+
+    outcomes = {"new": 0, "deduped": 0, "rejected": 0}
+    original = bot.request_ticket
+
+    def counting_request(*a, **kw):
+        try:
+            task, created = original(*a, **kw)
+        except bot.TicketLimitError:
+            outcomes["rejected"] += 1
+            raise
+        outcomes["new" if created else "deduped"] += 1
+        return task, created
+
+    bot.request_ticket = counting_request
+    world.rest.reset()
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(timed_call(bot.bot.on_raw_reaction_add(p), latencies, errors) for p in payloads))
+        await drain()
+    finally:
+        bot.request_ticket = original
+    return {"reactions": len(payloads), "users": len(users), "wall_s": round(time.perf_counter() - started, 3),
+            "tickets_created": len(bot.ticket_registry.open_channel_ids(guild.id)), **outcomes,
+            **percentiles(latencies, 0.5, 0.95, 0.99), "errors": errors, "rest": world.rest.snapshot()}
+
+
+async def scenario_nuke(world: World, args, rng: random.Random):
+    guild = world.guild("nuke", text_channels=args.nuke_deletes)
+    dangerous = discord.Permissions(administrator=True, manage_channels=True).value
+    for i in range(args.roles):
+        guild._add_role(FakeRole(guild, f"rol-{i}", 20 + i, dangerous if i % 3 == 0 else 0))
+    attacker = FakeMember(guild, "atacante", permissions=dangerous)
+    world.rest.reset()
+    started = time.perf_counter()
+    # el atacante borra canales; el gateway entrega una entrada de audit log por borrado
+    await asyncio.gather(*(bot.bot.on_audit_log_entry_create(FakeAuditEntry(guild, attacker))
+                           for _ in range(args.nuke_deletes)))
+    contained = time.perf_counter() - started
+    state = bot.nuke_locks.data.get(str(guild.id), {})
+    result = {"roles": args.roles, "audit_entries": args.nuke_deletes, "banned": attacker.id in guild.bans,
+              "roles_locked": len(state.get("saved", {})), "ban_s": state.get("timings", {}).get("ban"),
+              "contained_s": round(contained, 3), "rest": world.rest.snapshot()}
+    world.rest.reset()
+    started = time.perf_counter()
+    result["restored"] = await bot.release_nuke_lock(guild)
+    result["unlock_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+async def scenario_rebuild(world: World, args, rng: random.Random):
+    guild = world.guild("rebuild", text_channels=args.junk)
+    owner = FakeMember(guild, "owner")
+    runs = []
+    for label in ("full", "noop"):
+        world.rest.reset()
+        runner = bot.RestRunner(bot.REBUILD_ROUTE_LIMITS)
+        started = time.perf_counter()
+        stats = await bot.apply_plan(guild, owner, keep_channel_ids=[], runner=runner)
+        await drain()
+        runs.append({"run": label, "wall_s": round(time.perf_counter() - started, 3), **stats,
+                     "rest": world.rest.snapshot()})
+    return {"plan_objects": sum(len(c["children"]) + 1 for c in bot.REBUILD_PLAN), "junk_channels": args.junk,
+            "runs": runs}
+
+
+async def scenario_warn(world: World, args, rng: random.Random):
+    guild = world.guild("warn")
+    channel = guild.text_channels[0]
+    moderator = FakeMember(guild, "moderador", permissions=discord.Permissions(kick_members=True).value)
+    targets = [FakeMember(guild, f"user{i}") for i in range(20)]
+    ctx = FakeContext(guild, moderator, channel)
+    world.rest.reset()
+    latencies, errors = [], {}
+    for i in range(args.warns):
+        await timed_call(bot.warn_cmd.callback(ctx, rng.choice(targets), reason=f"bench {i}"), latencies, errors)
+    return {"warns": args.warns, **percentiles(latencies, 0.5, 0.95, 0.99), "errors": errors,
+            "rest": world.rest.snapshot()}
+
+
+async def scenario_raid(world: World, args, rng: random.Random):
+    guild = world.guild("raid", text_channels=3)
+    channel = guild.text_channels[1]
+    bots = [FakeMember(guild, f"raidbot{i}", is_bot=True) for i in range(args.raid_bots)]
+    # bots legítimos que invita el SuperUser durante la oleada: no deben banearse
+    invited = [FakeMember(guild, f"musicbot{i}", is_bot=True) for i in range(2)]
+    world.rest.reset()
+    started = time.perf_counter()
+    # cada bot entra y manda un mensaje enseguida, como en un raid real
+    for i, member in enumerate(bots):
+        await bot.bot.on_member_join(member)
+        await bot.bot.on_message(FakeMessage(world.rest, channel, member, "spam"))
+        if i < len(invited):
+            # la entrada bot_add del audit log llega después del join y del primer mensaje
+            await bot.bot.on_member_join(invited[i])
+            await bot.bot.on_message(FakeMessage(world.rest, channel, invited[i], "hola"))
+            await bot.bot.on_audit_log_entry_create(types.SimpleNamespace(
+                action=discord.AuditLogAction.bot_add, guild=guild, target=invited[i], user_id=bot.SUPERUSER_ID))
+    dispatched = time.perf_counter() - started
+    await drain()
+    return {"bots": len(bots), "banned": sum(1 for m in bots if m.id in guild.bans),
+            "invited_banned": sum(1 for m in invited if m.id in guild.bans),
+            "dispatch_s": round(dispatched, 4), "wall_s": round(time.perf_counter() - started, 3),
+            "rest": world.rest.snapshot()}
+
+
+async def scenario_close(world: World, args, rng: random.Random):
+    guild = world.guild("close")
+    owner = FakeMember(guild, "cliente")
+    staff = FakeMember(guild, "staff", permissions=discord.Permissions(manage_messages=True).value)
+    staff.roles = [bot.cached_role(guild, bot.STAFF_ROLE_NAME)]
+    runs = []
+    for size in (10, args.transcript_messages):
+        channel = FakeTextChannel(guild, f"ticket-cliente-{size}")
+        bot.ticket_registry.open(channel, owner.id, "ticket-ayuda-general")
+        text = "mensaje de prueba con algo de contenido " * 3
+        channel.messages = [FakeMessage(world.rest, channel, rng.choice((owner, staff)), f"{text}{i}") for i in range(size)]
+        world.rest.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        await bot.close_ticket.callback(FakeContext(guild, staff, channel))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        channel.messages = []
+        info = bot.transcripts_index.data.get(str(channel.id), {})
+        runs.append({"messages": size, "wall_s": round(elapsed, 3), "peak_kib": round(peak / 1024),
+                     "transcript_bytes": info.get("bytes"), "deleted": channel.id not in guild._channels,
+                     "rest": world.rest.snapshot()})
+    return {"runs": runs}
+
+
+async def scenario_clear(world: World, args, rng: random.Random):
+    guild = world.guild("clear")
+    channel = FakeTextChannel(guild, "general")
+    moderator = FakeMember(guild, "moderador", permissions=discord.Permissions(manage_messages=True).value)
+    users = [FakeMember(guild, f"user{i}") for i in range(5)]
+    old = discord.utils.utcnow() - bot.timedelta(days=30)
+    runs = []
+    for label, amount, cancel_after in (("full", args.clear_amount, None), ("cancel", args.clear_amount, 0.2)):
+        channel.messages = []
+        for i in range(args.clear_amount):
+            msg = FakeMessage(world.rest, channel, rng.choice(users), f"mensaje {i}")
+            if i < args.clear_old:
+                msg.created_at = old  # los más antiguos, fuera de la ventana de bulk delete
+            channel.messages.append(msg)
+        command = FakeMessage(world.rest, channel, moderator, f"!clear {amount}")
+        channel.messages.append(command)
+        world.rest.reset()
+        ctx = FakeContext(guild, moderator, channel, command)
+        started = time.perf_counter()
+        await bot.clear_cmd.callback(ctx, str(amount))
+        returned = time.perf_counter() - started
+        job = bot.clear_jobs.get(channel.id)
+        if cancel_after is not None and job:
+            await asyncio.sleep(cancel_after)
+            await bot.clear_cmd.callback(ctx, "cancel")
+        if job:
+            await job.task
+        finished = time.perf_counter() - started
+        await drain()
+        runs.append({"run": label, "requested": amount, "deleted": job.deleted if job else 0,
+                     "scanned": job.scanned if job else 0, "command_returned_ms": round(returned * 1000, 2),
+                     "job_s": round(finished, 3), "rest": world.rest.snapshot()})
+    return {"old_messages": args.clear_old, "runs": runs}
+
+
+async def scenario_priority(world: World, args, rng: random.Random):
+    # avalancha de !hug y de logs repartida en varias guilds (agota el límite global) y, a la vez, un
+    # nuke en una de ellas: con el scheduler el ban y el bloqueo de roles no esperan detrás de los GIFs
+    dangerous = discord.Permissions(administrator=True, manage_channels=True).value
+    hug = bot.bot.get_command("hug").callback
+    runs = []
+    for label, scheduled in (("scheduler", True), ("sin_scheduler", False)):
+        guilds = [world.guild(f"priority-{label}-{g}", text_channels=2) for g in range(args.fun_guilds)]
+        guild = guilds[0]
+        for i in range(args.roles):
+            guild._add_role(FakeRole(guild, f"rol-{i}", 20 + i, dangerous if i % 3 == 0 else 0))
+        attacker = FakeMember(guild, "atacante", permissions=dangerous)
+        users = {g.id: [FakeMember(g, f"user{i}") for i in range(20)] for g in guilds}
+
+        async def fun():
+            # lo mismo que hace FembBot.invoke antes de llamar al comando
+            target = rng.choice(guilds)
+            with bot.rest_priority_scope(bot.COMMAND_PRIORITY["hug"]):
+                await hug(FakeContext(target, rng.choice(users[target.id]), target.text_channels[1]),
+                          rng.choice(users[target.id]))
+
+        world.rest.reset()
+        world.rest.scheduler = bot.rest_scheduler if scheduled else None
+        latencies, errors = [], {}
+        started = time.perf_counter()
+        flood = [asyncio.ensure_future(timed_call(fun(), latencies, errors)) for _ in range(args.fun_flood)]
+        for i in range(args.fun_flood // 4):
+            bot.log_action(rng.choice(guilds), "Bench", f"log {i}")
+        await asyncio.sleep(0.2)
+        nuke_started = time.perf_counter()
+        await asyncio.gather(*(bot.bot.on_audit_log_entry_create(FakeAuditEntry(guild, attacker))
+                               for _ in range(args.nuke_deletes)))
+        contained = time.perf_counter() - nuke_started
+        state = bot.nuke_locks.data.get(str(guild.id), {})
+        await asyncio.gather(*flood)
+        fun_wall = time.perf_counter() - started
+        await bot.release_nuke_lock(guild)
+        await drain()
+        runs.append({"run": label, "banned": attacker.id in guild.bans, "roles_locked": len(state.get("saved", {})),
+                     "ban_s": state.get("timings", {}).get("ban"), "contained_s": round(contained, 3),
+                     "fun_wall_s": round(fun_wall, 3), "fun_shed": errors.pop("RestShed", 0),
+                     **percentiles(latencies, 0.5, 0.95), "errors": errors, "rest": world.rest.snapshot()})
+    world.rest.scheduler = None if args.no_scheduler else bot.rest_scheduler
+    return {"fun_commands": args.fun_flood, "fun_guilds": args.fun_guilds, "logs": args.fun_flood // 4, "runs": runs}
+
+
+SCENARIOS = {
+    "flood": scenario_flood,
+    "tickets": scenario_tickets,
+    "nuke": scenario_nuke,
+    "rebuild": scenario_rebuild,
+    "warn": scenario_warn,
+    "raid": scenario_raid,
+    "close": scenario_close,
+    "clear": scenario_clear,
+    "priority": scenario_priority,
+}
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    world = World(FakeREST(args.latency, args.jitter, args.route_rate, args.ratelimit, rng,
+                           global_rate=args.global_rate, scheduled=not args.no_scheduler))
+    results = {}
+    for name in args.scenario:
+        results[name] = await SCENARIOS[name](world, args, rng)
+    await bot.flush_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    parser.add_argument("--scenario", default=",".join(SCENARIOS),
+                        type=lambda s: [x for x in s.split(",") if x in SCENARIOS])
+    parser.add_argument("--latency", type=float, default=0.05, help="latencia REST media (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--route-rate", type=int, default=10, help="llamadas por segundo por ruta y guild")
+    parser.add_argument("--ratelimit", choices=("sleep", "raise"), default="sleep",
+                        help="al pasarse del bucket: esperar (discord.py) o devolver 429")
+    parser.add_argument("--global-rate", type=int, default=50, help="límite global de llamadas/s (0 = sin límite)")
+    parser.add_argument("--no-scheduler", action="store_true", help="llamar a la capa REST sin pasar por el scheduler")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--spammers", type=int, default=5)
+    parser.add_argument("--reactions", type=int, default=3, help="reacciones por usuario y panel")
+    parser.add_argument("--roles", type=int, default=60)
+    parser.add_argument("--nuke-deletes", type=int, default=10)
+    parser.add_argument("--junk", type=int, default=30, help="canales sobrantes antes de reconstruir")
+    parser.add_argument("--warns", type=int, default=50)
+    parser.add_argument("--raid-bots", type=int, default=30)
+    parser.add_argument("--transcript-messages", type=int, default=10000)
+    parser.add_argument("--clear-amount", type=int, default=450)
+    parser.add_argument("--clear-old", type=int, default=5, help="mensajes de más de 14 días al fondo del canal")
+    parser.add_argument("--fun-flood", type=int, default=300, help="!hug simultáneos en el escenario priority")
+    parser.add_argument("--fun-guilds", type=int, default=10, help="guilds entre las que se reparten")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar los logs del bot")
+    args = parser.parse_args()
+    if not args.verbose:
+        bot.logger.setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k not in ("json", "verbose")}
+    report = {"benchmark": "bot", "config": config, "elapsed_s": round(time.perf_counter() - started, 3),
+              "scenarios": results}
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    for name, result in results.items():
+        print(f"== {name}")
+        for key, value in result.items():
+            print(f"  {key:22} {value}")
+    print(f"\nTotal: {report['elapsed_s']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# bench/bench_cache.py
+"""
+Memoria y CPU de la caché de discord.py según el perfil de caché de bot.py (CACHE_PROFILE,
+MEMBER_CHUNKING, MEMBER_CACHE, MAX_MESSAGES). Cada perfil corre en un proceso aparte que importa
+bot.py con ese entorno y procesa, con el ConnectionState real del bot, lo mismo que llega al
+arrancar: GUILD_CREATE de servidores grandes, los chunks de miembros si el perfil los pide y un
+flujo de mensajes.
+
+Uso: python bench/bench_cache.py [--json] [--guilds 3] [--members 20000] [--messages 5000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "full": {"CACHE_PROFILE": "full"},
+    "lazy": {"CACHE_PROFILE": "lean", "MEMBER_CHUNKING": "lazy"},
+    "lean": {"CACHE_PROFILE": "lean"},
+}
+CHUNK_SIZE = 1000  # miembros por GUILD_MEMBERS_CHUNK, como Discord
+
+
+# ---------------- Payloads sintéticos ----------------
+def user_payload(uid: int) -> dict:
+    return {"id": str(uid), "username": f"user{uid}", "discriminator": "0", "global_name": f"Usuario {uid}",
+            "avatar": None, "bot": False}
+
+
+def member_payload(uid: int) -> dict:
+    return {"user": user_payload(uid), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "nick": None,
+            "deaf": False, "mute": False, "flags": 0}
+
+
+def guild_payload(gid: int, members: int) -> dict:
+    channels = [{"id": str(gid + 1 + i), "type": 0, "name": f"general-{i}", "position": i,
+                 "permission_overwrites": []} for i in range(5)]
+    # en servidores grandes GUILD_CREATE sólo trae unos pocos miembros; el resto llega por chunks
+    return {"id": str(gid), "name": f"guild-{gid}", "member_count": members, "large": True,
+            "channels": channels, "roles": [{"id": str(gid), "name": "@everyone", "permissions": "0",
+                                             "position": 0, "color": 0, "hoist": False, "managed": False,
+                                             "mentionable": False}],
+            "members": [member_payload(gid + 100)], "voice_states": [], "emojis": [], "stickers": [],
+            "features": [], "threads": [], "stage_instances": [], "guild_scheduled_events": []}
+
+
+def message_payload(mid: int, channel_id: int, guild_id: int, author: int) -> dict:
+    return {"id": str(mid), "channel_id": str(channel_id), "guild_id": str(guild_id), "author": user_payload(author),
+            "member": {k: v for k, v in member_payload(author).items() if k != "user"},
+            "content": f"mensaje {mid} con algo de texto normal", "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False, "type": 0}
+
+
+# ---------------- Proceso hijo: un perfil ----------------
+def child(args):
+    os.environ.setdefault("BOT_TOKEN", "bench")
+    os.chdir(tempfile.mkdtemp(prefix="bench-cache-"))
+    sys.path.insert(0, ROOT)
+    import discord
+    import bot
+
+    state = bot.bot._connection
+    rss_before = bot.rss_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    guilds = []
+    for g in range(args.guilds):
+        gid = (g + 1) * 10 ** 12
+        guild = discord.Guild(data=guild_payload(gid, args.members), state=state)
+        state._add_guild(guild)
+        guilds.append(guild)
+        if state._chunk_guilds:
+            # lo que hace ChunkRequest.add_members con cada GUILD_MEMBERS_CHUNK
+            for first in range(0, args.members, CHUNK_SIZE):
+                chunk = [member_payload(gid + 1000 + uid) for uid in range(first, min(first + CHUNK_SIZE, args.members))]
+                for data in chunk:
+                    guild._add_member(discord.Member(data=data, guild=guild, state=state))
+    startup = time.perf_counter() - started
+    for i in range(args.messages):
+        guild = guilds[i % len(guilds)]
+        channel = guild.text_channels[i % len(guild.text_channels)]
+        # lo que hace parse_message_create con cada MESSAGE_CREATE
+        message = discord.Message(state=state, channel=channel,
+                                  data=message_payload(10 ** 15 + i, channel.id, guild.id, guild.id + 1000 + i % args.members))
+        if state._messages is not None:
+            state._messages.append(message)
+    elapsed = time.perf_counter() - started
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"chunking": bot.MEMBER_CHUNKING, "member_cache": int(state.member_cache_flags.value),
+            "max_messages": bot.MAX_MESSAGES, "cached_members": sum(len(g.members) for g in guilds),
+            "cached_messages": len(state._messages or ()), "startup_s": round(startup, 3),
+            "total_s": round(elapsed, 3), "traced_mib": round(traced / 2 ** 20, 1),
+            "rss_delta_mib": round((bot.rss_bytes() - rss_before) / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--members", type=int, default=20000, help="miembros por guild")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)  # uso interno: proceso hijo
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(child(args)))
+        return
+
+    results = {}
+    for name, env in PROFILES.items():
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--profile", name, "--guilds", str(args.guilds),
+                              "--members", str(args.members), "--messages", str(args.messages)],
+                             env={**os.environ, **env}, capture_output=True, text=True, check=True)
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    if args.json:
+        print(json.dumps({"benchmark": "cache", "guilds": args.guilds, "members": args.members,
+                          "messages": args.messages, "profiles": results}, indent=2))
+        return
+    print(f"{args.guilds} guilds x {args.members} miembros, {args.messages} mensajes\n")
+    cols = ("cached_members", "cached_messages", "startup_s", "total_s", "traced_mib", "rss_delta_mib")
+    print(f"{'perfil':8}" + "".join(f"{c:>17}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:8}" + "".join(f"{r[c]:>17}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
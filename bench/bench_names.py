@@ -0,0 +1,141 @@
+# bench/bench_names.py
+"""
+Micro-benchmark del pipeline de nombres (stylize / decorate_name / normalize_name_for_matching).
+Compara las versiones anteriores (bucle carácter a carácter, regex sin compilar, NFKD sin caché)
+con las de bot.py sobre un corpus de nombres de canal realista, y comprueba que la salida es idéntica.
+
+Uso: python bench/bench_names.py [--json] [--rounds N]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("BOT_TOKEN", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench-names-"))  # bot.py crea sus ficheros de datos en el cwd
+
+import bot  # noqa: E402
+
+
+# ---------------- Implementaciones anteriores (referencia) ----------------
+def legacy_stylize(text: str) -> str:
+    result = []
+    for ch in text:
+        if ch.isalpha():
+            lower = ch.lower()
+            if lower in bot.NORMAL:
+                result.append(bot.TRANSL[ord(lower)])
+            else:
+                result.append(ch)
+        else:
+            result.append(ch)
+    return "".join(result)
+
+def legacy_decorate_name(name: str, fallback_emoji: str = bot.DEFAULT_PREFIX_EMOJI) -> str:
+    if name.startswith("「") and "」" in name:
+        return name
+    m = re.match(r"^(?P<emoji>[\U0001F000-\U0001FFFF\u2600-\u26FF\u2700-\u27BF])(?:[・\-\s]?)(?P<rest>.+)$", name)
+    if m:
+        emoji = m.group("emoji")
+        rest = m.group("rest").strip()
+    else:
+        parts = re.split(r"[・\-\s]", name, maxsplit=1)
+        if len(parts) == 2 and len(parts[0]) <= 2:
+            emoji = parts[0]
+            rest = parts[1]
+        else:
+            emoji = fallback_emoji
+            rest = name
+    return f"「{emoji}」{legacy_stylize(rest)}"
+
+def legacy_normalize(name: str) -> str:
+    if not name:
+        return ""
+    name = name.replace("「", "").replace("」", "").strip().lower()
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.replace("—", "-").replace("–", "-")
+    return name
+
+
+# ---------------- Corpus ----------------
+def build_corpus(seed: int = 1234, users: int = 300):
+    rng = random.Random(seed)
+    raw = []
+    for block in bot.STRUCTURE:
+        raw.append(block["category_name"])
+        raw.extend(block["text_channels"])
+        raw.extend(block.get("voice_channels", []))
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.ñáéíóú"
+    for i in range(users):
+        name = "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 16)))
+        raw.append(f"ticket-{name}-{i}".lower())
+    decorated = [legacy_decorate_name(n) for n in raw]
+    # tráfico realista: los mismos nombres se repiten muchas veces (!ticket, !close, reconstrucciones)
+    hot = [rng.choice(raw) for _ in range(5000)]
+    hot_decorated = [rng.choice(decorated) for _ in range(5000)]
+    return raw, decorated, hot, hot_decorated
+
+
+def timed(func, items, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    raw, decorated, hot, hot_decorated = build_corpus()
+    for n in raw:
+        assert bot.stylize(n) == legacy_stylize(n), n
+        assert bot.decorate_name(n) == legacy_decorate_name(n), n
+    for n in decorated:
+        assert bot.normalize_name_for_matching(n) == legacy_normalize(n), n
+
+    def cold(func):
+        def run(item):
+            func.cache_clear()
+            return func(item)
+        return run
+
+    cases = [
+        ("stylize", legacy_stylize, bot.stylize, hot),
+        ("decorate_name (sin caché)", legacy_decorate_name, cold(bot.decorate_name), hot),
+        ("decorate_name", legacy_decorate_name, bot.decorate_name, hot),
+        ("normalize_name_for_matching", legacy_normalize, bot.normalize_name_for_matching, hot_decorated),
+        ("is_ticket_channel_name", lambda n: "ticket" in legacy_normalize(n), bot.is_ticket_channel_name, hot_decorated),
+    ]
+    results = []
+    for name, old, new, items in cases:
+        old_rate = timed(old, items, args.rounds)
+        new_rate = timed(new, items, args.rounds)
+        results.append({"case": name, "legacy_ops_s": round(old_rate), "ops_s": round(new_rate),
+                        "speedup": round(new_rate / old_rate, 2)})
+
+    if args.json:
+        print(json.dumps({"benchmark": "names", "corpus": len(raw), "results": results}, indent=2))
+        return
+    print(f"Corpus: {len(raw)} nombres únicos, {len(hot)} llamadas por ronda\n")
+    print(f"{'caso':32} {'antes ops/s':>14} {'ahora ops/s':>14} {'x':>7}")
+    for r in results:
+        print(f"{r['case']:32} {r['legacy_ops_s']:>14,} {r['ops_s']:>14,} {r['speedup']:>7}")
+
+
+if __name__ == "__main__":
+    main()
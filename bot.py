@@ -1,1182 +1,3095 @@
-# main.py
-"""
-Femb-Paradise bot - reconstrucción de servidor + sistema de tickets con embeds y reacciones.
-Requisitos: discord.py v2.x, python-dotenv
-Crea un .env con BOT_TOKEN=tu_token y opcionalmente LOG_CHANNEL_ID (int) o STAFF_ROLE_NAME.
-"""
-
-import os
-import asyncio
-import logging
-import json
-import re
-import time
-import unicodedata
-import random
-from collections import deque
-from typing import Optional, Dict, List
-
-import discord
-from discord.ext import commands
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-
-
-# ---------------- Config & env ----------------
-load_dotenv()
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-# Opcional: puedes poner el ID numérico del canal de logs en .env (ej: 1443306834906845387)
-LOG_CHANNEL_ID = int(os.getenv("LOG_CHANNEL_ID")) if os.getenv("LOG_CHANNEL_ID") else None
-LOG_CHANNEL_NAME = os.getenv("LOG_CHANNEL_NAME", "logs-bot")
-STAFF_ROLE_NAME = os.getenv("STAFF_ROLE_NAME", "Staff")
-DEFAULT_PREFIX_EMOJI = "🎇"
-TICKET_MESSAGES_FILE = "ticket_messages.json"
-WARNS_FILE = "warns.json"
-
-# SUPERUSER (zapatoortopedicoizquierdo) - cambia si necesitas otro
-SUPERUSER_ID = 1382693027600007200
-
-if not BOT_TOKEN:
-    raise SystemExit("BOT_TOKEN missing - configura tu .env")
-
-# ---------------- Koyeb health check ----------------
-from threading import Thread
-from http.server import HTTPServer, BaseHTTPRequestHandler
-
-PORT = int(os.getenv("PORT", 8000))
-
-class HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"OK")
-
-def start_web():
-    server = HTTPServer(("0.0.0.0", PORT), HealthHandler)
-    server.serve_forever()
-
-Thread(target=start_web, daemon=True).start()
-
-# ---------------- Logging ----------------
-logging.basicConfig(level=logging.INFO,
-                    format="%(asctime)s | %(levelname)s | %(message)s",
-                    handlers=[logging.FileHandler("femb_paradise_bot.log", encoding="utf-8"),
-                              logging.StreamHandler()])
-logger = logging.getLogger("FembParadise")
-
-# ---------------- Intents & Bot ----------------
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-intents.members = True
-intents.reactions = True
-intents.messages = True
-intents.voice_states = True
-
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
-
-# ---------------- Utilities (stylize / names) ----------------
-NORMAL = "abcdefghijklmnopqrstuvwxyz"
-STYLIZED = "𝙖𝙗𝙘𝙙𝙚𝙛𝙜𝙝𝙞𝙟𝙠𝙡𝙢𝙣𝙤𝙥𝙦𝙧𝙨𝙩𝙪𝙫𝙬𝙭𝙮𝙯"
-TRANSL = {ord(n): s for n, s in zip(NORMAL, STYLIZED)}
-
-def stylize(text: str) -> str:
-    result = []
-    for ch in text:
-        if ch.isalpha():
-            lower = ch.lower()
-            if lower in NORMAL:
-                result.append(TRANSL[ord(lower)])
-            else:
-                result.append(ch)
-        else:
-            result.append(ch)
-    return "".join(result)
-
-def decorate_name(name: str, fallback_emoji: str = DEFAULT_PREFIX_EMOJI) -> str:
-    if name.startswith("「") and "」" in name:
-        return name
-    # intentar extraer emoji al inicio
-    m = re.match(r"^(?P<emoji>[\U0001F000-\U0001FFFF\u2600-\u26FF\u2700-\u27BF])(?:[・\-\s]?)(?P<rest>.+)$", name)
-    if m:
-        emoji = m.group("emoji")
-        rest = m.group("rest").strip()
-    else:
-        parts = re.split(r"[・\-\s]", name, maxsplit=1)
-        if len(parts) == 2 and len(parts[0]) <= 2:
-            emoji = parts[0]
-            rest = parts[1]
-        else:
-            emoji = fallback_emoji
-            rest = name
-    styled = stylize(rest)
-    return f"「{emoji}」{styled}"
-
-def strip_decor(name: str) -> str:
-    if name.startswith("「") and "」" in name:
-        return name.split("」", 1)[1]
-    return name
-
-def normalize_name_for_matching(name: str) -> str:
-    if not name:
-        return ""
-    name = name.replace("「", "").replace("」", "").strip().lower()
-    name = unicodedata.normalize("NFKD", name)
-    name = "".join(ch for ch in name if not unicodedata.combining(ch))
-    name = name.replace("—", "-").replace("–", "-")
-    return name
-
-def is_ticket_channel_name(name: str) -> bool:
-    norm = normalize_name_for_matching(name)
-    return "ticket" in norm
-
-# ---------------- Structure & tickets ----------------
-STRUCTURE = [
-    {
-        "category_name": "🏠・INFORMACIÓN",
-        "text_channels": [
-            "👋・bienvenida", "📜・reglas", "📢・anuncios", "🛠️・actualizaciones", "🎭・roles-info", "❓・faq"
-        ],
-        "voice_channels": []
-    },
-    {
-        "category_name": "💬・COMUNIDAD",
-        "text_channels": [
-            "💬・chat-general", "🤣・memes", "🙋・presentaciones", "📸・clips-y-fotos", "🎨・arte-de-la-comunidad", "❔・preguntas"
-        ],
-        "voice_channels": ["🔊・General", "🗣️・Charla-casual", "🎵・Música-(con-bot)", "🎮・Juegos"]
-    },
-    {
-        "category_name": "🎮・JUEGO",
-        "text_channels": [
-            "📰・game-news", "📘・tutoriales", "⚔️・builds-y-estrategias", "🐞・reportes-bugs", "💡・sugerencias", "🤝・matchmaking", "🤖・comandos-bot"
-        ],
-        "voice_channels": []
-    },
-    {
-        "category_name": "🛠️・STAFF",
-        "text_channels": [
-            "🛠️・staff-chat", "🚨・reportes-internos", "🔨・ban-logs", "⚠️・warn-logs", "🧠・ideas-staff", "📌・pendientes", "🎫・soporte-tickets"
-        ],
-        "voice_channels": []
-    },
-    {
-        "category_name": "🎟️・TICKETS",
-        "text_channels": [
-            "🎟️・ticket-ayuda-general", "🚫・ticket-reportar-jugador", "🎮・ticket-problemas-con-el-juego",
-            "🖥️・ticket-problemas-técnicos", "⚖️・ticket-apelar-sanción", "💰・ticket-donaciones"
-        ],
-        "voice_channels": []
-    },
-    {
-        "category_name": "🎉・EVENTOS",
-        "text_channels": ["🎉・eventos-activos", "🏆・ganadores", "🎁・giveaways"],
-        "voice_channels": []
-    },
-    {
-        "category_name": "🤖・BOTS",
-        "text_channels": ["📡・comandos", "📈・niveles", "🗂️・logs-bot"],
-        "voice_channels": []
-    },
-    {
-        "category_name": "🧾・ARCHIVOS-Y-RECURSOS",
-        "text_channels": ["⬇️・descargas", "📄・documentación", "📜・historial-del-proyecto",
-                          "📚・lore-cakeverso", "🚧・progreso-del-juego", "👀・sneak-peeks", "🗳️・votaciones"],
-        "voice_channels": []
-    }
-]
-
-TICKET_TEMPLATES: Dict[str, Dict] = {
-    "ticket-ayuda-general": {
-        "title": "🆘 Ayuda General",
-        "description": "Antes de abrir un ticket asegúrate de que tu duda no esté respondida en los canales informativos.\nProporciona información clara para que podamos ayudarte rápidamente.",
-        "fields": [("📄 Información necesaria", "• Explica tu duda o problema de forma detallada.\n• Adjunta capturas, ejemplos o contexto relevante.\n• Indica si probaste alguna solución previamente.")],
-        "footer": "⚠️ Nota: El uso indebido del sistema de tickets puede causar advertencias o sanciones.",
-        "reaction": "🎟️"
-    },
-    "ticket-reportar-jugador": {
-        "title": "🚫 Reportar a un Usuario",
-        "description": "Antes de reportar, asegúrate de que realmente se haya incumplido una norma del servidor o de Discord.\nNo incluyas pruebas falsificadas o podrás recibir una sanción.",
-        "fields": [
-            ("📄 Información necesaria", "• Tag / ID / usuario a reportar.\n• Canal donde ocurrió el incidente.\n• Razón del reporte.\n• Pruebas (capturas, vídeos, grabaciones de voz)."),
-            ("🆔 Obtener ID", "Activa el modo desarrollador en Ajustes > Avanzado > Modo Desarrollador.\nLuego clic derecho en el usuario → Copiar ID.")
-        ],
-        "footer": None,
-        "reaction": "🚫"
-    },
-    "ticket-problemas-con-el-juego": {
-        "title": "🎮 Problemas con el Juego",
-        "description": "Si tienes inconvenientes dentro del juego, aporta toda la información posible para acelerar la asistencia.",
-        "fields": [("📄 Información necesaria", "• Describe el problema con detalle (error, bug, crasheos).\n• Nombre del juego.\n• Plataforma (PC, móvil, consola).\n• Capturas, grabaciones o mensajes de error.\n• Pasos realizados antes del fallo.")],
-        "footer": "ℹ️ Nota: Si el problema es general y ya está siendo investigado, te informaremos en el ticket.",
-        "reaction": "🎮"
-    },
-    "ticket-problemas-técnicos": {
-        "title": "🖥️ Problemas Técnicos",
-        "description": "Usa este ticket para problemas con Discord o con el juego.",
-        "fields": [("📄 Información necesaria", "• Explica tu problema detalladamente.\n• Adjunta capturas o vídeos del problema.\n• Acciones que ya intentaste.")],
-        "footer": None,
-        "reaction": "🖥️"
-    },
-    "ticket-apelar-sanción": {
-        "title": "⚖️ Apelar Sanción",
-        "description": "Proporciona información real y completa. Manipular datos resultará en apelación rechazada.",
-        "fields": [("📄 Información necesaria", "• Tu Tag / ID de usuario.\n• Tipo de sanción (mute, ban, warn…).\n• Fecha aproximada.\n• Motivo por el cual crees que la sanción fue injusta.\n• Pruebas o contexto adicional.")],
-        "footer": "⚠️ Importante: No abras múltiples apelaciones por el mismo caso.",
-        "reaction": "⚖️"
-    },
-    "ticket-donaciones": {
-        "title": "💰 Donaciones",
-        "description": "Usa este ticket para resolver dudas o aportar a las donaciones del proyecto.",
-        "fields": [("📄 Información necesaria", "• Método de donación que usarás o usaste.\n• Cantidad donada o a donar.\n• Captura del comprobante (si aplica).\n• Dudas sobre beneficios o roles.")],
-        "footer": "💎 Nota: Las donaciones son voluntarias y no reembolsables.",
-        "reaction": "💰"
-    }
-}
-
-# ---------------- Persistence helpers ----------------
-def load_ticket_messages() -> Dict[str, str]:
-    if os.path.exists(TICKET_MESSAGES_FILE):
-        try:
-            with open(TICKET_MESSAGES_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            logger.exception("No se pudo leer ticket_messages.json")
-    return {}
-
-def save_ticket_messages(mapping: Dict[str, str]):
-    try:
-        with open(TICKET_MESSAGES_FILE, "w", encoding="utf-8") as f:
-            json.dump(mapping, f, indent=2)
-    except Exception:
-        logger.exception("No se pudo guardar ticket_messages.json")
-
-ticket_message_map: Dict[str, str] = load_ticket_messages()
-
-def load_warns() -> Dict[str, List[Dict]]:
-    if not os.path.exists(WARNS_FILE):
-        with open(WARNS_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-    try:
-        with open(WARNS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        logger.exception("No se pudo leer warns.json")
-        return {}
-
-def save_warns(data: Dict[str, List[Dict]]):
-    try:
-        with open(WARNS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        logger.exception("No se pudo guardar warns.json")
-
-# ---------------- Logging helper ----------------
-async def get_log_channel(guild: discord.Guild) -> Optional[discord.TextChannel]:
-    # Prioriza ID si fue configurado
-    if LOG_CHANNEL_ID:
-        ch = guild.get_channel(LOG_CHANNEL_ID)
-        if isinstance(ch, discord.TextChannel):
-            return ch
-    # Buscar por nombre
-    ch = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME)
-    return ch
-
-async def log_action(guild: discord.Guild, title: str, description: str, color: int = 0x00ffcc):
-    try:
-        target = await get_log_channel(guild)
-        embed = discord.Embed(title=title, description=description, color=color)
-        embed.set_footer(text=f"Servidor: {guild.name} • ID: {guild.id}")
-        embed.timestamp = discord.utils.utcnow()
-        if target:
-            await target.send(embed=embed)
-        else:
-            logger.info(f"[LOG NO CHANNEL] {guild.name}: {title} - {description}")
-    except Exception:
-        logger.exception("Error al enviar log")
-
-# ---------------- Purge & create ----------------
-async def purge_server(guild: discord.Guild, invoking_user: discord.Member, keep_channel_ids: Optional[List[int]] = None):
-    if keep_channel_ids is None:
-        keep_channel_ids = []
-    for ch in list(guild.channels):
-        try:
-            if ch.id in keep_channel_ids:
-                continue
-            await ch.delete(reason=f"Rebuilding server by {invoking_user} via !Femb-Paradise")
-        except Exception:
-            logger.exception("No se pudo eliminar %s", getattr(ch, "name", str(ch)))
-    await asyncio.sleep(1)
-
-async def create_structure(guild: discord.Guild):
-    global ticket_message_map
-    for block in STRUCTURE:
-        cat_name = block["category_name"]
-        try:
-            category = await guild.create_category(cat_name, reason="Creación estructura Femb-Paradise")
-        except Exception:
-            # si falla con emoji, usa texto simple
-            safe_cat = re.sub(r"[^\w\s-]", "", cat_name)[:90]
-            category = await guild.create_category(safe_cat, reason="Creación estructura Femb-Paradise (fallback)")
-        # crear text channels
-        for t in block["text_channels"]:
-            decorated = decorate_name(t)
-            try:
-                ch = await guild.create_text_channel(decorated, category=category, reason="Creación estructura Femb-Paradise")
-            except Exception:
-                alt = decorated.replace(" ", "-")[:100]
-                ch = await guild.create_text_channel(alt, category=category, reason="Creación estructura Femb-Paradise (fallback)")
-            # extraer key original (después del separator ・)
-            raw = t
-            if "・" in raw:
-                key = raw.split("・", 1)[1].strip().lower()
-            else:
-                key = re.sub(r"^[^\w]+", "", raw).strip().lower()
-            key = key.replace(" ", "-").replace("_", "-")
-            if key in TICKET_TEMPLATES:
-                template = TICKET_TEMPLATES[key]
-                embed = discord.Embed(title=template["title"], description=template["description"], color=0x99ccff)
-                for fname, fval in template["fields"]:
-                    embed.add_field(name=fname, value=fval, inline=False)
-                if template["footer"]:
-                    embed.set_footer(text=template["footer"])
-                embed.add_field(name="\u200b", value="🔽 **PARA ABRIR UN TICKET REACCIONA**", inline=False)
-                try:
-                    msg = await ch.send(embed=embed)
-                    await msg.add_reaction(template["reaction"])
-                    ticket_message_map[str(msg.id)] = key
-                    save_ticket_messages(ticket_message_map)
-                except Exception:
-                    logger.exception("No se pudo enviar embed en %s", ch.name)
-        # crear voice channels
-        for v in block.get("voice_channels", []):
-            decorated_v = decorate_name(v)
-            try:
-                await guild.create_voice_channel(decorated_v, category=category, reason="Creación estructura Femb-Paradise")
-            except Exception:
-                alt = decorated_v.replace(" ", "-")[:100]
-                await guild.create_voice_channel(alt, category=category, reason="Creación estructura Femb-Paradise (fallback)")
-    return ticket_message_map
-
-# ---------------- Ticket creation ----------------
-async def create_ticket_channel(guild: discord.Guild, owner: discord.Member, template_key: str):
-    tickets_cat = discord.utils.find(lambda c: (isinstance(c, discord.CategoryChannel) and (c.name.upper().startswith("🎟️") or "TICKETS" in c.name.upper())), guild.categories)
-    if not tickets_cat:
-        tickets_cat = await guild.create_category("🎟️・TICKETS", reason="Crear categoría de tickets dinámica")
-    base_name = f"ticket-{owner.name}".lower()
-    base_styl = stylize(base_name)
-    existing_stripped = [strip_decor(c.name).lower() for c in tickets_cat.channels]
-    counter = 1
-    proposed = base_styl
-    while proposed in existing_stripped:
-        counter += 1
-        proposed = stylize(f"{base_name}-{counter}")
-    template = TICKET_TEMPLATES.get(template_key)
-    emoji = template["reaction"] if template else DEFAULT_PREFIX_EMOJI
-    final_name = decorate_name(proposed, emoji)
-    overwrites = {
-        guild.default_role: discord.PermissionOverwrite(view_channel=False),
-        owner: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_messages=True)
-    }
-    staff_role = discord.utils.get(guild.roles, name=STAFF_ROLE_NAME)
-    if staff_role:
-        overwrites[staff_role] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_messages=True, manage_messages=True)
-    channel = await guild.create_text_channel(final_name, category=tickets_cat, overwrites=overwrites, reason=f"Ticket creado por {owner} tipo {template_key}")
-    embed = discord.Embed(title=f"Ticket — {template['title'] if template else 'Ticket'}",
-                          description=(f"Hola {owner.mention}! Este canal ha sido creado para atender tu solicitud.\n\n"
-                                       "Staff: para cerrar el ticket usad `!close`.\n"
-                                       "Owner: describe aquí tu problema con la mayor cantidad de detalle posible."),
-                          color=0x88ffcc)
-    await channel.send(content=owner.mention, embed=embed)
-    await log_action(guild, "Ticket creado", f"{channel.name} creado por {owner} ({owner.id}) tipo {template_key}")
-    return channel
-
-# ---------------- Commands ----------------
-@bot.command(name="Femb-Paradise")
-@commands.guild_only()
-async def femb_paradise(ctx: commands.Context):
-    invoker = ctx.author
-    guild = ctx.guild
-    # permiso: admin o superuser
-    if not (ctx.author.guild_permissions.administrator or ctx.author.id == SUPERUSER_ID):
-        await ctx.reply("❌ Necesitas permisos de **Administrador** para ejecutar este comando.", mention_author=False)
-        return
-    # confirmación si no es superuser
-    if ctx.author.id != SUPERUSER_ID:
-        confirm_message = await ctx.send(embed=discord.Embed(
-            title="Confirmación requerida",
-            description=(f"Has solicitado reconstruir completamente el servidor **{guild.name}**.\n"
-                         "Esto **ELIMINARÁ TODOS LOS CANALES** actuales y creará una nueva estructura.\n\n"
-                         "Si estás seguro, reacciona con ✅ en los próximos 10 segundos."),
-            color=0xff66aa
-        ))
-        await confirm_message.add_reaction("✅")
-        def check(reaction, user):
-            return user == invoker and str(reaction.emoji) == "✅" and reaction.message.id == confirm_message.id
-        try:
-            await bot.wait_for("reaction_add", timeout=10.0, check=check)
-        except asyncio.TimeoutError:
-            await ctx.send("⏱️ Tiempo de confirmación agotado. Operación cancelada.", delete_after=8)
-            return
-    # asegurar logs antes de purge
-    log_ch = await get_log_channel(guild)
-    if not log_ch:
-        try:
-            log_ch = await guild.create_text_channel(LOG_CHANNEL_NAME, topic="Canal de logs del bot", reason="Crear canal de logs antes de reconstrucción")
-        except Exception:
-            log_ch = None
-    # progreso (DM preferente)
-    progress_msg = None
-    try:
-        dm = await invoker.create_dm()
-        progress_msg = await dm.send("🔧 Iniciando reconstrucción del servidor... Esto puede tardar unos segundos.")
-    except Exception:
-        if log_ch:
-            try:
-                progress_msg = await log_ch.send("🔧 Iniciando reconstrucción del servidor... Esto puede tardar unos segundos.")
-            except Exception:
-                progress_msg = None
-    try:
-        keep_ids = [log_ch.id] if log_ch else []
-        await purge_server(guild, invoker, keep_channel_ids=keep_ids)
-        created_map = await create_structure(guild)
-        await log_action(guild, "Servidor reconstruido", f"Reconstrucción ejecutada por {invoker} ({invoker.id})")
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="✅ Reconstrucción completa. Estructura creada correctamente.")
-            except Exception:
-                if log_ch:
-                    await log_ch.send("✅ Reconstrucción completa. Estructura creada correctamente.")
-    except Exception as e:
-        logger.exception("Error durante la reconstrucción")
-        if progress_msg:
-            try:
-                await progress_msg.edit(content=f"❌ Ocurrió un error durante la reconstrucción: `{e}`")
-            except Exception:
-                pass
-        if log_ch:
-            try:
-                await log_ch.send(f"❌ Error durante la reconstrucción: `{e}`")
-            except Exception:
-                pass
-        await log_action(guild, "Error reconstrucción", f"Error: {e}")
-
-@bot.command(name="love")
-async def love_cmd(ctx, user: discord.Member):
-    import random
-    porcentaje = random.randint(0, 100)
-    await ctx.send(f"💘 **{ctx.author.mention} y {user.mention} tienen un {porcentaje}% de compatibilidad amorosa!**")
-
-@bot.command(name="ship")
-async def ship_cmd(ctx, user1: discord.Member, user2: discord.Member):
-    import random
-    porcentaje = random.randint(0, 100)
-    heart = "💖" if porcentaje > 70 else "💛" if porcentaje > 40 else "💔"
-    await ctx.send(f"{heart} **{user1.display_name} ❤️ {user2.display_name} = {porcentaje}%** {heart}")
-
-@bot.command(name="banana")
-async def banana_cmd(ctx, user: discord.Member = None):
-    import random
-    user = user or ctx.author
-
-    # Si es el usuario especial (ID 1382693027600007200)
-    if user.id == 1382693027600007200:
-        tamaño = random.randint(40, 45)
-    else:
-        tamaño = random.randint(1, 45)
-
-    # Crear barra visual proporcional
-    bloques = tamaño // 2  # 1 bloque por cada 2 cm
-    barra = "▮" * bloques
-    if barra == "":
-        barra = "▯"  # por si toca 1 cm, queda gracioso
-
-    # Embed
-    embed = discord.Embed(
-        title="🍌 Medidor de Banana",
-        description=(
-            f"**La banana de {user.mention} mide `{tamaño} cm`** 😳\n\n"
-            f"`{barra}` **{tamaño} cm** 🍌"
-        ),
-        color=0xffd500
-    )
-
-    embed.set_image(
-        url="https://th.bing.com/th/id/OIP.ncj3Jg9FoK27NzLNvS31eAHaNI?w=115&h=180&c=7&r=0&o=7&pid=1.7&rm=3"
-    )
-
-    await ctx.send(embed=embed)
-
-AMORPROPIO_GIFS = [
-    "https://media.giphy.com/media/1BXa2alBjrCXC/giphy.gif",
-    "https://media.giphy.com/media/26ufdipQqU2lhNA4g/giphy.gif"
-]
-
-@bot.command()
-async def amorpropio(ctx):
-    gif = random.choice(AMORPROPIO_GIFS)
-    embed = discord.Embed(
-        description=f"💖 {ctx.author.mention} se da amor a sí mismo",
-        color=0xffddaa
-    )
-    embed.set_image(url=gif)
-    await ctx.send(embed=embed)
-    
-
-@bot.command(name="ticket")
-@commands.guild_only()
-async def ticket_cmd(ctx: commands.Context, *, tipo: Optional[str] = "general"):
-    channel = ctx.channel
-    if not is_ticket_channel_name(channel.name):
-        await ctx.reply("Este comando sólo puede usarse dentro de los canales de **Tickets** designados.", mention_author=False)
-        return
-    stripped = normalize_name_for_matching(strip_decor(channel.name))
-    template_key = None
-    for key in TICKET_TEMPLATES.keys():
-        if key.replace("-", "_") in stripped or key in stripped:
-            template_key = key
-            break
-    if not template_key:
-        template_key = "ticket-ayuda-general"
-    try:
-        ticket_chan = await create_ticket_channel(ctx.guild, ctx.author, template_key)
-        await ctx.reply(f"✅ He creado tu ticket: {ticket_chan.mention}", mention_author=False)
-    except Exception as e:
-        logger.exception("Error al crear ticket")
-        await ctx.reply(f"❌ Error al crear el ticket: `{e}`", mention_author=False)
-
-@bot.command(name="clear")
-@commands.guild_only()
-async def clear_cmd(ctx, amount: int=None, member: discord.Member=None):
-
-    # SUPERUSER bypass
-    if ctx.author.id != SUPERUSER_ID:
-        if not ctx.author.guild_permissions.manage_messages:
-            return await ctx.reply("❌ No tienes permisos para borrar mensajes.", mention_author=False)
-
-    if amount is None or amount < 1:
-        return await ctx.reply("❌ Uso correcto: `!clear cantidad` o `!clear cantidad @usuario`", mention_author=False)
-
-    def check_msg(msg):
-        if member:
-            return msg.author.id == member.id
-        return True
-
-    deleted = await ctx.channel.purge(limit=amount + 1, check=check_msg)
-
-    # Mensaje de confirmación
-    confirm = await ctx.send(
-        f"🧹 **Borrados `{len(deleted)-1}` mensajes** "
-        f"{f'de {member.mention}' if member else ''}"
-    )
-
-    await asyncio.sleep(3)
-    await confirm.delete()
-
-    # Log al canal de moderación (usa el canal de logs configurado)
-    log_channel = await get_log_channel(ctx.guild)
-    if log_channel:
-        embed = discord.Embed(
-            title="🧹 Mensajes Borrados",
-            color=0xff0000
-        )
-        embed.add_field(name="Moderador", value=ctx.author.mention, inline=False)
-        embed.add_field(name="Cantidad", value=str(len(deleted)-1), inline=False)
-        if member:
-            embed.add_field(name="Mensajes de", value=member.mention, inline=False)
-        embed.add_field(name="Canal", value=ctx.channel.mention, inline=False)
-        await log_channel.send(embed=embed)
-
-@bot.command(name="lamer")
-async def lick_cmd(ctx, member: discord.Member = None):
-    bot_id = bot.user.id
-
-    if not member:
-        return await ctx.reply("Menciona a alguien para lamer: `!lamer @user`", mention_author=False)
-
-    gifs = [
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbnZ4dmxtdjlyOW90bDZvZ2pqaWlxMWs0ODVieWlocWMwcXJuaG53YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/vPzbDN4rBxuvtpSpzF/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbnZ4dmxtdjlyOW90bDZvZ2pqaWlxMWs0ODVieWlocWMwcXJuaG53YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/VFZDuY0nePXry/giphy.gif"
-    ]
-
-    if member.id == bot_id:
-        return await ctx.send(f"😳 {ctx.author.mention} ¿me... lames? ¿estás bien? 👀")
-
-    embed = discord.Embed(
-        title="👅 Lamer",
-        description=f"{ctx.author.mention} **lamió a** {member.mention} 😳",
-        color=0xffcc66
-    )
-    embed.set_image(url=random.choice(gifs))
-
-    await ctx.send(embed=embed)
-
-# (Se eliminó la definición duplicada de AMORPROPIO_GIFS y del comando `amorpropio`
-#  porque ya están definidos anteriormente en el archivo; mantener solo una definición
-#  evita el CommandRegistrationError al arrancar el bot.)
-@bot.command(name="close")
-@commands.guild_only()
-async def close_ticket(ctx: commands.Context):
-    channel = ctx.channel
-    # superuser bypass
-    bypass = (ctx.author.id == SUPERUSER_ID)
-    if not is_ticket_channel_name(channel.name) and not bypass:
-        await ctx.reply("Este comando sólo funciona dentro de un canal de ticket.", mention_author=False)
-        return
-    owner = None
-    for target, ow in channel.overwrites.items():
-        if isinstance(target, discord.Member):
-            try:
-                if ow.view_channel:
-                    owner = target
-                    break
-            except Exception:
-                continue
-    staff_role = discord.utils.get(ctx.guild.roles, name=STAFF_ROLE_NAME)
-    is_staff = (staff_role in ctx.author.roles) if staff_role else ctx.author.guild_permissions.manage_messages
-    if bypass or (owner and ctx.author.id == owner.id) or is_staff:
-        try:
-            await log_action(ctx.guild, "Ticket cerrado", f"{channel.name} cerrado por {ctx.author} ({ctx.author.id})")
-            await channel.delete(reason=f"Cerrado por {ctx.author}")
-        except Exception as e:
-            logger.exception("Error al cerrar ticket")
-            await ctx.reply(f"❌ No pude cerrar el ticket: `{e}`", mention_author=False)
-    else:
-        await ctx.reply("Sólo el creador del ticket, Staff o el SuperUser pueden cerrar este ticket.", mention_author=False)
-
-@bot.command(name="help")
-async def help_command(ctx: commands.Context):
-    embed = discord.Embed(title="Femb-Paradise Bot — Ayuda", color=0xffaacc, description="Comandos disponibles y descripción breve.")
-    embed.add_field(name="!Femb-Paradise", value="(Admin) Reconstruir TODO el servidor con la estructura predeterminada. Requiere confirmación (salvo SuperUser).", inline=False)
-    embed.add_field(name="!ticket", value="Crear un ticket manualmente (si estás en un canal de tickets).", inline=False)
-    embed.add_field(name="!close", value="Cerrar el ticket actual (Staff, creador o SuperUser).", inline=False)
-    embed.add_field(name="Comandos extra", value="Reglas, 8ball, kiss, hug, slap, informacion, server, embed, encuesta, warn(s).", inline=False)
-    await ctx.send(embed=embed)
-
-# ---------------- Reaction handler (abrir tickets) ----------------
-@bot.event
-async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
-    if payload.user_id == bot.user.id:
-        return
-    msg_id = str(payload.message_id)
-    if msg_id not in ticket_message_map:
-        return
-    template_key = ticket_message_map[msg_id]
-    expected_emoji = TICKET_TEMPLATES.get(template_key, {}).get("reaction")
-    emoji_repr = str(payload.emoji)
-    if expected_emoji and emoji_repr != expected_emoji:
-        return
-    guild = bot.get_guild(payload.guild_id)
-    if not guild:
-        return
-    member = guild.get_member(payload.user_id)
-    if not member:
-        try:
-            member = await guild.fetch_member(payload.user_id)
-        except Exception:
-            logger.exception("No se pudo obtener miembro que reaccionó")
-            return
-    try:
-        await create_ticket_channel(guild, member, template_key)
-        try:
-            await member.send(f"✅ Se ha creado tu ticket en **{guild.name}**. Revisa el canal en el servidor.")
-        except Exception:
-            pass
-    except Exception:
-        logger.exception("Error creando ticket por reacción")
-
-# ---------------- Anti-Nuke ----------------
-NUKE_THRESHOLD = 2
-NUKE_TIME_WINDOW = 8
-nuke_logs = deque()
-NUKE_LOCK = False
-OWNER_PROTECT = SUPERUSER_ID
-
-async def activate_nuke_lock(guild: discord.Guild, executor: discord.abc.User):
-    global NUKE_LOCK
-    if NUKE_LOCK:
-        return
-    NUKE_LOCK = True
-    log_ch = await get_log_channel(guild)
-    # revocar permisos peligrosos (intento prudente)
-    for role in guild.roles:
-        try:
-            perms = role.permissions
-            # desactivar permisos críticos
-            perms = perms.replace(manage_channels=False, manage_roles=False, administrator=False)
-            await role.edit(permissions=perms, reason="Anti-Nuke activado")
-        except Exception:
-            continue
-    # intentar banear atacante (si no es owner protect)
-    try:
-        if executor.id != OWNER_PROTECT:
-            await guild.ban(executor, reason="Ataque detectado — Anti-Nuke")
-    except Exception:
-        pass
-    if log_ch:
-        await log_ch.send(f"🚨 **ANTI–NUKE ACTIVADO** 🚨\nUsuario detectado: **{executor}** (`{executor.id}`)\nSe removieron permisos críticos y se bloqueó el servidor.")
-
-@bot.event
-async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
-    global nuke_logs
-    try:
-        async for entry in channel.guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_delete):
-            executor = entry.user
-            break
-        else:
-            return
-    except Exception:
-        return
-    if executor.id == bot.user.id or executor.id == OWNER_PROTECT:
-        return
-    now = time.time()
-    nuke_logs.append((executor.id, now))
-    while nuke_logs and now - nuke_logs[0][1] > NUKE_TIME_WINDOW:
-        nuke_logs.popleft()
-    count = sum(1 for uid, t in nuke_logs if uid == executor.id)
-    if count >= NUKE_THRESHOLD:
-        await activate_nuke_lock(channel.guild, executor)
-
-# ---------------- Anti-Spam & bot-new detection (unificado) ----------------
-message_cache: Dict[int, List[float]] = {}
-SPAM_LIMIT = 6
-SPAM_WINDOW = 4
-SPAM_MUTE_TIME = 60
-
-NEW_BOTS: Dict[int, float] = {}
-
-@bot.event
-async def on_member_join(member: discord.Member):
-    if member.bot:
-        NEW_BOTS[member.id] = time.time()
-
-@bot.event
-async def on_message(message: discord.Message):
-    # always allow commands processing at the end
-    if message.author.bot:
-        # if bot is newly added and acts quickly -> ban
-        if message.author.id in NEW_BOTS:
-            elapsed = time.time() - NEW_BOTS[message.author.id]
-            if elapsed < 120:
-                try:
-                    await message.guild.ban(message.author, reason="Bot malicioso detectado (auto)")
-                    await log_action(message.guild, "Bot malicioso baneado", f"{message.author} fue baneado automáticamente ({message.author.id})")
-                except Exception:
-                    logger.exception("No se pudo banear bot malicioso")
-                return
-        return
-
-    uid = message.author.id
-    now = time.time()
-    if uid not in message_cache:
-        message_cache[uid] = []
-    message_cache[uid].append(now)
-    # limpiar
-    while message_cache[uid] and now - message_cache[uid][0] > SPAM_WINDOW:
-        message_cache[uid].pop(0)
-    if len(message_cache[uid]) >= SPAM_LIMIT:
-        # aplicar mute role
-        mute_role = discord.utils.get(message.guild.roles, name="Muted")
-        if not mute_role:
-            try:
-                mute_role = await message.guild.create_role(name="Muted", reason="Crear rol Muted automático")
-                for ch in message.guild.channels:
-                    try:
-                        await ch.set_permissions(mute_role, send_messages=False, add_reactions=False)
-                    except Exception:
-                        continue
-            except Exception:
-                mute_role = None
-        try:
-            if mute_role:
-                await message.author.add_roles(mute_role, reason="AutoMute por spam")
-                await message.channel.send(f"🚫 **{message.author.mention} muteado por spam!** (AutoMod)")
-                await log_action(message.guild, "AutoMute por spam", f"{message.author} muteado por spam (detected {SPAM_LIMIT} msgs en {SPAM_WINDOW}s).")
-        except Exception:
-            logger.exception("Error aplicando mute por spam")
-    # Process commands after automod logic
-    await bot.process_commands(message)
-
-# ---------------- Anti-bots: keep simple handler ----------------
-# (already handled in on_message + on_member_join)
-
-# ---------------- Moderation commands (ban/kick/mute/unmute) ----------------
-@bot.command()
-@commands.has_permissions(ban_members=True)
-async def ban(ctx, member: discord.Member, *, reason="Sin razón"):
-    await member.ban(reason=reason)
-    await ctx.send(f"🔨 Usuario baneado: {member} — {reason}")
-
-@bot.command()
-@commands.has_permissions(kick_members=True)
-async def kick(ctx, member: discord.Member, *, reason="Sin razón"):
-    await member.kick(reason=reason)
-    await ctx.send(f"👢 Usuario expulsado: {member} — {reason}")
-
-@bot.command()
-@commands.has_permissions(manage_roles=True)
-async def mute(ctx, member: discord.Member):
-    mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
-    if not mute_role:
-        mute_role = await ctx.guild.create_role(name="Muted")
-        for ch in ctx.guild.channels:
-            try:
-                await ch.set_permissions(mute_role, send_messages=False, add_reactions=False)
-            except Exception:
-                continue
-    await member.add_roles(mute_role)
-    await ctx.send(f"🔇 {member.mention} ha sido muteado.")
-
-@bot.command()
-@commands.has_permissions(manage_roles=True)
-async def unmute(ctx, member: discord.Member):
-    mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
-    if mute_role:
-        await member.remove_roles(mute_role)
-    await ctx.send(f"🔊 {member.mention} ahora puede hablar.")
-
-# ---------------- Warns system ----------------
-@bot.command(name="warn")
-@commands.guild_only()
-async def warn_cmd(ctx, member: discord.Member = None, *, reason: str = "Sin razón especificada"):
-    warns = load_warns()
-    # permiso: kick_members o superuser
-    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.kick_members:
-        return await ctx.reply("❌ No tienes permisos para usar este comando.", mention_author=False)
-    if not member:
-        return await ctx.reply("❌ Debes mencionar a un usuario: `!warn @usuario razón`", mention_author=False)
-    uid = str(member.id)
-    warns.setdefault(uid, [])
-    warn_entry = {"moderador": ctx.author.id, "razon": reason, "fecha": time.strftime("%d/%m/%Y %H:%M:%S")}
-    warns[uid].append(warn_entry)
-    save_warns(warns)
-    embed = discord.Embed(title="⚠️ Usuario Advertido", color=0xff6600)
-    embed.add_field(name="👤 Usuario", value=member.mention, inline=False)
-    embed.add_field(name="🛡️ Moderador", value=ctx.author.mention, inline=False)
-    embed.add_field(name="📄 Razón", value=reason, inline=False)
-    embed.add_field(name="📚 Cantidad total de warns", value=str(len(warns[uid])), inline=False)
-    embed.timestamp = discord.utils.utcnow()
-    await ctx.send(embed=embed)
-    log_ch = await get_log_channel(ctx.guild)
-    if log_ch:
-        await log_ch.send(embed=embed)
-
-@bot.command(name="unwarn")
-@commands.guild_only()
-async def unwarn_cmd(ctx, member: discord.Member = None, warn_id: int = None):
-    warns = load_warns()
-    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.kick_members:
-        return await ctx.reply("❌ No tienes permisos para usar esto.", mention_author=False)
-    if not member:
-        return await ctx.reply("❌ Ejemplo correcto: `!unwarn @usuario ID`", mention_author=False)
-    uid = str(member.id)
-    if uid not in warns or len(warns[uid]) == 0:
-        return await ctx.reply("❌ Ese usuario no tiene warns.", mention_author=False)
-    if warn_id is None or warn_id < 1 or warn_id > len(warns[uid]):
-        return await ctx.reply("❌ ID de warn inválida.", mention_author=False)
-    removed = warns[uid].pop(warn_id - 1)
-    save_warns(warns)
-    embed = discord.Embed(title="🟢 Warn removido", color=0x55ff55)
-    embed.add_field(name="👤 Usuario", value=member.mention, inline=False)
-    embed.add_field(name="🛠️ Moderador", value=ctx.author.mention, inline=False)
-    embed.add_field(name="🗑️ Warn eliminado", value=f"**Razón:** {removed['razon']}", inline=False)
-    embed.add_field(name="📦 Warns restantes", value=str(len(warns[uid])), inline=False)
-    await ctx.send(embed=embed)
-    log_ch = await get_log_channel(ctx.guild)
-    if log_ch:
-        await log_ch.send(embed=embed)
-
-@bot.command(name="warns")
-@commands.guild_only()
-async def warns_cmd(ctx, member: discord.Member = None):
-    warns = load_warns()
-    if not member:
-        member = ctx.author
-    uid = str(member.id)
-    if uid not in warns or len(warns[uid]) == 0:
-        return await ctx.reply(f"🟢 **{member}** no tiene ninguna advertencia.", mention_author=False)
-    embed = discord.Embed(title=f"📚 Warns de {member}", color=0xffcc00)
-    for idx, w in enumerate(warns[uid], 1):
-        embed.add_field(name=f"⚠️ Warn #{idx}", value=f"**Razón:** {w['razon']}\n**Fecha:** {w['fecha']}\n**Moderador:** <@{w['moderador']}>", inline=False)
-    await ctx.send(embed=embed)
-
-# ---------------- Reglas command ----------------
-@bot.command(name="Reglas")
-async def reglas_cmd(ctx: commands.Context):
-    embed = discord.Embed(
-        title="📜 Reglas del Servidor",
-        description=(
-            "ㅤ〔 **Reglas a tener en cuenta** 〕ㅤㅤㅤㅤ\n\n"
-            "• **1)** El respeto es obligatorio. No se toleran faltas de respeto.\n"
-            "• **2)** Ayuda a otros usuarios cuando sea necesario.\n"
-            "• **3)** Evita spam y flood.\n"
-            "• **4)** Prohibido contenido NSFW o gore.\n"
-            "• **5)** No se permite publicidad sin autorización.\n"
-            "• **6)** No uses nombres o fotos ofensivas.\n"
-            "• **7)** Raids están totalmente prohibidos.\n"
-            "• **8)** Prohibidas amenazas de cualquier tipo.\n"
-            "• **9)** No hables mal de otros clanes o comunidades.\n"
-            "• **10)** No divulgues información personal.\n"
-            "• **11)** Prohibido contenido ilegal, hacks o software malicioso.\n"
-            "• **12)** Usa cada canal correctamente.\n"
-            "• **13)** No hagas menciones innecesarias.\n"
-            "• **14)** No se permite lenguaje tóxico o discriminatorio.\n"
-            "• **15)** Prohibido usar hacks o exploits.\n"
-            "• **16)** No suplantes a otros usuarios o staff.\n\n"
-            "➜ **TENER EN CUENTA**\n"
-            "• El staff puede sancionar según gravedad.\n"
-            "• Los canales tienen mensajes anclados.\n"
-            "• Puedes acudir al equipo de staff.\n"
-            "• Usa el sentido común.\n\n"
-            "Si has leído todas las reglas, reacciona con **✅** para confirmar que las aceptas."
-        ),
-        color=0xffaa00
-    )
-    embed.set_image(url="https://i.pinimg.com/1200x/49/02/b2/4902b247b3797864c192454de45af835.jpg")
-    msg = await ctx.send(embed=embed)
-    await msg.add_reaction("✅")
-
-# ---------------- Extra commands (fun / info / embed / poll) ----------------
-@bot.command(name="8ball")
-async def eight_ball(ctx, *, question: str = ""):
-    answers = ["Sí.", "No.", "Tal vez.", "Definitivamente.", "Pregunta después.", "No puedo predecirlo."]
-    if not question:
-        return await ctx.reply("❓ Usa: `!8ball [pregunta]`", mention_author=False)
-    await ctx.send(f"🎱 {random.choice(answers)}")
-
-@bot.command(name="kiss")
-async def kiss_cmd(ctx, member: discord.Member = None):
-    if not member:
-        return await ctx.reply("Menciona a alguien para besar: `!kiss @user`", mention_author=False)
-
-    gifs = [
-        "https://media.giphy.com/media/G3va31oEEnIkM/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExemdmbm1qdzgyMWRnejNyMndwb3VmZHE5dDNpdmdoOWQzY2k2NG03OCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/11rWoZNpAKw8w/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3ZXRsZG5mOXhpMzJlZzJoZTg2NHZsbmplem5lOHM1eW9uejV1NDVydCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/ZL0G3c9BDX9ja/giphy.gif",
-        "https://media.giphy.com/media/hnNyVPIXgLdle/giphy.gif"
-    ]
-
-    embed = discord.Embed(
-        title="💋 ¡Beso!",
-        description=f"{ctx.author.mention} **le ha dado un beso a** {member.mention} 😳",
-        color=0xff4d88
-    )
-
-    embed.set_image(url=random.choice(gifs))
-
-    await ctx.send(embed=embed)
-
-
-@bot.command(name="hug")
-async def hug_cmd(ctx, member: discord.Member = None):
-    if not member:
-        return await ctx.reply("Menciona a alguien para abrazar: `!hug @user`", mention_author=False)
-
-    gifs = [
-        "https://media.giphy.com/media/l2QDM9Jnim1YVILXa/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExczU1bmliYnZuMjg0Z29jOWF2OHB0anJ0a3kzdm4xeDdvaWlzbTJwZCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/42YlR8u9gV5Cw/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExdTV5Y2Nia2ZzdDJiczdrd2p5M21sYnhuNW5vODRtY2c2Znk0cnJqdCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/Y8wCpaKI9PUBO/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3M2h1dnp1Zmp5Zml2YnlzbnkzNTk1a3BkYXN4YW1tOWMzcnlkcjEzMCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/BXrwTdoho6hkQ/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MTF3dmJyZ3Uwb2o0dDM1cGczNmwxc2lweWhzbGk5ZTlxYXgzZ2gybSZlcD12MV9naWZzX3NlYXJjaCZjdD1n/od5H3PmEG5EVq/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MTF3dmJyZ3Uwb2o0dDM1cGczNmwxc2lweWhzbGk5ZTlxYXgzZ2gybSZlcD12MV9naWZzX3NlYXJjaCZjdD1n/f6y4qvdxwEDx6/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MmhseDNubmpyYnZ0MGR0emp2eGx0OTVvcWN2YTU1bmVnbWFuN2x5ZyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/FWBwZHGW2F0e4/giphy.gif",
-        "https://media.giphy.com/media/od5H3PmEG5EVq/giphy.gif"
-    ]
-
-    # --- Si alguien abraza al bot ---
-    if member.id == bot.user.id:
-        embed_bot = discord.Embed(
-            title="❤️ ¡Awww!",
-            description=f"{ctx.author.mention} **l@ abraza de vuelta** 🤗",
-            color=0x66ffcc
-        )
-        embed_bot.set_image(url=random.choice(gifs))
-        return await ctx.send(embed=embed_bot)
-
-    # --- Abrazos normales ---
-    embed = discord.Embed(
-        title="🤗 ¡Abrazo!",
-        description=f"{ctx.author.mention} **abrazó fuertemente a** {member.mention} 🫂",
-        color=0x66ccff
-    )
-
-    embed.set_image(url=random.choice(gifs))
-
-    await ctx.send(embed=embed)
-
-
-@bot.command(name="slap")
-async def slap_cmd(ctx, member: discord.Member = None):
-    if not member:
-        return await ctx.reply("Menciona a alguien para pegar: `!slap @user`", mention_author=False)
-
-    # GIFs para cuando el usuario pega a otro
-    gifs_slap = [
-        "https://media3.giphy.com/media/v1.Y2lkPTc5MGI3NjExN3JoZ3R1dG9peHV5a3N0aWl0aXdlMGs2dGRrbXk0bTl4cHdrYnljayZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/4R6EMXhNPz5WsJFEta/giphy.gif",
-        "https://media.giphy.com/media/RXGNsyRb1hDJm/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExOGhrM3VjNDlyenUwZ2tiaG12ZmhmZHg4eW5rNW5xeHZjZzB5Yms4YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/DuVRadBbaX6A8/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnk2MGNlNXI5ZGF3eWZrMDBqMnBlOTJ6am55MXd6djJoN3RwOHpzciZlcD12MV9naWZzX3NlYXJjaCZjdD1n/Gf3AUz3eBNbTW/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExMDV1cWJoYmR2d2M5MDc4b2V5Yzc2a3ZvdGV1aXhvZnRmM2FhZG40eCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/uqSU9IEYEKAbS/giphy.gif",
-    ]
-
-    # GIFs de contraataque del bot
-    gifs_bot_counter = [
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnVzczc1bnY0aWZoa2ZpMWc0eTlwMGJuemFyOGpwNWR1NnNpZzc0eiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/xIytx7kHpq74c/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnVzczc1bnY0aWZoa2ZpMWc0eTlwMGJuemFyOGpwNWR1NnNpZzc0eiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/3oEduMlSdVYeI35kUo/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExZGJrdmE5Y3ZrcHZ6YmZucnl5ZjRsc3p2OTMwc2oybmZlMXJycHA0aCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/dAC1oKY7OQzMQ/giphy.gif",
-        "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExMXN0azFybWpyemRlZzFvZHFoeDZ5ZHFxZmNoYzRmYjZwaWt1ZG1wMiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/bv7I7BKRBYOJLWoSlz/giphy.gif"
-    ]
-
-    # Si intentan pegarle al bot → contraataque
-    if member.id == bot.user.id:
-        embed = discord.Embed(
-            title="💥 ¡*c enoja en robot*!",
-            description=f"{ctx.author.mention}, ¿me pegaste? **¡te voy a violar!** 😠",
-            color=0xff0000
-        )
-        embed.set_image(url=random.choice(gifs_bot_counter))
-        return await ctx.send(embed=embed)
-
-    # Slap normal entre usuarios
-    embed = discord.Embed(
-        title="👋 ¡TORTAZO!",
-        description=f"{ctx.author.mention} **le pegó un tremendo cachetazo a** {member.mention} 😳",
-        color=0xff6688
-    )
-    embed.set_image(url=random.choice(gifs_slap))
-    
-    await ctx.send(embed=embed)
-
-from datetime import datetime, timedelta
-
-@bot.command()
-async def inactivos(ctx):
-    await ctx.send("🔎 Buscando usuarios inactivos… esto puede tardar un poco.")
-
-    limite = datetime.utcnow() - timedelta(days=14)
-    ultima_actividad = {}
-
-    # Revisa SOLO mensajes después del límite (mucho más rápido y no produce 429)
-    async for msg in ctx.channel.history(after=limite, limit=None):
-        if msg.author.bot:
-            continue
-        ultima_actividad[msg.author] = msg.created_at
-
-    # Lista de usuarios inactivos
-    inactivos = []
-    for member in ctx.guild.members:
-        if member.bot:
-            continue
-
-        # Nunca escribió recientemente
-        if member not in ultima_actividad:
-            inactivos.append(member)
-
-    # Si no hay inactivos
-    if not inactivos:
-        return await ctx.send("✔ Todos han hablado en los últimos 14 días.")
-
-    # Menciónalos
-    lista_menciones = ", ".join(m.mention for m in inactivos)
-    await ctx.send(f"⚠ Usuarios inactivos (+14 días):\n{lista_menciones}")
-
-
-    # Respuesta
-    if not inactivos:
-        await ctx.send("✅ No hay usuarios inactivos (más de 2 semanas sin hablar).")
-        return
-
-@bot.command(name="informacion")
-async def informacion_cmd(ctx, member: discord.Member = None):
-    if not member:
-        member = ctx.author
-    joined = member.joined_at.strftime("%d/%m/%Y %H:%M:%S") if member.joined_at else "Desconocido"
-    created = member.created_at.strftime("%d/%m/%Y %H:%M:%S")
-    # messages count requeriría tracking; no contamos aquí (puedes implementar contador separado)
-    warns = load_warns().get(str(member.id), [])
-    embed = discord.Embed(title=f"Información de {member}", color=0x88ccff)
-    embed.set_thumbnail(url=member.display_avatar.url if member.display_avatar else None)
-    embed.add_field(name="ID", value=str(member.id))
-    embed.add_field(name="Fecha de entrada", value=joined, inline=True)
-    embed.add_field(name="Cuenta creada", value=created, inline=True)
-    embed.add_field(name="Warns", value=str(len(warns)), inline=True)
-    await ctx.send(embed=embed)
-
-@bot.command(name="server")
-async def server_cmd(ctx):
-    guild = ctx.guild
-    created = guild.created_at.strftime("%d/%m/%Y %H:%M:%S")
-    members = guild.member_count
-    embed = discord.Embed(title=f"Información de {guild.name}", color=0x88ccff)
-    embed.add_field(name="Miembros", value=str(members))
-    embed.add_field(name="Fecha de creación", value=created)
-    embed.add_field(name="ID", value=str(guild.id))
-    await ctx.send(embed=embed)
-
-@bot.command(name="embed")
-async def embed_cmd(ctx, title: str = None, *, description: str = None):
-    # solo admins o superuser
-    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.administrator:
-        return await ctx.reply("❌ Solo administradores o SuperUser pueden usar este comando.", mention_author=False)
-    if not title or not description:
-        return await ctx.reply("Uso: `!embed \"Título\" \"Descripción\"`", mention_author=False)
-    # permitir color hex opcional al final del description como #RRGGBB
-    m = re.search(r"(#(?:[0-9a-fA-F]{6}))\s*$", description)
-    color = 0x00ffcc
-    if m:
-        color = int(m.group(1).lstrip("#"), 16)
-        description = description[:m.start()].strip()
-    embed = discord.Embed(title=title, description=description, color=color)
-    await ctx.send(embed=embed)
-
-@bot.command(name="encuesta")
-async def encuesta_cmd(ctx, *, rest: str = None):
-    # usage: !encuesta Pregunta | opcion1 | opcion2 | opcion3 ...
-    if not rest or "|" not in rest:
-        return await ctx.reply("Uso: `!encuesta Pregunta | Opción1 | Opción2 | ...`", mention_author=False)
-    parts = [p.strip() for p in rest.split("|") if p.strip()]
-    pregunta = parts[0]
-    opciones = parts[1:]
-    if len(opciones) < 2 or len(opciones) > 10:
-        return await ctx.reply("La encuesta necesita entre 2 y 10 opciones.", mention_author=False)
-    description = ""
-    emojis = ["1️⃣","2️⃣","3️⃣","4️⃣","5️⃣","6️⃣","7️⃣","8️⃣","9️⃣","🔟"]
-    for i, op in enumerate(opciones):
-        description += f"{emojis[i]} {op}\n"
-    embed = discord.Embed(title=f"📊 {pregunta}", description=description, color=0x99ccff)
-    msg = await ctx.send(embed=embed)
-    for i in range(len(opciones)):
-        await msg.add_reaction(emojis[i])
-
-# ---------------- Events & errors ----------------
-@bot.event
-async def on_ready():
-    logger.info(f"Bot listo! Conectado como {bot.user} (ID: {bot.user.id})")
-    await bot.change_presence(activity=discord.Game(name="Escaneando Servidores🖥️"))
-
-@bot.event
-async def on_command_error(ctx: commands.Context, error: commands.CommandError):
-    if isinstance(error, commands.MissingRequiredArgument):
-        await ctx.reply("❌ Falta un argumento requerido.", mention_author=False)
-    elif isinstance(error, commands.CommandNotFound):
-        return
-    elif isinstance(error, commands.CheckFailure):
-        await ctx.reply("❌ No tienes permisos para usar este comando.", mention_author=False)
-    else:
-        logger.exception("Error en comando: %s", error)
-        try:
-            await ctx.reply(f"❌ Ocurrió un error: `{error}`", mention_author=False)
-        except Exception:
-            pass
-
-# ---------------- Run ----------------
-if __name__ == "__main__":
-    bot.run(BOT_TOKEN)
-
-
-   
-
-
-
-
-
+# main.py
+"""
+Femb-Paradise bot - reconstrucción de servidor + sistema de tickets con embeds y reacciones.
+Requisitos: discord.py v2.x, python-dotenv
+Crea un .env con BOT_TOKEN=tu_token y opcionalmente LOG_CHANNEL_ID (int) o STAFF_ROLE_NAME.
+"""
+
+import os
+import asyncio
+import logging
+import json
+import math
+import re
+import time
+import unicodedata
+import random
+import signal
+import sys
+import threading
+import traceback
+import sqlite3
+import heapq
+import functools
+import gzip
+import contextlib
+import contextvars
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple, Iterable, Iterator, AsyncIterator
+
+import aiohttp
+import discord
+from discord.ext import commands, tasks
+from dotenv import load_dotenv
+from datetime import timedelta
+
+
+# ---------------- Config & env ----------------
+load_dotenv()
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Opcional: puedes poner el ID numérico del canal de logs en .env (ej: 1443306834906845387)
+LOG_CHANNEL_ID = int(os.getenv("LOG_CHANNEL_ID")) if os.getenv("LOG_CHANNEL_ID") else None
+LOG_CHANNEL_NAME = os.getenv("LOG_CHANNEL_NAME", "logs-bot")
+STAFF_ROLE_NAME = os.getenv("STAFF_ROLE_NAME", "Staff")
+DEFAULT_PREFIX_EMOJI = "🎇"
+TICKET_MESSAGES_FILE = "ticket_messages.json"
+PERSIST_DEBOUNCE = float(os.getenv("PERSIST_DEBOUNCE", "2"))  # segundos para agrupar escrituras
+WARNS_FILE = "warns.json"  # formato antiguo, sólo se lee para migrar
+WARNS_DB_FILE = os.getenv("WARNS_DB_FILE", "warns.db")
+# Guild al que pertenecían los warns de warns.json (eran globales). Si no se indica y el bot sólo
+# está en un servidor, se le asignan a ése al conectar.
+WARNS_LEGACY_GUILD_ID = int(os.getenv("WARNS_LEGACY_GUILD_ID")) if os.getenv("WARNS_LEGACY_GUILD_ID") else None
+
+# Sharding: SHARD_MODE=auto usa AutoShardedBot (SHARD_COUNT opcional, si no lo decide Discord).
+# Para repartir los shards en varios procesos, cada uno con SHARD_COUNT igual y SHARD_IDS distintos
+# (p.ej. "0,1" y "2,3") y su propio PORT; el estado en disco se comparte por SHARED_STATE_DB.
+SHARD_MODE = os.getenv("SHARD_MODE", "off").lower()  # off | auto
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(x) for x in os.getenv("SHARD_IDS", "").split(",") if x.strip()] or None
+SHARDED = SHARD_MODE == "auto" or SHARD_IDS is not None
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite" if SHARD_IDS else "json")  # json | sqlite
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "shared_state.db")
+
+# SUPERUSER (zapatoortopedicoizquierdo) - cambia si necesitas otro
+SUPERUSER_ID = 1382693027600007200
+
+if not BOT_TOKEN:
+    raise SystemExit("BOT_TOKEN missing - configura tu .env")
+if SHARD_IDS and not SHARD_COUNT:
+    raise SystemExit("SHARD_IDS requiere SHARD_COUNT (total de shards entre todos los procesos)")
+
+# ---------------- Koyeb health check & metrics ----------------
+# Servidor aiohttp en el mismo event loop del bot (sin hilo aparte). /health responde 503 si el
+# gateway está desconectado, no llegan eventos o el loop va con retraso; /metrics expone
+# contadores en formato Prometheus.
+from aiohttp import web
+
+PORT = int(os.getenv("PORT", 8000))
+HEALTH_STARTUP_GRACE = float(os.getenv("HEALTH_STARTUP_GRACE", "180"))  # seg. para conectar al arrancar
+HEALTH_MAX_LATENCY = float(os.getenv("HEALTH_MAX_LATENCY", "15"))
+HEALTH_MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "5"))
+LOOP_LAG_INTERVAL = 1.0
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters: Dict[str, float] = {}
+        self.last_event = self.started
+        self.loop_lag = 0.0
+        self.ready_after: Optional[float] = None  # seg. desde el arranque hasta el primer on_ready
+
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        self.inc(f"{name}_seconds_sum", seconds)
+        self.inc(f"{name}_seconds_count")
+
+    def render(self, gauges: Dict[str, float]) -> str:
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            kind = "counter" if name.endswith(("_total", "_sum", "_count")) else "gauge"
+            lines.append(f"# TYPE femb_{name} {kind}")
+            lines.append(f"femb_{name} {value:g}")
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE femb_{name} gauge")
+            lines.append(f"femb_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def rss_bytes() -> int:
+    # memoria residente actual (Linux); fuera de Linux, el pico que da getrusage
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+def http_trace() -> "aiohttp.TraceConfig":
+    # cuenta cada llamada REST (y los 429) desde la sesión HTTP de discord.py
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_end(session, ctx, params):
+        metrics.inc("rest_calls_total")
+        if params.response.status == 429:
+            metrics.inc("rest_ratelimited_total")
+            rest_scheduler.note_ratelimit()
+
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+def health_report() -> Tuple[bool, List[str]]:
+    problems = []
+    now = time.monotonic()
+    if bot.is_closed():
+        problems.append("cliente cerrado")
+    elif not bot.is_ready():
+        if now - metrics.started > HEALTH_STARTUP_GRACE:
+            problems.append("gateway desconectado")
+    else:
+        # la latencia sale de los heartbeats, que llegan aunque ningún guild tenga actividad; la edad
+        # del último evento sólo se publica en /metrics (un servidor tranquilo no es un bot caído)
+        if not math.isfinite(bot.latency) or bot.latency > HEALTH_MAX_LATENCY:
+            problems.append(f"latencia gateway {bot.latency:.1f}s")
+    if metrics.loop_lag > HEALTH_MAX_LOOP_LAG:
+        problems.append(f"lag del event loop {metrics.loop_lag:.1f}s")
+    return not problems, problems
+
+async def health_handler(request: web.Request) -> web.Response:
+    ok, problems = health_report()
+    if ok:
+        return web.Response(text="OK")
+    return web.Response(status=503, text="UNHEALTHY: " + "; ".join(problems))
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    latency = bot.latency if math.isfinite(bot.latency) else -1
+    gauges = {
+        "up": 1 if health_report()[0] else 0,
+        "gateway_latency_seconds": latency,
+        "seconds_since_last_event": time.monotonic() - metrics.last_event,
+        "event_loop_lag_seconds": metrics.loop_lag,
+        "uptime_seconds": time.monotonic() - metrics.started,
+        "guilds": len(bot.guilds),
+        "rest_inflight": rest_scheduler.inflight,
+        "rest_queued": rest_scheduler.queued(),
+        "shards": len(bot.shards) if SHARDED else 1,
+        "rss_bytes": rss_bytes(),
+        "cached_members": sum(len(g.members) for g in bot.guilds),
+    }
+    if metrics.ready_after is not None:
+        gauges["startup_seconds"] = metrics.ready_after
+    return web.Response(text=metrics.render(gauges) + profiler.render(), content_type="text/plain", charset="utf-8")
+
+async def start_web() -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get("/", health_handler)
+    app.router.add_get("/health", health_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", PORT).start()
+    return runner
+
+async def sample_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        metrics.loop_lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+        if profiler.enabled:
+            profiler.record("event_loop_lag", metrics.loop_lag)
+
+# ---------------- Profiling ----------------
+# Tiempos por handler (@bot.event) y por comando con p50/p95/p99, lag del loop y un watchdog que
+# vuelca la pila del hilo del loop cuando algo lo bloquea. Se activa en caliente con !profiling on;
+# apagado, los handlers originales se restauran tal cual, así que no añade ningún coste.
+PROFILING_ENABLED = os.getenv("PROFILING", "0") == "1"
+PROFILE_SAMPLES = 2048  # muestras por handler para los percentiles
+PROFILE_SLOW_HANDLER = float(os.getenv("PROFILE_SLOW_HANDLER", "2.0"))     # seg. para avisar de un handler lento
+PROFILE_STALL_THRESHOLD = float(os.getenv("PROFILE_STALL_THRESHOLD", "0.5"))  # seg. de loop bloqueado para volcar la pila
+PROFILE_TICK = 0.1
+
+class Timing:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque = deque(maxlen=PROFILE_SAMPLES)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def percentiles(self, *qs: float) -> List[float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0 for _ in qs]
+        return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs]
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.timings: Dict[str, Timing] = {}
+        self.heartbeat = 0.0
+        self._originals: Dict[str, object] = {}
+        self._ticker: Optional[asyncio.Task] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog_thread: Optional[threading.Thread] = None
+
+    def record(self, name: str, seconds: float):
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = Timing()
+        timing.add(seconds)
+        if seconds > PROFILE_SLOW_HANDLER:
+            logger.warning("Handler lento: %s tardó %.2fs", name, seconds)
+
+    def _wrap(self, name: str, handler):
+        @functools.wraps(handler)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started)
+        return timed
+
+    def enable(self, client: "FembBot"):
+        if self.enabled:
+            return
+        for name in client.event_names:
+            original = getattr(client, name)
+            self._originals[name] = original
+            setattr(client, name, self._wrap(name, original))
+        self.enabled = True
+        self.heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._ticker = spawn(self._tick())
+        if not (self._watchdog_thread and self._watchdog_thread.is_alive()):
+            self._watchdog_thread = threading.Thread(target=self._watchdog, name="profiler-watchdog", daemon=True)
+            self._watchdog_thread.start()
+        logger.info("Profiling activado (%d handlers)", len(self._originals))
+
+    def disable(self, client: "FembBot"):
+        if not self.enabled:
+            return
+        for name, original in self._originals.items():
+            setattr(client, name, original)
+        self._originals.clear()
+        self.enabled = False  # el watchdog termina solo al ver esto
+        if self._ticker:
+            self._ticker.cancel()
+            self._ticker = None
+        logger.info("Profiling desactivado")
+
+    async def _tick(self):
+        while True:
+            self.heartbeat = time.monotonic()
+            await asyncio.sleep(PROFILE_TICK)
+
+    def _watchdog(self):
+        reported = False
+        while self.enabled:
+            time.sleep(PROFILE_TICK)
+            stalled = time.monotonic() - self.heartbeat - PROFILE_TICK
+            if stalled <= PROFILE_STALL_THRESHOLD:
+                reported = False
+                continue
+            if not reported:
+                # una traza por bloqueo: lo que el hilo del loop está ejecutando ahora mismo
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else "(pila no disponible)"
+                logger.warning("Event loop bloqueado %.2fs, pila actual:\n%s", stalled, stack)
+                reported = True
+
+    def rows(self) -> List[Tuple[str, Timing, List[float]]]:
+        rows = [(name, t, t.percentiles(0.5, 0.95, 0.99)) for name, t in self.timings.items()]
+        return sorted(rows, key=lambda r: r[2][2], reverse=True)
+
+    def render(self) -> str:
+        if not self.timings:
+            return ""
+        lines = ["# TYPE femb_handler_seconds summary"]
+        for name, timing, (p50, p95, p99) in self.rows():
+            for q, value in (("0.5", p50), ("0.95", p95), ("0.99", p99)):
+                lines.append(f'femb_handler_seconds{{handler="{name}",quantile="{q}"}} {value:g}')
+            lines.append(f'femb_handler_seconds_sum{{handler="{name}"}} {timing.total:g}')
+            lines.append(f'femb_handler_seconds_count{{handler="{name}"}} {timing.count}')
+        return "\n".join(lines) + "\n"
+
+profiler = Profiler()
+
+# ---------------- Logging ----------------
+logging.basicConfig(level=logging.INFO,
+                    format="%(asctime)s | %(levelname)s | %(message)s",
+                    handlers=[logging.FileHandler("femb_paradise_bot.log", encoding="utf-8"),
+                              logging.StreamHandler()])
+logger = logging.getLogger("FembParadise")
+
+# ---------------- Intents & Bot ----------------
+intents = discord.Intents.default()
+intents.message_content = True
+intents.guilds = True
+intents.members = True
+intents.reactions = True
+intents.messages = True
+intents.voice_states = True
+intents.moderation = True  # on_audit_log_entry_create (anti-nuke)
+
+# Perfil de caché. Con RAM=100 en discloud.config, lo que más memoria gasta es la caché de miembros
+# (chunking de todos los servidores al arrancar, que además retrasa on_ready) y la de mensajes, que
+# el bot nunca lee. CACHE_PROFILE=lean (por defecto) las desactiva y pide los miembros por REST
+# cuando hacen falta (resolve_member, !inactivos); CACHE_PROFILE=full deja los valores de discord.py.
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "lean").lower()  # lean | full
+LEAN_CACHE = CACHE_PROFILE != "full"
+MEMBER_CHUNKING = os.getenv("MEMBER_CHUNKING", "off" if LEAN_CACHE else "startup").lower()  # startup | lazy | off
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "none" if LEAN_CACHE else "voice,joined")  # flags de MemberCacheFlags
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "0" if LEAN_CACHE else "1000")) or None
+
+def member_cache_flags() -> discord.MemberCacheFlags:
+    flags = discord.MemberCacheFlags.none()
+    for name in MEMBER_CACHE.split(","):
+        name = name.strip().lower()
+        if name and name != "none":
+            setattr(flags, name, True)
+    if MEMBER_CHUNKING != "off":
+        flags.joined = True  # lo que llega por chunk tiene que quedarse en caché
+    return flags
+
+class FembBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    web_runner: Optional[web.AppRunner] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.event_names: set = set()  # handlers registrados con @bot.event (los envuelve el profiler)
+
+    def event(self, coro):
+        self.event_names.add(coro.__name__)
+        return super().event(coro)
+
+    async def invoke(self, ctx: commands.Context):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        # todo el REST del comando (y de las tareas que lance) sale con su prioridad
+        with rest_priority_scope(COMMAND_PRIORITY.get(ctx.command.qualified_name, PRIO_MODERATION)):
+            if not profiler.enabled:
+                return await super().invoke(ctx)
+            started = time.perf_counter()
+            try:
+                await super().invoke(ctx)
+            finally:
+                profiler.record(f"!{ctx.command.qualified_name}", time.perf_counter() - started)
+
+    async def setup_hook(self):
+        request = self.http.request
+
+        async def scheduled_request(route, **kwargs):
+            return await rest_scheduler.run(lambda: request(route, **kwargs), guild_id=route_guild_id(route))
+
+        self.http.request = scheduled_request
+        try:
+            self.web_runner = await start_web()
+        except OSError:
+            logger.exception("No se pudo abrir el puerto %s para el health check", PORT)
+        spawn(sample_loop_lag())
+        if PROFILING_ENABLED:
+            profiler.enable(self)
+        # Discloud reinicia con SIGTERM: cerrar limpio para que flush_all() guarde todo
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+        housekeeping.start()
+
+    async def close(self):
+        try:
+            await log_queue.flush_all()
+        except Exception:
+            logger.exception("Error enviando logs pendientes al cerrar")
+        await super().close()
+        if self.web_runner:
+            await self.web_runner.cleanup()
+            self.web_runner = None
+        try:
+            await flush_all()
+        except Exception:
+            logger.exception("Error guardando datos al cerrar")
+
+COMMAND_PREFIX = "!"
+shard_options = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARDED else {}
+bot = FembBot(command_prefix=COMMAND_PREFIX, intents=intents, help_command=None, http_trace=http_trace(),
+              chunk_guilds_at_startup=MEMBER_CHUNKING == "startup", member_cache_flags=member_cache_flags(),
+              max_messages=MAX_MESSAGES, **shard_options)
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    logger.info("Shard %s listo", shard_id)
+
+# ---------------- Utilities (stylize / names) ----------------
+NORMAL = "abcdefghijklmnopqrstuvwxyz"
+STYLIZED = "𝙖𝙗𝙘𝙙𝙚𝙛𝙜𝙝𝙞𝙟𝙠𝙡𝙢𝙣𝙤𝙥𝙦𝙧𝙨𝙩𝙪𝙫𝙬𝙭𝙮𝙯"
+TRANSL = {ord(n): s for n, s in zip(NORMAL, STYLIZED)}
+
+# Tabla para str.translate: mayúsculas y minúsculas ASCII (y el signo Kelvin, cuyo lower() es "k")
+# van a su letra estilizada; el resto de caracteres se deja igual.
+STYLE_TABLE = {**TRANSL,
+               **{ord(n.upper()): s for n, s in zip(NORMAL, STYLIZED)},
+               0x212A: TRANSL[ord("k")]}
+_EMOJI_PREFIX_RE = re.compile(r"^(?P<emoji>[\U0001F000-\U0001FFFF\u2600-\u26FF\u2700-\u27BF])(?:[・\-\s]?)(?P<rest>.+)$")
+_NAME_SEP_RE = re.compile(r"[・\-\s]")
+# Los mismos nombres de canal se decoran/normalizan una y otra vez (estructura, tickets, !ticket/!close):
+# caché LRU acotada para no repetir regex ni NFKD.
+NAME_CACHE_SIZE = 4096
+
+def stylize(text: str) -> str:
+    return text.translate(STYLE_TABLE)
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def decorate_name(name: str, fallback_emoji: str = DEFAULT_PREFIX_EMOJI) -> str:
+    if name.startswith("「") and "」" in name:
+        return name
+    # intentar extraer emoji al inicio
+    m = _EMOJI_PREFIX_RE.match(name)
+    if m:
+        emoji = m.group("emoji")
+        rest = m.group("rest").strip()
+    else:
+        parts = _NAME_SEP_RE.split(name, maxsplit=1)
+        if len(parts) == 2 and len(parts[0]) <= 2:
+            emoji = parts[0]
+            rest = parts[1]
+        else:
+            emoji = fallback_emoji
+            rest = name
+    styled = stylize(rest)
+    return f"「{emoji}」{styled}"
+
+def strip_decor(name: str) -> str:
+    if name.startswith("「") and "」" in name:
+        return name.split("」", 1)[1]
+    return name
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_name_for_matching(name: str) -> str:
+    if not name:
+        return ""
+    name = name.replace("「", "").replace("」", "").strip().lower()
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.replace("—", "-").replace("–", "-")
+    return name
+
+def is_ticket_channel_name(name: str) -> bool:
+    return "ticket" in normalize_name_for_matching(name)
+
+# ---------------- Structure & tickets ----------------
+STRUCTURE = [
+    {
+        "category_name": "🏠・INFORMACIÓN",
+        "text_channels": [
+            "👋・bienvenida", "📜・reglas", "📢・anuncios", "🛠️・actualizaciones", "🎭・roles-info", "❓・faq"
+        ],
+        "voice_channels": []
+    },
+    {
+        "category_name": "💬・COMUNIDAD",
+        "text_channels": [
+            "💬・chat-general", "🤣・memes", "🙋・presentaciones", "📸・clips-y-fotos", "🎨・arte-de-la-comunidad", "❔・preguntas"
+        ],
+        "voice_channels": ["🔊・General", "🗣️・Charla-casual", "🎵・Música-(con-bot)", "🎮・Juegos"]
+    },
+    {
+        "category_name": "🎮・JUEGO",
+        "text_channels": [
+            "📰・game-news", "📘・tutoriales", "⚔️・builds-y-estrategias", "🐞・reportes-bugs", "💡・sugerencias", "🤝・matchmaking", "🤖・comandos-bot"
+        ],
+        "voice_channels": []
+    },
+    {
+        "category_name": "🛠️・STAFF",
+        "text_channels": [
+            "🛠️・staff-chat", "🚨・reportes-internos", "🔨・ban-logs", "⚠️・warn-logs", "🧠・ideas-staff", "📌・pendientes", "🎫・soporte-tickets"
+        ],
+        "voice_channels": []
+    },
+    {
+        "category_name": "🎟️・TICKETS",
+        "text_channels": [
+            "🎟️・ticket-ayuda-general", "🚫・ticket-reportar-jugador", "🎮・ticket-problemas-con-el-juego",
+            "🖥️・ticket-problemas-técnicos", "⚖️・ticket-apelar-sanción", "💰・ticket-donaciones"
+        ],
+        "voice_channels": []
+    },
+    {
+        "category_name": "🎉・EVENTOS",
+        "text_channels": ["🎉・eventos-activos", "🏆・ganadores", "🎁・giveaways"],
+        "voice_channels": []
+    },
+    {
+        "category_name": "🤖・BOTS",
+        "text_channels": ["📡・comandos", "📈・niveles", "🗂️・logs-bot"],
+        "voice_channels": []
+    },
+    {
+        "category_name": "🧾・ARCHIVOS-Y-RECURSOS",
+        "text_channels": ["⬇️・descargas", "📄・documentación", "📜・historial-del-proyecto",
+                          "📚・lore-cakeverso", "🚧・progreso-del-juego", "👀・sneak-peeks", "🗳️・votaciones"],
+        "voice_channels": []
+    }
+]
+
+TICKET_TEMPLATES: Dict[str, Dict] = {
+    "ticket-ayuda-general": {
+        "title": "🆘 Ayuda General",
+        "description": "Antes de abrir un ticket asegúrate de que tu duda no esté respondida en los canales informativos.\nProporciona información clara para que podamos ayudarte rápidamente.",
+        "fields": [("📄 Información necesaria", "• Explica tu duda o problema de forma detallada.\n• Adjunta capturas, ejemplos o contexto relevante.\n• Indica si probaste alguna solución previamente.")],
+        "footer": "⚠️ Nota: El uso indebido del sistema de tickets puede causar advertencias o sanciones.",
+        "reaction": "🎟️"
+    },
+    "ticket-reportar-jugador": {
+        "title": "🚫 Reportar a un Usuario",
+        "description": "Antes de reportar, asegúrate de que realmente se haya incumplido una norma del servidor o de Discord.\nNo incluyas pruebas falsificadas o podrás recibir una sanción.",
+        "fields": [
+            ("📄 Información necesaria", "• Tag / ID / usuario a reportar.\n• Canal donde ocurrió el incidente.\n• Razón del reporte.\n• Pruebas (capturas, vídeos, grabaciones de voz)."),
+            ("🆔 Obtener ID", "Activa el modo desarrollador en Ajustes > Avanzado > Modo Desarrollador.\nLuego clic derecho en el usuario → Copiar ID.")
+        ],
+        "footer": None,
+        "reaction": "🚫"
+    },
+    "ticket-problemas-con-el-juego": {
+        "title": "🎮 Problemas con el Juego",
+        "description": "Si tienes inconvenientes dentro del juego, aporta toda la información posible para acelerar la asistencia.",
+        "fields": [("📄 Información necesaria", "• Describe el problema con detalle (error, bug, crasheos).\n• Nombre del juego.\n• Plataforma (PC, móvil, consola).\n• Capturas, grabaciones o mensajes de error.\n• Pasos realizados antes del fallo.")],
+        "footer": "ℹ️ Nota: Si el problema es general y ya está siendo investigado, te informaremos en el ticket.",
+        "reaction": "🎮"
+    },
+    "ticket-problemas-técnicos": {
+        "title": "🖥️ Problemas Técnicos",
+        "description": "Usa este ticket para problemas con Discord o con el juego.",
+        "fields": [("📄 Información necesaria", "• Explica tu problema detalladamente.\n• Adjunta capturas o vídeos del problema.\n• Acciones que ya intentaste.")],
+        "footer": None,
+        "reaction": "🖥️"
+    },
+    "ticket-apelar-sanción": {
+        "title": "⚖️ Apelar Sanción",
+        "description": "Proporciona información real y completa. Manipular datos resultará en apelación rechazada.",
+        "fields": [("📄 Información necesaria", "• Tu Tag / ID de usuario.\n• Tipo de sanción (mute, ban, warn…).\n• Fecha aproximada.\n• Motivo por el cual crees que la sanción fue injusta.\n• Pruebas o contexto adicional.")],
+        "footer": "⚠️ Importante: No abras múltiples apelaciones por el mismo caso.",
+        "reaction": "⚖️"
+    },
+    "ticket-donaciones": {
+        "title": "💰 Donaciones",
+        "description": "Usa este ticket para resolver dudas o aportar a las donaciones del proyecto.",
+        "fields": [("📄 Información necesaria", "• Método de donación que usarás o usaste.\n• Cantidad donada o a donar.\n• Captura del comprobante (si aplica).\n• Dudas sobre beneficios o roles.")],
+        "footer": "💎 Nota: Las donaciones son voluntarias y no reembolsables.",
+        "reaction": "💰"
+    }
+}
+
+# ---------------- Embed templates (precompilados) ----------------
+# Los embeds estáticos (ayuda, reglas, paneles de tickets) se construyen una sola vez al arrancar y
+# se envían tal cual: send() sólo los serializa, así que la misma instancia sirve para todos los
+# envíos (no mutarlos; usar .copy() si hiciera falta). Los que cambian en cada llamada (!banana,
+# interacciones) guardan sólo los kwargs fijos y rellenan descripción/imagen al enviar.
+def embed_template(title: Optional[str] = None, description: Optional[str] = None, color: Optional[int] = None,
+                   fields: Iterable[Tuple[str, str]] = (), footer: Optional[str] = None,
+                   image: Optional[str] = None) -> discord.Embed:
+    embed = discord.Embed(title=title, description=description, color=color)
+    for name, value in fields:
+        embed.add_field(name=name, value=value, inline=False)
+    if footer:
+        embed.set_footer(text=footer)
+    if image:
+        embed.set_image(url=image)
+    return embed
+
+PANEL_EMBEDS: Dict[str, discord.Embed] = {
+    key: embed_template(t["title"], t["description"], 0x99ccff,
+                        fields=[*t["fields"], ("\u200b", "🔽 **PARA ABRIR UN TICKET REACCIONA**")],
+                        footer=t["footer"])
+    for key, t in TICKET_TEMPLATES.items()
+}
+
+HELP_EMBED = embed_template("Femb-Paradise Bot — Ayuda", "Comandos disponibles y descripción breve.", 0xffaacc, fields=[
+    ("!Femb-Paradise", "(Admin) Reconstruir TODO el servidor con la estructura predeterminada. Requiere confirmación (salvo SuperUser)."),
+    ("!ticket", "Crear un ticket manualmente (si estás en un canal de tickets)."),
+    ("!close", "Cerrar el ticket actual (Staff, creador o SuperUser)."),
+    ("!nuke-unlock", "(Dueño/SuperUser) Restaurar los permisos quitados por el Anti-Nuke y rearmarlo."),
+    ("!profiling on|off|stats|reset", "(SuperUser) Medir la latencia de handlers y comandos (p50/p95/p99)."),
+    ("Comandos extra", "Reglas, 8ball, kiss, hug, slap, informacion, server, embed, encuesta, warn(s)."),
+])
+
+REGLAS_EMBED = embed_template(
+    "📜 Reglas del Servidor",
+    (
+        "ㅤ〔 **Reglas a tener en cuenta** 〕ㅤㅤㅤㅤ\n\n"
+        "• **1)** El respeto es obligatorio. No se toleran faltas de respeto.\n"
+        "• **2)** Ayuda a otros usuarios cuando sea necesario.\n"
+        "• **3)** Evita spam y flood.\n"
+        "• **4)** Prohibido contenido NSFW o gore.\n"
+        "• **5)** No se permite publicidad sin autorización.\n"
+        "• **6)** No uses nombres o fotos ofensivas.\n"
+        "• **7)** Raids están totalmente prohibidos.\n"
+        "• **8)** Prohibidas amenazas de cualquier tipo.\n"
+        "• **9)** No hables mal de otros clanes o comunidades.\n"
+        "• **10)** No divulgues información personal.\n"
+        "• **11)** Prohibido contenido ilegal, hacks o software malicioso.\n"
+        "• **12)** Usa cada canal correctamente.\n"
+        "• **13)** No hagas menciones innecesarias.\n"
+        "• **14)** No se permite lenguaje tóxico o discriminatorio.\n"
+        "• **15)** Prohibido usar hacks o exploits.\n"
+        "• **16)** No suplantes a otros usuarios o staff.\n\n"
+        "➜ **TENER EN CUENTA**\n"
+        "• El staff puede sancionar según gravedad.\n"
+        "• Los canales tienen mensajes anclados.\n"
+        "• Puedes acudir al equipo de staff.\n"
+        "• Usa el sentido común.\n\n"
+        "Si has leído todas las reglas, reacciona con **✅** para confirmar que las aceptas."
+    ),
+    0xffaa00,
+    image="https://i.pinimg.com/1200x/49/02/b2/4902b247b3797864c192454de45af835.jpg",
+)
+
+BANANA_EMBED = {"title": "🍌 Medidor de Banana", "color": 0xffd500}
+BANANA_IMAGE = "https://th.bing.com/th/id/OIP.ncj3Jg9FoK27NzLNvS31eAHaNI?w=115&h=180&c=7&r=0&o=7&pid=1.7&rm=3"
+
+# ---------------- Persistence helpers ----------------
+# Toda la E/S de disco pasa por un único hilo (PERSIST_EXECUTOR) para no bloquear el event loop.
+# Los JSON se guardan con debounce: varias modificaciones seguidas = una sola escritura atómica.
+PERSIST_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+PERSISTED_FILES: List["JsonFile"] = []
+
+class SharedStore:
+    # STATE_BACKEND=sqlite: los JsonFile se guardan como filas (fichero, clave) en un SQLite WAL que
+    # pueden usar a la vez varios procesos de shards. Cada fila es una entrada por guild/canal/mensaje,
+    # y cada proceso sólo reescribe las filas que ha cambiado (las de sus propios guilds).
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS kv (file TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                          "PRIMARY KEY (file, key))")
+        self.conn.commit()
+
+    def load(self, file: str) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT key, value FROM kv WHERE file = ?", (file,)).fetchall())
+
+    def write(self, file: str, upserts: Dict[str, str], deletes: List[str]):
+        with self.conn:
+            self.conn.executemany("INSERT INTO kv (file, key, value) VALUES (?, ?, ?) "
+                                  "ON CONFLICT (file, key) DO UPDATE SET value = excluded.value",
+                                  [(file, k, v) for k, v in upserts.items()])
+            self.conn.executemany("DELETE FROM kv WHERE file = ? AND key = ?", [(file, k) for k in deletes])
+
+shared_store = SharedStore(SHARED_STATE_DB) if STATE_BACKEND == "sqlite" else None
+
+async def run_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(PERSIST_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+def atomic_write_text(path: str, payload: str):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)  # p. ej. transcripts/ antes del primer !close
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class JsonFile:
+    # depth: niveles del dict que se guardan como filas separadas con el backend sqlite
+    def __init__(self, path: str, default=dict, delay: float = PERSIST_DEBOUNCE, depth: int = 1):
+        self.path = path
+        self.delay = delay
+        self.depth = depth
+        self._dirty = False
+        self._rows: Dict[str, str] = {}  # última versión guardada de cada fila (backend sqlite)
+        self.data = self._load(default)
+        self._flush_task: Optional[asyncio.Task] = None
+        PERSISTED_FILES.append(self)
+
+    def _load(self, default):
+        # sólo se usa al arrancar (antes de conectar), así que leer en síncrono está bien
+        if shared_store is not None:
+            self._rows = shared_store.load(self.path)
+            if self._rows:
+                return self._unflatten(self._rows)
+            # store vacío: se importa el JSON local (si existe) en el primer flush
+            self._dirty = os.path.exists(self.path)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                logger.exception("No se pudo leer %s", self.path)
+        return default()
+
+    def mark_dirty(self):
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # sin loop todavía: se guardará en el próximo flush
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # mientras queden cambios: los hechos durante una escritura (o tras un fallo) se guardan en
+        # otra vuelta, porque mark_dirty no programa nada mientras esta tarea sigue viva
+        while self._dirty:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    def _flatten(self) -> Dict[str, str]:
+        rows: Dict[str, str] = {}
+
+        def walk(node: Dict, prefix: str, level: int):
+            for key, value in node.items():
+                if level < self.depth and isinstance(value, dict):
+                    walk(value, f"{prefix}{key}/", level + 1)
+                else:
+                    rows[f"{prefix}{key}"] = json.dumps(value, ensure_ascii=False)
+
+        walk(self.data, "", 1)
+        return rows
+
+    def _unflatten(self, rows: Dict[str, str]) -> Dict:
+        data: Dict = {}
+        for key, value in rows.items():
+            *parents, leaf = key.split("/", self.depth - 1)
+            node = data
+            for part in parents:
+                node = node.setdefault(part, {})
+            node[leaf] = json.loads(value)
+        return data
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        # serializar aquí (en el loop) da una instantánea consistente; sólo la escritura va al hilo
+        started = time.perf_counter()
+        try:
+            if shared_store is not None:
+                rows = self._flatten()
+                upserts = {k: v for k, v in rows.items() if self._rows.get(k) != v}
+                deletes = [k for k in self._rows if k not in rows]
+                if upserts or deletes:
+                    await run_io(shared_store.write, self.path, upserts, deletes)
+                self._rows = rows
+            else:
+                payload = json.dumps(self.data, ensure_ascii=False)
+                await run_io(atomic_write_text, self.path, payload)
+            metrics.observe("persist_flush", time.perf_counter() - started)
+        except Exception:
+            self._dirty = True
+            logger.exception("No se pudo guardar %s", self.path)
+
+async def flush_all():
+    for jf in PERSISTED_FILES:
+        await jf.flush()
+    await run_io(warn_store.checkpoint)
+
+ticket_messages = JsonFile(TICKET_MESSAGES_FILE)
+ticket_message_map: Dict[str, str] = ticket_messages.data
+
+# Warns: SQLite en modo WAL, indexado por (guild, usuario). Cada warn es una fila,
+# así que añadir/quitar sólo escribe ese registro en vez de reescribir todo el JSON.
+LEGACY_GUILD_ID = 0  # warns importados de warns.json (antes eran globales, sin guild)
+
+class LegacyWarnError(Exception):
+    pass
+
+class WarnStore:
+    def __init__(self, path: str, legacy_path: Optional[str] = None, legacy_guild_id: Optional[int] = None):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS warns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                moderador INTEGER NOT NULL,
+                razon TEXT NOT NULL,
+                fecha TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_warns_user ON warns (user_id, guild_id, id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.conn.commit()
+        if legacy_path:
+            self._import_legacy(legacy_path, legacy_guild_id or LEGACY_GUILD_ID)
+
+    def _import_legacy(self, legacy_path: str, guild_id: int):
+        done = self.conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+        if done or not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception:
+            logger.exception("No se pudo leer %s para migrar", legacy_path)
+            return
+        with self.conn:
+            for uid, entries in legacy.items():
+                self.conn.executemany(
+                    "INSERT INTO warns (guild_id, user_id, moderador, razon, fecha) VALUES (?, ?, ?, ?, ?)",
+                    [(guild_id, int(uid), w["moderador"], w["razon"], w["fecha"]) for w in entries])
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(int(time.time())),))
+        logger.info("Migrados warns de %s a SQLite (%d usuarios)", legacy_path, len(legacy))
+
+    def list(self, guild_id: int, user_id: int) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT moderador, razon, fecha FROM warns WHERE user_id = ? AND guild_id IN (?, ?) ORDER BY id",
+            (user_id, guild_id, LEGACY_GUILD_ID)).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self, guild_id: int, user_id: int) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM warns WHERE user_id = ? AND guild_id IN (?, ?)",
+            (user_id, guild_id, LEGACY_GUILD_ID)).fetchone()[0]
+
+    def add(self, guild_id: int, user_id: int, entry: Dict) -> int:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO warns (guild_id, user_id, moderador, razon, fecha) VALUES (?, ?, ?, ?, ?)",
+                (guild_id, user_id, entry["moderador"], entry["razon"], entry["fecha"]))
+        return self.count(guild_id, user_id)
+
+    def remove(self, guild_id: int, user_id: int, position: int, allow_legacy: bool = False) -> Optional[Dict]:
+        # position es 1-based, igual que el ID que ve el usuario en !warns. Los warns sin guild se
+        # ven en todos los servidores, así que no se dejan borrar desde cualquiera de ellos.
+        row = self.conn.execute(
+            "SELECT id, guild_id, moderador, razon, fecha FROM warns WHERE user_id = ? AND guild_id IN (?, ?) "
+            "ORDER BY id LIMIT 1 OFFSET ?",
+            (user_id, guild_id, LEGACY_GUILD_ID, position - 1)).fetchone()
+        if row is None:
+            return None
+        if row["guild_id"] == LEGACY_GUILD_ID and not allow_legacy:
+            raise LegacyWarnError("Ese warn es anterior a los warns por servidor; sólo el SuperUser puede quitarlo.")
+        with self.conn:
+            self.conn.execute("DELETE FROM warns WHERE id = ?", (row["id"],))
+        return {"moderador": row["moderador"], "razon": row["razon"], "fecha": row["fecha"]}
+
+    def adopt_legacy(self, guild_id: int) -> int:
+        # asigna los warns sin guild a guild_id; devuelve cuántos había
+        with self.conn:
+            return self.conn.execute("UPDATE warns SET guild_id = ? WHERE guild_id = ?",
+                                     (guild_id, LEGACY_GUILD_ID)).rowcount
+
+    def checkpoint(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+warn_store = WarnStore(WARNS_DB_FILE, legacy_path=WARNS_FILE, legacy_guild_id=WARNS_LEGACY_GUILD_ID)
+
+# ---------------- Logging helper ----------------
+# Los logs no se envían en el camino del comando: se encolan por guild y una tarea los manda en
+# lotes (hasta 10 embeds por mensaje) cada LOG_FLUSH_INTERVAL segundos o en cuanto hay un lote
+# lleno. Si la cola de un guild se satura (spam, nuke) los logs nuevos se agregan por título en
+# un resumen en vez de gastar más llamadas REST.
+LOG_BATCH_SIZE = 10  # embeds por mensaje (límite de Discord)
+LOG_BATCH_CHARS = 5500  # límite real 6000 caracteres entre todos los embeds del mensaje
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "3"))
+LOG_QUEUE_LIMIT = int(os.getenv("LOG_QUEUE_LIMIT", "50"))  # embeds pendientes por guild
+
+# guild_id -> id del canal de logs (o None si no hay); se invalida con los eventos de canales
+log_channel_cache: Dict[int, Optional[int]] = {}
+
+def get_log_channel(guild: discord.Guild) -> Optional[discord.TextChannel]:
+    # Prioriza ID si fue configurado
+    if LOG_CHANNEL_ID:
+        ch = guild.get_channel(LOG_CHANNEL_ID)
+        if isinstance(ch, discord.TextChannel):
+            return ch
+    if guild.id in log_channel_cache:
+        channel_id = log_channel_cache[guild.id]
+        if channel_id is None:
+            return None
+        ch = guild.get_channel(channel_id)
+        if isinstance(ch, discord.TextChannel):
+            return ch
+    # Buscar por nombre (una vez por guild)
+    ch = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME)
+    log_channel_cache[guild.id] = ch.id if ch else None
+    return ch
+
+def invalidate_log_channel(channel: discord.abc.GuildChannel):
+    cached = log_channel_cache.get(channel.guild.id)
+    if cached == channel.id or (cached is None and channel.name == LOG_CHANNEL_NAME):
+        log_channel_cache.pop(channel.guild.id, None)
+
+class LogQueue:
+    def __init__(self, batch: int, interval: float, limit: int):
+        self.batch = batch
+        self.interval = interval
+        self.limit = limit
+        self.pending: Dict[int, deque] = {}
+        self.aggregated: Dict[int, Dict[str, int]] = {}  # guild -> título -> logs descartados
+        self.wakeups: Dict[int, asyncio.Event] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    def push(self, guild: discord.Guild, embed: discord.Embed, urgent: bool = False):
+        queue = self.pending.setdefault(guild.id, deque())
+        if len(queue) >= self.limit and not urgent:
+            counts = self.aggregated.setdefault(guild.id, {})
+            counts[embed.title or "Log"] = counts.get(embed.title or "Log", 0) + 1
+            metrics.inc("log_aggregated_total")
+        elif urgent:
+            queue.appendleft(embed)  # alertas (anti-nuke) por delante de lo acumulado
+            metrics.inc("log_queued_total")
+        else:
+            queue.append(embed)
+            metrics.inc("log_queued_total")
+        wakeup = self.wakeups.setdefault(guild.id, asyncio.Event())
+        if urgent or len(queue) >= self.batch:
+            wakeup.set()
+        task = self.tasks.get(guild.id)
+        if task is None or task.done():
+            self.tasks[guild.id] = spawn(self._drain(guild))
+
+    def _summary(self, counts: Dict[str, int]) -> discord.Embed:
+        lines = [f"• {title}: **{n}**" for title, n in sorted(counts.items(), key=lambda kv: -kv[1])]
+        return discord.Embed(title="📦 Logs agregados",
+                             description=("Demasiados eventos a la vez; no se enviaron uno a uno:\n" + "\n".join(lines))[:3900],
+                             color=0xffaa00)
+
+    def _next_batch(self, guild_id: int) -> List[discord.Embed]:
+        queue = self.pending.get(guild_id) or deque()
+        batch: List[discord.Embed] = []
+        size = 0
+        while queue and len(batch) < self.batch and (not batch or size + len(queue[0]) <= LOG_BATCH_CHARS):
+            embed = queue.popleft()
+            batch.append(embed)
+            size += len(embed)
+        counts = self.aggregated.get(guild_id)
+        if counts:
+            summary = self._summary(counts)
+            # sin sitio en este lote: el resumen espera al siguiente
+            if len(batch) < self.batch and size + len(summary) <= LOG_BATCH_CHARS:
+                batch.append(summary)
+                del self.aggregated[guild_id]
+        return batch
+
+    async def _drain(self, guild: discord.Guild):
+        wakeup = self.wakeups[guild.id]
+        while self.pending.get(guild.id) or self.aggregated.get(guild.id):
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            await self._send(guild, self._next_batch(guild.id))
+
+    async def _send(self, guild: discord.Guild, batch: List[discord.Embed]):
+        if not batch:
+            return
+        target = get_log_channel(guild)
+        if target is None:
+            for embed in batch:
+                logger.info(f"[LOG NO CHANNEL] {guild.name}: {embed.title} - {embed.description}")
+            return
+        try:
+            await with_retries(lambda: target.send(embeds=batch), priority=PRIO_LOGGING)
+            metrics.inc("log_messages_sent_total")
+        except Exception:
+            metrics.inc("log_send_failed_total")
+            logger.exception("Error al enviar log")
+
+    def drop_guild(self, guild_id: int):
+        # lo pendiente de un guild del que ya no somos miembros no se puede enviar
+        self.pending.pop(guild_id, None)
+        self.aggregated.pop(guild_id, None)
+        self.wakeups.pop(guild_id, None)
+        task = self.tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def flush_all(self):
+        # al cerrar: vaciar lo pendiente sin esperar al intervalo
+        for guild_id in list(self.pending):
+            guild = bot.get_guild(guild_id)
+            while guild and (self.pending.get(guild_id) or self.aggregated.get(guild_id)):
+                await self._send(guild, self._next_batch(guild_id))
+
+log_queue = LogQueue(LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_LIMIT)
+
+def log_action(guild: discord.Guild, title: str, description: str, color: int = 0x00ffcc, urgent: bool = False):
+    # no bloquea: encola el embed y vuelve enseguida
+    embed = discord.Embed(title=title, description=description, color=color)
+    embed.set_footer(text=f"Servidor: {guild.name} • ID: {guild.id}")
+    embed.timestamp = discord.utils.utcnow()
+    log_queue.push(guild, embed, urgent)
+
+# ---------------- Paginator ----------------
+# Las páginas se generan bajo demanda desde un iterador: se envía la primera enseguida y el resto
+# sólo se construye si alguien pulsa ▶️. Así un listado enorme cuesta un mensaje, no un payload gigante.
+PAGINATOR_TIMEOUT = 180
+EMBED_DESC_BUDGET = 3900   # límite real 4096
+EMBED_TOTAL_BUDGET = 5500  # límite real 6000 por embed
+EMBED_MAX_FIELDS = 25
+FIELD_VALUE_LIMIT = 1024
+
+def text_pages(items: Iterable[str], title: str, color: int, header: str = "", sep: str = ", ") -> Iterator[discord.Embed]:
+    chunk: List[str] = []
+    size = len(header)
+    for item in items:
+        if chunk and size + len(sep) + len(item) > EMBED_DESC_BUDGET:
+            yield discord.Embed(title=title, description=header + sep.join(chunk), color=color)
+            chunk, size = [], len(header)
+        chunk.append(item)
+        size += len(sep) + len(item)
+    if chunk:
+        yield discord.Embed(title=title, description=header + sep.join(chunk), color=color)
+
+def field_pages(fields: Iterable[Tuple[str, str]], title: str, color: int, per_page: int = 10) -> Iterator[discord.Embed]:
+    embed = None
+    size = 0
+    for name, value in fields:
+        if len(value) > FIELD_VALUE_LIMIT:
+            value = value[:FIELD_VALUE_LIMIT - 1] + "…"
+        if embed is not None and (len(embed.fields) >= min(per_page, EMBED_MAX_FIELDS)
+                                  or size + len(name) + len(value) > EMBED_TOTAL_BUDGET):
+            yield embed
+            embed = None
+        if embed is None:
+            embed = discord.Embed(title=title, color=color)
+            size = len(title)
+        embed.add_field(name=name, value=value, inline=False)
+        size += len(name) + len(value)
+    if embed is not None:
+        yield embed
+
+class Paginator(discord.ui.View):
+    def __init__(self, pages: Iterable[discord.Embed], author_id: int):
+        super().__init__(timeout=PAGINATOR_TIMEOUT)
+        self._source = iter(pages)
+        self._pages: List[discord.Embed] = []
+        self._exhausted = False
+        self.index = 0
+        self.author_id = author_id
+        self.message: Optional[discord.Message] = None
+
+    def _page(self, index: int) -> Optional[discord.Embed]:
+        while len(self._pages) <= index and not self._exhausted:
+            try:
+                self._pages.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+        return self._pages[index] if index < len(self._pages) else None
+
+    def _render(self) -> discord.Embed:
+        # sólo se mira una página por delante para saber si ▶️ tiene sentido
+        has_next = self._page(self.index + 1) is not None
+        self.prev_button.disabled = self.index == 0
+        self.next_button.disabled = not has_next
+        embed = self._pages[self.index]
+        total = f"/{len(self._pages)}" if self._exhausted else ""
+        embed.set_footer(text=f"Página {self.index + 1}{total}")
+        return embed
+
+    async def start(self, ctx: commands.Context) -> Optional[discord.Message]:
+        if self._page(0) is None:
+            return None
+        embed = self._render()
+        if self.next_button.disabled:
+            # una sola página: sin botones
+            self.stop()
+            self.message = await ctx.send(embed=embed)
+        else:
+            self.message = await ctx.send(embed=embed, view=self)
+        return self.message
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Sólo quien usó el comando puede cambiar de página.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        await interaction.response.edit_message(embed=self._render(), view=self)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._page(self.index + 1) is not None:
+            self.index += 1
+        await interaction.response.edit_message(embed=self._render(), view=self)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except Exception:
+                pass
+
+# ---------------- REST scheduler (prioridades) ----------------
+# Todas las peticiones REST de discord.py pasan por aquí (setup_hook envuelve bot.http.request).
+# Cada petición hereda la prioridad de quien la lanza (rest_priority): seguridad > moderación >
+# tickets > logs > diversión. El presupuesto global (REST_RATE peticiones/s, por debajo del límite
+# global de Discord) se reparte en ese orden y, dentro de cada prioridad, por turnos entre guilds.
+# La reserva es escalonada: cada prioridad deja libres huecos (y fichas) para las de encima
+# (moderación 1, tickets 2, logs y diversión REST_RESERVED), así que un ban o el bloqueo del
+# Anti-Nuke siempre tienen sitio aunque un raid llene la cola de mutes; con el presupuesto justo,
+# la diversión se descarta.
+PRIO_SECURITY, PRIO_MODERATION, PRIO_TICKETS, PRIO_LOGGING, PRIO_FUN = range(5)
+PRIORITY_NAMES = ("security", "moderation", "tickets", "logging", "fun")
+REST_RATE = float(os.getenv("REST_RATE", "45"))  # peticiones/s para todo el token (Discord corta en 50)
+if SHARD_IDS:
+    # el límite global es por token: cada proceso se queda con la parte de sus shards
+    REST_RATE = REST_RATE * len(SHARD_IDS) / SHARD_COUNT
+REST_MAX_INFLIGHT = int(os.getenv("REST_MAX_INFLIGHT", "16"))
+REST_RESERVED = int(os.getenv("REST_RESERVED", "4"))     # huecos (y fichas) que logs/diversión no tocan (mín. 2)
+REST_SHED_QUEUE = int(os.getenv("REST_SHED_QUEUE", "50"))  # diversión en cola a partir de la cual se descarta
+REST_SHED_WAIT = float(os.getenv("REST_SHED_WAIT", "10"))  # seg. máximos de espera para diversión
+REST_PRESSURE_WINDOW = 5.0  # seg. tras un 429 en los que la diversión no espera: se descarta
+
+rest_priority: contextvars.ContextVar = contextvars.ContextVar("rest_priority", default=PRIO_MODERATION)
+
+@contextlib.contextmanager
+def rest_priority_scope(priority: int):
+    token = rest_priority.set(priority)
+    try:
+        yield
+    finally:
+        rest_priority.reset(token)
+
+class RestShed(Exception):
+    # petición de baja prioridad descartada por falta de presupuesto
+    pass
+
+class RestScheduler:
+    def __init__(self, rate: float, max_inflight: int, reserved: int):
+        self.rate = rate
+        self.max_inflight = max_inflight
+        self.reserved = max(reserved, PRIO_TICKETS)
+        # huecos que deja libres cada prioridad: seguridad ninguno y el resto al menos uno
+        self.headroom = [min(p, self.reserved) if p < PRIO_LOGGING else self.reserved for p in range(len(PRIORITY_NAMES))]
+        self.burst = max(rate, self.reserved + 1)  # fichas acumulables (al menos las de la reserva)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.inflight = 0
+        # por prioridad: guild -> cola de futures; el OrderedDict rota las guilds por turnos
+        self.queues: List[OrderedDict] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self.waiting = [0] * len(PRIORITY_NAMES)
+        self.pressure_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def note_ratelimit(self):
+        self.pressure_until = time.monotonic() + REST_PRESSURE_WINDOW
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _headroom(self, priority: int) -> int:
+        return self.headroom[priority]
+
+    def _can_start(self, priority: int) -> bool:
+        headroom = self._headroom(priority)
+        return self.inflight + headroom < self.max_inflight and self.tokens >= 1 + headroom
+
+    def _start(self):
+        self.inflight += 1
+        self.tokens -= 1
+
+    def _release(self):
+        self.inflight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        self._refill()
+        for priority, queue in enumerate(self.queues):
+            while queue and self._can_start(priority):
+                guild_id, waiters = next(iter(queue.items()))
+                fut = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(guild_id)
+                else:
+                    del queue[guild_id]
+                self.waiting[priority] -= 1
+                if not fut.done():
+                    self._start()
+                    fut.set_result(None)
+            if queue:
+                # lo de menor prioridad espera mientras quede algo más importante en cola
+                self._arm_timer(priority)
+                return
+
+    def _arm_timer(self, priority: int):
+        # sin fichas: volver a repartir cuando se hayan repuesto, aunque no termine ninguna petición
+        # (si lo que falta son huecos, ya repartirá _release al acabar la siguiente)
+        missing = 1 + self._headroom(priority) - self.tokens
+        if self._timer is not None or missing <= 0:
+            return
+        delay = missing / self.rate
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _discard(self, priority: int, guild_id: int, fut: asyncio.Future):
+        waiters = self.queues[priority].get(guild_id)
+        if waiters is None or fut not in waiters:
+            return
+        waiters.remove(fut)
+        self.waiting[priority] -= 1
+        if not waiters:
+            del self.queues[priority][guild_id]
+
+    def queued(self) -> int:
+        return sum(self.waiting)
+
+    async def run(self, factory, priority: Optional[int] = None, guild_id: int = 0):
+        priority = rest_priority.get() if priority is None else priority
+        self._refill()
+        if not any(self.waiting[:priority + 1]) and self._can_start(priority):
+            self._start()
+        else:
+            if priority == PRIO_FUN and (self.waiting[PRIO_FUN] >= REST_SHED_QUEUE or time.monotonic() < self.pressure_until):
+                metrics.inc("rest_shed_total")
+                raise RestShed("presupuesto REST agotado")
+            fut = asyncio.get_running_loop().create_future()
+            self.queues[priority].setdefault(guild_id, deque()).append(fut)
+            self.waiting[priority] += 1
+            self._arm_timer(priority)
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(fut, REST_SHED_WAIT if priority == PRIO_FUN else None)
+            except BaseException as e:
+                if fut.done() and not fut.cancelled():
+                    self._release()  # el hueco llegó a concederse: devolverlo
+                else:
+                    self._discard(priority, guild_id, fut)
+                if isinstance(e, asyncio.TimeoutError):
+                    metrics.inc("rest_shed_total")
+                    raise RestShed("tiempo de espera REST agotado") from None
+                raise
+            metrics.observe(f"rest_wait_{PRIORITY_NAMES[priority]}", time.monotonic() - started)
+        try:
+            return await factory()
+        finally:
+            self._release()
+
+rest_scheduler = RestScheduler(REST_RATE, REST_MAX_INFLIGHT, REST_RESERVED)
+
+def route_guild_id(route) -> int:
+    # guild de la petición para el reparto por turnos; las rutas de canal se resuelven por la caché
+    if route.guild_id:
+        return int(route.guild_id)
+    channel = bot.get_channel(int(route.channel_id)) if route.channel_id else None
+    guild = getattr(channel, "guild", None)
+    return guild.id if guild else 0
+
+# prioridad de cada comando (por nombre); los que no aparecen cuentan como moderación
+COMMAND_PRIORITY: Dict[str, int] = {
+    "nuke-unlock": PRIO_SECURITY,
+    "ticket": PRIO_TICKETS,
+    "close": PRIO_TICKETS,
+    "help": PRIO_FUN,
+    "Reglas": PRIO_FUN,
+    "love": PRIO_FUN,
+    "ship": PRIO_FUN,
+    "banana": PRIO_FUN,
+    "8ball": PRIO_FUN,
+    "informacion": PRIO_FUN,
+    "server": PRIO_FUN,
+    "embed": PRIO_FUN,
+    "encuesta": PRIO_FUN,
+}
+
+# ---------------- REST job engine ----------------
+# Ejecuta operaciones REST en paralelo con un límite de concurrencia por ruta, reintentos con
+# backoff en 429/5xx y progreso opcional. Las dependencias (categoría antes que sus canales,
+# panel antes que su reacción) se expresan con await normales dentro de cada tarea.
+REST_RETRIES = 3
+REBUILD_ROUTE_LIMITS = {
+    "channel_delete": int(os.getenv("REBUILD_DELETE_CONCURRENCY", "6")),
+    "channel_create": int(os.getenv("REBUILD_CREATE_CONCURRENCY", "3")),
+    "message_send": 4,
+    "reaction_add": 4,
+}
+PROGRESS_INTERVAL = 2.0
+
+background_tasks: set = set()
+
+def spawn(coro) -> asyncio.Task:
+    # guarda la referencia para que el GC no se lleve tareas en curso
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def with_retries(factory, attempts: int = REST_RETRIES, priority: Optional[int] = None):
+    # discord.py ya reintenta los 429 internamente; esto cubre lo que se le escapa (429 persistentes y 5xx)
+    for attempt in range(attempts):
+        try:
+            if priority is None:
+                return await factory()
+            with rest_priority_scope(priority):
+                return await factory()
+        except discord.HTTPException as e:
+            if attempt == attempts - 1 or not (e.status == 429 or e.status >= 500):
+                raise
+            await asyncio.sleep(getattr(e, "retry_after", None) or 2 ** attempt)
+
+class ProgressReporter:
+    # edita un mensaje existente como mucho cada PROGRESS_INTERVAL segundos, sin frenar el trabajo
+    def __init__(self, message: Optional[discord.Message], prefix: str):
+        self.message = message
+        self.prefix = prefix
+        self._last = 0.0
+        self._editing = False
+
+    def update(self, done: int, total: int):
+        now = time.monotonic()
+        if not self.message or self._editing or now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        self._editing = True
+        spawn(self._edit(f"{self.prefix} `{done}/{total}`"))
+
+    async def _edit(self, content: str):
+        try:
+            await self.message.edit(content=content)
+        except Exception:
+            pass
+        finally:
+            self._editing = False
+
+    async def finish(self, content: str) -> Optional[discord.Message]:
+        # texto final: espera a la edición en curso para que no lo pise
+        message, self.message = self.message, None
+        while self._editing:
+            await asyncio.sleep(0.05)
+        if message:
+            try:
+                await message.edit(content=content)
+            except Exception:
+                pass
+        return message
+
+class RestRunner:
+    def __init__(self, limits: Dict[str, int], progress: Optional[ProgressReporter] = None, default_limit: int = 2,
+                 priority: Optional[int] = None):
+        self.sems = {route: asyncio.Semaphore(n) for route, n in limits.items()}
+        self.default_limit = default_limit
+        self.priority = priority  # None = la del contexto de quien llama
+        self.progress = progress
+        self.total = 0
+        self.done = 0
+
+    async def run(self, route: str, factory):
+        sem = self.sems.get(route)
+        if sem is None:
+            sem = self.sems[route] = asyncio.Semaphore(self.default_limit)
+        try:
+            async with sem:
+                return await with_retries(factory, priority=self.priority)
+        finally:
+            self.done += 1
+            if self.progress:
+                self.progress.update(self.done, self.total)
+
+# ---------------- Roles cache (Muted / Staff) ----------------
+# (guild_id, nombre) -> role_id (o None si no existe). Se invalida con los eventos de roles,
+# así que buscar el rol Muted deja de ser un recorrido lineal de guild.roles en cada spam.
+MUTED_ROLE_NAME = "Muted"
+OVERWRITE_CONCURRENCY = int(os.getenv("OVERWRITE_CONCURRENCY", "4"))
+
+role_cache: Dict[Tuple[int, str], Optional[int]] = {}
+muted_locks: Dict[int, asyncio.Lock] = {}  # guild -> lock para crear el rol Muted una sola vez
+def cached_role(guild: discord.Guild, name: str) -> Optional[discord.Role]:
+    key = (guild.id, name)
+    if key in role_cache:
+        role_id = role_cache[key]
+        if role_id is None:
+            return None
+        role = guild.get_role(role_id)
+        if role is not None:
+            return role
+    role = discord.utils.get(guild.roles, name=name)
+    role_cache[key] = role.id if role else None
+    return role
+
+def invalidate_role_cache(guild_id: int, *names: str):
+    for name in names:
+        role_cache.pop((guild_id, name), None)
+
+def drop_role_cache(guild_id: int):
+    for key in [k for k in role_cache if k[0] == guild_id]:
+        del role_cache[key]
+    muted_locks.pop(guild_id, None)
+
+async def apply_mute_overwrites(guild: discord.Guild, role: discord.Role):
+    runner = RestRunner({"overwrite": OVERWRITE_CONCURRENCY})
+    # primero los de texto, que es donde se está haciendo spam
+    channels = sorted(guild.channels, key=lambda c: not isinstance(c, discord.TextChannel))
+
+    async def apply(ch):
+        try:
+            await runner.run("overwrite", lambda: ch.set_permissions(role, send_messages=False, add_reactions=False,
+                                                                      reason="Configurar rol Muted"))
+        except Exception:
+            logger.warning("No se pudo configurar Muted en %s", getattr(ch, "name", ch))
+
+    started = time.monotonic()
+    await asyncio.gather(*(apply(ch) for ch in channels))
+    logger.info("Rol Muted configurado en %d canales de %s (%.1fs)", len(channels), guild.name, time.monotonic() - started)
+
+async def get_muted_role(guild: discord.Guild, reason: str = "Crear rol Muted automático") -> discord.Role:
+    role = cached_role(guild, MUTED_ROLE_NAME)
+    if role:
+        return role
+    async with muted_locks.setdefault(guild.id, asyncio.Lock()):
+        # otro spam/!mute pudo crearlo mientras esperábamos
+        role = cached_role(guild, MUTED_ROLE_NAME)
+        if role:
+            return role
+        role = await guild.create_role(name=MUTED_ROLE_NAME, reason=reason)
+        role_cache[(guild.id, MUTED_ROLE_NAME)] = role.id
+    # los overwrites van en segundo plano: quien llama puede mutear ya
+    spawn(apply_mute_overwrites(guild, role))
+    return role
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    invalidate_role_cache(role.guild.id, role.name)
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    invalidate_role_cache(after.guild.id, before.name, after.name)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    invalidate_role_cache(role.guild.id, role.name)
+
+# ---------------- Purge & create ----------------
+REBUILD_REASON = "Creación estructura Femb-Paradise"
+
+def template_key_for(raw: str) -> str:
+    # extraer key original (después del separator ・)
+    if "・" in raw:
+        key = raw.split("・", 1)[1].strip().lower()
+    else:
+        key = re.sub(r"^[^\w]+", "", raw).strip().lower()
+    return key.replace(" ", "-").replace("_", "-")
+
+async def create_with_fallback(runner: RestRunner, create, name: str, **kwargs):
+    try:
+        return await runner.run("channel_create", lambda: create(name, reason=REBUILD_REASON, **kwargs))
+    except Exception:
+        alt = name.replace(" ", "-")[:100]
+        return await runner.run("channel_create", lambda: create(alt, reason=f"{REBUILD_REASON} (fallback)", **kwargs))
+
+async def send_ticket_panel(runner: RestRunner, ch: discord.TextChannel, key: str) -> Optional[discord.Message]:
+    template = TICKET_TEMPLATES[key]
+    try:
+        msg = await runner.run("message_send", lambda: ch.send(embed=PANEL_EMBEDS[key]))
+        await runner.run("reaction_add", lambda: msg.add_reaction(template["reaction"]))
+        ticket_message_map[str(msg.id)] = key
+        ticket_messages.mark_dirty()
+        ticket_registry.register_panel(ch.id, key)
+        return msg
+    except Exception:
+        logger.exception("No se pudo enviar embed en %s", ch.name)
+        return None
+
+# ---------------- Rebuild plan (diff + checkpoints) ----------------
+# STRUCTURE se compila a un plan (categorías, canales y paneles deseados) que se compara con el
+# servidor real: sólo se crea/mueve lo que falta y se borra lo que sobra. Cada paso completado se
+# guarda en rebuild_state.json (guild -> plan key -> id), así que si el bot se reinicia a medias,
+# volver a lanzar !Femb-Paradise continúa donde se quedó.
+REBUILD_STATE_FILE = "rebuild_state.json"
+PANEL_SCAN_LIMIT = 10
+
+rebuild_state = JsonFile(REBUILD_STATE_FILE)
+
+def compile_plan() -> List[Dict]:
+    plan = []
+    for i, block in enumerate(STRUCTURE):
+        children = []
+        for j, t in enumerate(block["text_channels"]):
+            key = template_key_for(t)
+            children.append({"key": f"text:{t}", "kind": "text", "name": decorate_name(t), "position": j,
+                             "panel": key if key in TICKET_TEMPLATES else None})
+        for j, v in enumerate(block.get("voice_channels", [])):
+            children.append({"key": f"voice:{v}", "kind": "voice", "name": decorate_name(v), "position": j, "panel": None})
+        plan.append({"key": f"cat:{block['category_name']}", "kind": "cat", "name": block["category_name"],
+                     "position": i, "children": children})
+    return plan
+
+REBUILD_PLAN = compile_plan()
+
+def plan_match_key(name: str) -> str:
+    # NFKD convierte las letras estilizadas en ASCII, así "「👋」𝙗𝙞𝙚𝙣𝙫𝙚𝙣𝙞𝙙𝙖" y "👋・bienvenida" coinciden
+    return normalize_name_for_matching(name).replace(" ", "-")
+
+def channel_kind(ch) -> Optional[str]:
+    if isinstance(ch, discord.CategoryChannel):
+        return "cat"
+    if isinstance(ch, discord.VoiceChannel):
+        return "voice"
+    if isinstance(ch, discord.TextChannel):
+        return "text"
+    return None
+
+def diff_plan(guild: discord.Guild, plan: List[Dict], objects: Dict[str, int], keep_ids: List[int]):
+    claimed = set(keep_ids)
+    by_name: Dict[Tuple[Optional[str], str], List] = {}
+    for ch in guild.channels:
+        by_name.setdefault((channel_kind(ch), plan_match_key(ch.name)), []).append(ch)
+
+    def find(entry: Dict):
+        # primero por el id del checkpoint, después por nombre
+        ch = guild.get_channel(objects.get(entry["key"]) or 0)
+        if ch is not None and ch.id not in claimed and channel_kind(ch) == entry["kind"]:
+            claimed.add(ch.id)
+            return ch
+        for ch in by_name.get((entry["kind"], plan_match_key(entry["name"])), ()):
+            if ch.id not in claimed:
+                claimed.add(ch.id)
+                return ch
+        return None
+
+    matched = [(cat, find(cat), [(child, find(child)) for child in cat["children"]]) for cat in plan]
+    extras = [ch for ch in guild.channels if ch.id not in claimed]
+    return matched, extras
+
+async def apply_plan(guild: discord.Guild, invoking_user: discord.Member, keep_channel_ids: Optional[List[int]] = None,
+                     runner: Optional[RestRunner] = None) -> Dict[str, int]:
+    runner = runner or RestRunner(REBUILD_ROUTE_LIMITS)
+    state = rebuild_state.data.setdefault(str(guild.id), {})
+    objects: Dict[str, int] = state.setdefault("objects", {})
+    panels: Dict[str, Dict] = state.setdefault("panels", {})
+    state["status"] = "running"
+    rebuild_state.mark_dirty()
+    # los tickets abiertos no forman parte del plan pero no deben borrarse
+    keep = list(keep_channel_ids or []) + ticket_registry.open_channel_ids(guild.id)
+    matched, extras = diff_plan(guild, REBUILD_PLAN, objects, keep)
+    stats = {"deleted": 0, "created": 0, "moved": 0, "panels": 0}
+
+    def checkpoint(key: str, obj_id: int):
+        objects[key] = obj_id
+        rebuild_state.mark_dirty()
+
+    runner.total += len(extras)
+    for cat, live_cat, children in matched:
+        runner.total += live_cat is None
+        for child, live in children:
+            runner.total += live is None or (live_cat is not None and live.category_id != live_cat.id)
+
+    async def delete(ch):
+        try:
+            await runner.run("channel_delete", lambda: ch.delete(reason=f"Rebuilding server by {invoking_user} via !Femb-Paradise"))
+            stats["deleted"] += 1
+        except Exception:
+            logger.exception("No se pudo eliminar %s", getattr(ch, "name", str(ch)))
+
+    async def ensure_panel(ch: discord.TextChannel, key: str, existed: bool):
+        record = panels.get(key)
+        if record and record["channel"] == ch.id and str(record["message"]) in ticket_message_map:
+            if ticket_registry.panel_template(ch.id) != key:
+                ticket_registry.register_panel(ch.id, key)
+            return
+        if existed:
+            # canal ya existente sin checkpoint (p.ej. creado por una versión anterior): buscar su panel
+            try:
+                async for m in ch.history(limit=PANEL_SCAN_LIMIT):
+                    if ticket_message_map.get(str(m.id)) == key:
+                        panels[key] = {"channel": ch.id, "message": m.id}
+                        rebuild_state.mark_dirty()
+                        ticket_registry.register_panel(ch.id, key)
+                        return
+            except Exception:
+                logger.warning("No se pudo revisar el historial de %s", ch.name)
+        runner.total += 2
+        msg = await send_ticket_panel(runner, ch, key)
+        if msg:
+            if record:
+                ticket_message_map.pop(str(record["message"]), None)
+            panels[key] = {"channel": ch.id, "message": msg.id}
+            rebuild_state.mark_dirty()
+            stats["panels"] += 1
+
+    async def apply_child(category, child: Dict, live):
+        if live is None:
+            create = guild.create_text_channel if child["kind"] == "text" else guild.create_voice_channel
+            live = await create_with_fallback(runner, create, child["name"], category=category, position=child["position"])
+            stats["created"] += 1
+            existed = False
+        else:
+            existed = True
+            if live.category_id != category.id:
+                await runner.run("channel_edit", lambda: live.edit(category=category, position=child["position"], reason=REBUILD_REASON))
+                stats["moved"] += 1
+        checkpoint(child["key"], live.id)
+        if child["panel"]:
+            await ensure_panel(live, child["panel"], existed)
+
+    async def apply_block(cat: Dict, live_cat, children):
+        if live_cat is None:
+            try:
+                live_cat = await runner.run("channel_create", lambda: guild.create_category(cat["name"], position=cat["position"], reason=REBUILD_REASON))
+            except Exception:
+                # si falla con emoji, usa texto simple
+                safe_cat = re.sub(r"[^\w\s-]", "", cat["name"])[:90]
+                live_cat = await runner.run("channel_create", lambda: guild.create_category(safe_cat, position=cat["position"], reason=f"{REBUILD_REASON} (fallback)"))
+            stats["created"] += 1
+        checkpoint(cat["key"], live_cat.id)
+        # position explícita: al crear en paralelo el orden de llegada no es el orden de STRUCTURE
+        await asyncio.gather(*(apply_child(live_cat, child, live) for child, live in children))
+
+    await asyncio.gather(*(delete(ch) for ch in extras))
+    await asyncio.gather(*(apply_block(cat, live_cat, children) for cat, live_cat, children in matched))
+    state["status"] = "done"
+    state["updated"] = int(time.time())
+    rebuild_state.mark_dirty()
+    return stats
+
+# ---------------- Ticket registry ----------------
+# tickets.json: canal -> {guild, owner, template, created} de los tickets abiertos (al cerrar se
+# quita; el historial de los cerrados está en transcripts/index.json), más un contador por guild
+# para los nombres, la categoría de tickets de cada guild y los canales panel -> plantilla.
+# Abrir/cerrar un ticket son búsquedas por id, sin recorrer canales ni overwrites.
+TICKETS_FILE = "tickets.json"
+TICKETS_CATEGORY_NAME = "🎟️・TICKETS"
+
+class TicketRegistry:
+    def __init__(self, path: str):
+        self.store = JsonFile(path, depth=2)  # filas por canal/guild con el backend sqlite
+        data = self.store.data
+        self.channels: Dict[str, Dict] = data.setdefault("channels", {})
+        self.counters: Dict[str, int] = data.setdefault("counters", {})
+        self.categories: Dict[str, int] = data.setdefault("categories", {})
+        self.panels: Dict[str, str] = data.setdefault("panels", {})
+        # (guild, owner) -> canales abiertos, para el tope de tickets por usuario
+        self.by_owner: Dict[Tuple[int, int], set] = {}
+        for cid, record in self.channels.items():
+            self.by_owner.setdefault((record["guild"], record["owner"]), set()).add(cid)
+
+    def get(self, channel_id: int) -> Optional[Dict]:
+        return self.channels.get(str(channel_id))
+
+    def next_number(self, guild_id: int) -> int:
+        n = self.counters.get(str(guild_id), 0) + 1
+        self.counters[str(guild_id)] = n
+        self.store.mark_dirty()
+        return n
+
+    def open(self, channel: discord.abc.GuildChannel, owner_id: int, template_key: str) -> Dict:
+        record = {"guild": channel.guild.id, "owner": owner_id, "template": template_key, "created": int(time.time())}
+        self.channels[str(channel.id)] = record
+        self.by_owner.setdefault((record["guild"], owner_id), set()).add(str(channel.id))
+        self.store.mark_dirty()
+        return record
+
+    def close(self, channel_id: int) -> Optional[Dict]:
+        record = self.channels.pop(str(channel_id), None)
+        if record is not None:
+            owned = self.by_owner.get((record["guild"], record["owner"]))
+            if owned is not None:
+                owned.discard(str(channel_id))
+                if not owned:
+                    del self.by_owner[(record["guild"], record["owner"])]
+            self.store.mark_dirty()
+        return record
+
+    def open_count(self, guild_id: int, owner_id: int) -> int:
+        return len(self.by_owner.get((guild_id, owner_id), ()))
+
+    def open_channel_ids(self, guild_id: int) -> List[int]:
+        return [int(cid) for cid, r in self.channels.items() if r["guild"] == guild_id]
+
+    def category(self, guild: discord.Guild) -> Optional[discord.CategoryChannel]:
+        cat = guild.get_channel(self.categories.get(str(guild.id)) or 0)
+        if isinstance(cat, discord.CategoryChannel):
+            return cat
+        # sin categoría registrada (o borrada): buscarla una vez por nombre y recordarla
+        cat = discord.utils.find(lambda c: c.name.upper().startswith("🎟️") or "TICKETS" in c.name.upper(), guild.categories)
+        if cat:
+            self.set_category(guild.id, cat.id)
+        return cat
+
+    def set_category(self, guild_id: int, category_id: int):
+        self.categories[str(guild_id)] = category_id
+        self.store.mark_dirty()
+
+    def panel_template(self, channel_id: int) -> Optional[str]:
+        return self.panels.get(str(channel_id))
+
+    def register_panel(self, channel_id: int, template_key: str):
+        self.panels[str(channel_id)] = template_key
+        self.store.mark_dirty()
+
+    def forget_channel(self, channel_id: int):
+        if self.close(channel_id) is None and self.panels.pop(str(channel_id), None) is not None:
+            self.store.mark_dirty()
+
+ticket_registry = TicketRegistry(TICKETS_FILE)
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    # tickets/paneles borrados a mano (o por la reconstrucción) no deben quedar en el registro
+    ticket_registry.forget_channel(channel.id)
+    invalidate_log_channel(channel)
+
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    invalidate_log_channel(channel)
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    if before.name != after.name:
+        invalidate_log_channel(before)
+        invalidate_log_channel(after)
+
+# ---------------- Ticket creation ----------------
+async def create_ticket_channel(guild: discord.Guild, owner: discord.Member, template_key: str):
+    tickets_cat = ticket_registry.category(guild)
+    if not tickets_cat:
+        tickets_cat = await guild.create_category(TICKETS_CATEGORY_NAME, reason="Crear categoría de tickets dinámica")
+        ticket_registry.set_category(guild.id, tickets_cat.id)
+    # contador por guild: el nombre es único sin mirar los canales existentes
+    number = ticket_registry.next_number(guild.id)
+    proposed = stylize(f"ticket-{owner.name}-{number}".lower())
+    template = TICKET_TEMPLATES.get(template_key)
+    emoji = template["reaction"] if template else DEFAULT_PREFIX_EMOJI
+    final_name = decorate_name(proposed, emoji)
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(view_channel=False),
+        owner: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_messages=True)
+    }
+    staff_role = cached_role(guild, STAFF_ROLE_NAME)
+    if staff_role:
+        overwrites[staff_role] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_messages=True, manage_messages=True)
+    channel = await guild.create_text_channel(final_name, category=tickets_cat, overwrites=overwrites, reason=f"Ticket creado por {owner} tipo {template_key}")
+    ticket_registry.open(channel, owner.id, template_key)
+    embed = discord.Embed(title=f"Ticket — {template['title'] if template else 'Ticket'}",
+                          description=(f"Hola {owner.mention}! Este canal ha sido creado para atender tu solicitud.\n\n"
+                                       "Staff: para cerrar el ticket usad `!close`.\n"
+                                       "Owner: describe aquí tu problema con la mayor cantidad de detalle posible."),
+                          color=0x88ffcc)
+    await channel.send(content=owner.mention, embed=embed)
+    log_action(guild, "Ticket creado", f"{channel.name} creado por {owner} ({owner.id}) tipo {template_key}")
+    return channel
+
+# ---------------- Ticket requests (single-flight + límites) ----------------
+# Una petición de ticket por (guild, usuario, plantilla) a la vez: las reacciones repetidas se
+# colapsan en la misma tarea. Además hay un tope de tickets abiertos por usuario y una cola
+# acotada por guild, así una avalancha de reacciones no se convierte en decenas de canales.
+TICKET_MAX_OPEN_PER_USER = int(os.getenv("TICKET_MAX_OPEN_PER_USER", "2"))
+TICKET_CREATE_CONCURRENCY = 2   # creaciones REST simultáneas por guild
+TICKET_QUEUE_LIMIT = int(os.getenv("TICKET_QUEUE_LIMIT", "20"))  # peticiones pendientes por guild
+TICKET_LIMIT_NOTICE_COOLDOWN = 60  # seg. entre DMs de "no se pudo abrir tu ticket" al mismo usuario
+
+class TicketLimitError(Exception):
+    pass
+
+_ticket_inflight: Dict[Tuple[int, int, str], asyncio.Task] = {}
+_ticket_inflight_users: Dict[Tuple[int, int], int] = {}
+_ticket_pending: Dict[int, int] = {}
+_ticket_sems: Dict[int, asyncio.Semaphore] = {}  # guild -> creaciones de ticket en paralelo
+_ticket_limit_notices: Dict[Tuple[int, int], float] = {}  # (guild, usuario) -> último aviso por DM
+# los avisos de rechazo van de uno en uno y por detrás de los tickets que sí se crean, para no
+# ocupar los huecos REST que necesita la cola de creación durante una avalancha
+ticket_notice_runner = RestRunner({"reaction_remove": 1, "dm": 1}, priority=PRIO_LOGGING)
+
+async def resolve_member(guild: discord.Guild, user_id: int, member: Optional[discord.Member] = None) -> Optional[discord.Member]:
+    if member is not None:
+        return member
+    member = guild.get_member(user_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(user_id)
+        except Exception:
+            logger.exception("No se pudo obtener miembro %s", user_id)
+    return member
+
+async def _create_ticket_queued(guild: discord.Guild, user_id: int, template_key: str, member: Optional[discord.Member]):
+    rest_priority.set(PRIO_TICKETS)  # tarea propia: no hace falta restaurarlo
+    async with _ticket_sems.setdefault(guild.id, asyncio.Semaphore(TICKET_CREATE_CONCURRENCY)):
+        member = await resolve_member(guild, user_id, member)
+        if member is None:
+            return None
+        return await create_ticket_channel(guild, member, template_key)
+
+def request_ticket(guild: discord.Guild, user_id: int, template_key: str,
+                   member: Optional[discord.Member] = None) -> Tuple[asyncio.Task, bool]:
+    # devuelve (tarea, es_nueva); si ya había una en curso para la misma clave se reutiliza
+    key = (guild.id, user_id, template_key)
+    task = _ticket_inflight.get(key)
+    if task is not None:
+        return task, False
+    user_key = (guild.id, user_id)
+    if ticket_registry.open_count(guild.id, user_id) + _ticket_inflight_users.get(user_key, 0) >= TICKET_MAX_OPEN_PER_USER:
+        raise TicketLimitError(f"Ya tienes {TICKET_MAX_OPEN_PER_USER} ticket(s) abierto(s). Cierra uno antes de abrir otro.")
+    if _ticket_pending.get(guild.id, 0) >= TICKET_QUEUE_LIMIT:
+        raise TicketLimitError("Se están creando demasiados tickets ahora mismo, inténtalo en unos segundos.")
+    task = spawn(_create_ticket_queued(guild, user_id, template_key, member))
+    _ticket_inflight[key] = task
+    _ticket_inflight_users[user_key] = _ticket_inflight_users.get(user_key, 0) + 1
+    _ticket_pending[guild.id] = _ticket_pending.get(guild.id, 0) + 1
+
+    def finished(_):
+        _ticket_inflight.pop(key, None)
+        for counter, k in ((_ticket_inflight_users, user_key), (_ticket_pending, guild.id)):
+            counter[k] -= 1
+            if not counter[k]:
+                del counter[k]
+
+    task.add_done_callback(finished)
+    return task, True
+
+async def reject_ticket_reaction(guild: discord.Guild, payload: discord.RawReactionActionEvent, reason: str):
+    # se quita la reacción para que pueda volver a pulsarla más tarde y se le explica por DM, como
+    # mucho una vez por TICKET_LIMIT_NOTICE_COOLDOWN: en una avalancha cada aviso cuesta dos llamadas REST
+    now = time.monotonic()
+    key = (guild.id, payload.user_id)
+    last = _ticket_limit_notices.get(key)
+    if last is not None and now - last < TICKET_LIMIT_NOTICE_COOLDOWN:
+        return
+    for stale in [k for k, t in _ticket_limit_notices.items() if now - t >= TICKET_LIMIT_NOTICE_COOLDOWN]:
+        del _ticket_limit_notices[stale]
+    _ticket_limit_notices[key] = now
+    channel = guild.get_channel(payload.channel_id)
+    if channel is not None:
+        message = channel.get_partial_message(payload.message_id)
+        try:
+            await ticket_notice_runner.run("reaction_remove",
+                                           lambda: message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id)))
+        except Exception:
+            logger.debug("No se pudo quitar la reacción de %s en el panel %s", payload.user_id, payload.message_id)
+    member = await resolve_member(guild, payload.user_id, payload.member)
+    if member is None:
+        return
+    try:
+        await ticket_notice_runner.run("dm", lambda: member.send(f"❌ No se pudo abrir tu ticket en **{guild.name}**: {reason}"))
+    except Exception:
+        pass
+
+# ---------------- Ticket transcripts ----------------
+# Al cerrar un ticket su historial se vuelca a transcripts/<guild>/<canal>-<fecha>.jsonl.gz antes de
+# borrar el canal. El historial se lee en streaming (discord.py pide lotes de 100) y se escribe
+# comprimido en trozos desde el hilo de E/S, así que la memoria no depende de lo largo que sea el ticket.
+TRANSCRIPTS_DIR = "transcripts"
+TRANSCRIPTS_INDEX_FILE = os.path.join(TRANSCRIPTS_DIR, "index.json")
+TRANSCRIPT_CHUNK = 64 * 1024  # bytes de JSONL que se acumulan antes de pasar al hilo de E/S
+TRANSCRIPT_UPLOAD_LIMIT = int(os.getenv("TRANSCRIPT_UPLOAD_LIMIT", str(8 * 1024 * 1024)))  # si pesa más, sólo en disco
+
+transcripts_index = JsonFile(TRANSCRIPTS_INDEX_FILE)  # canal -> metadatos del transcript
+_closing_tickets: set = set()
+
+async def iter_transcript(channel: discord.TextChannel) -> AsyncIterator[Dict]:
+    async for m in channel.history(limit=None, oldest_first=True):
+        yield {"type": "message", "id": m.id, "author": m.author.id, "author_name": str(m.author),
+               "bot": m.author.bot, "created": m.created_at.isoformat(),
+               "edited": m.edited_at.isoformat() if m.edited_at else None, "content": m.content,
+               "attachments": [a.url for a in m.attachments], "embeds": [e.to_dict() for e in m.embeds]}
+
+async def archive_ticket(channel: discord.TextChannel, record: Optional[Dict], closed_by: discord.abc.User) -> Dict:
+    folder = os.path.join(TRANSCRIPTS_DIR, str(channel.guild.id))
+    path = os.path.join(folder, f"{channel.id}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+    await run_io(os.makedirs, folder, exist_ok=True)
+    header = {"type": "ticket", "channel": channel.id, "name": channel.name, "guild": channel.guild.id,
+              "owner": record["owner"] if record else None, "template": record["template"] if record else None,
+              "created": record["created"] if record else None, "closed_by": closed_by.id, "closed_at": int(time.time())}
+    tmp = f"{path}.tmp"
+    gz = await run_io(gzip.open, tmp, "wb")
+    count = 0
+    try:
+        buffer = [json.dumps(header, ensure_ascii=False)]
+        size = len(buffer[0])
+        async for entry in iter_transcript(channel):
+            line = json.dumps(entry, ensure_ascii=False)
+            buffer.append(line)
+            size += len(line)
+            count += 1
+            if size >= TRANSCRIPT_CHUNK:
+                await run_io(gz.write, ("\n".join(buffer) + "\n").encode("utf-8"))
+                buffer, size = [], 0
+        if buffer:
+            await run_io(gz.write, ("\n".join(buffer) + "\n").encode("utf-8"))
+        await run_io(gz.close)
+    except BaseException:
+        # historial a medias (Forbidden, error HTTP, disco lleno): no se deja el .tmp tirado
+        with contextlib.suppress(Exception):
+            await run_io(gz.close)
+        with contextlib.suppress(OSError):
+            await run_io(os.remove, tmp)
+        raise
+    await run_io(os.replace, tmp, path)
+    info = {**header, "messages": count, "path": path, "bytes": await run_io(os.path.getsize, path)}
+    transcripts_index.data[str(channel.id)] = info
+    transcripts_index.mark_dirty()
+    return info
+
+async def post_transcript(guild: discord.Guild, info: Dict) -> Optional[discord.Message]:
+    target = get_log_channel(guild)
+    if target is None or info["bytes"] > TRANSCRIPT_UPLOAD_LIMIT:
+        return None
+    # discord.File lee el fichero en trozos al subirlo, no entero en memoria; se abre en cada intento
+    # porque send() lo cierra al terminar, aunque falle
+    msg = await with_retries(lambda: target.send(
+        f"🗂️ Transcript de **{info['name']}** ({info['messages']} mensajes, cerrado por <@{info['closed_by']}>)",
+        file=discord.File(info["path"], filename=os.path.basename(info["path"]))),
+        priority=PRIO_LOGGING)
+    info["posted"] = msg.id
+    transcripts_index.mark_dirty()
+    return msg
+
+# ---------------- Commands ----------------
+@bot.command(name="Femb-Paradise")
+@commands.guild_only()
+async def femb_paradise(ctx: commands.Context):
+    invoker = ctx.author
+    guild = ctx.guild
+    # permiso: admin o superuser
+    if not (ctx.author.guild_permissions.administrator or ctx.author.id == SUPERUSER_ID):
+        await ctx.reply("❌ Necesitas permisos de **Administrador** para ejecutar este comando.", mention_author=False)
+        return
+    # confirmación si no es superuser
+    if ctx.author.id != SUPERUSER_ID:
+        confirm_message = await ctx.send(embed=discord.Embed(
+            title="Confirmación requerida",
+            description=(f"Has solicitado reconstruir completamente el servidor **{guild.name}**.\n"
+                         "Esto **ELIMINARÁ TODOS LOS CANALES** que no formen parte de la estructura y creará los que falten.\n\n"
+                         "Si estás seguro, reacciona con ✅ en los próximos 10 segundos."),
+            color=0xff66aa
+        ))
+        await confirm_message.add_reaction("✅")
+        # evento raw: no depende de que el mensaje siga en la caché de mensajes (MAX_MESSAGES)
+        def check(payload: discord.RawReactionActionEvent):
+            return payload.user_id == invoker.id and str(payload.emoji) == "✅" and payload.message_id == confirm_message.id
+        try:
+            await bot.wait_for("raw_reaction_add", timeout=10.0, check=check)
+        except asyncio.TimeoutError:
+            await ctx.send("⏱️ Tiempo de confirmación agotado. Operación cancelada.", delete_after=8)
+            return
+    # asegurar logs antes de purge
+    log_ch = get_log_channel(guild)
+    if not log_ch:
+        try:
+            log_ch = await guild.create_text_channel(LOG_CHANNEL_NAME, topic="Canal de logs del bot", reason="Crear canal de logs antes de reconstrucción")
+        except Exception:
+            log_ch = None
+    # progreso (DM preferente)
+    progress_msg = None
+    try:
+        dm = await invoker.create_dm()
+        progress_msg = await dm.send("🔧 Iniciando reconstrucción del servidor... Esto puede tardar unos segundos.")
+    except Exception:
+        if log_ch:
+            try:
+                progress_msg = await log_ch.send("🔧 Iniciando reconstrucción del servidor... Esto puede tardar unos segundos.")
+            except Exception:
+                progress_msg = None
+    try:
+        keep_ids = [log_ch.id] if log_ch else []
+        started = time.monotonic()
+        resuming = rebuild_state.data.get(str(guild.id), {}).get("status") == "running"
+        prefix = "🔧 Reanudando la reconstrucción…" if resuming else "🔧 Reconstruyendo el servidor…"
+        runner = RestRunner(REBUILD_ROUTE_LIMITS, ProgressReporter(progress_msg, prefix))
+        stats = await apply_plan(guild, invoker, keep_channel_ids=keep_ids, runner=runner)
+        logger.info("Reconstrucción de %s: %d operaciones en %.1fs (%s)", guild.name, runner.done, time.monotonic() - started, stats)
+        summary = (f"{stats['created']} creados, {stats['moved']} movidos, {stats['deleted']} eliminados, "
+                   f"{stats['panels']} paneles")
+        log_action(guild, "Servidor reconstruido", f"Reconstrucción ejecutada por {invoker} ({invoker.id}): {summary}")
+        done_text = f"✅ Reconstrucción completa. Estructura creada correctamente. ({summary})"
+        if progress_msg:
+            try:
+                await progress_msg.edit(content=done_text)
+            except Exception:
+                if log_ch:
+                    await log_ch.send(done_text)
+    except Exception as e:
+        logger.exception("Error durante la reconstrucción")
+        if progress_msg:
+            try:
+                await progress_msg.edit(content=f"❌ Ocurrió un error durante la reconstrucción: `{e}`")
+            except Exception:
+                pass
+        if log_ch:
+            try:
+                await log_ch.send(f"❌ Error durante la reconstrucción: `{e}`")
+            except Exception:
+                pass
+        log_action(guild, "Error reconstrucción", f"Error: {e}")
+
+@bot.command(name="love")
+async def love_cmd(ctx, user: discord.Member):
+    import random
+    porcentaje = random.randint(0, 100)
+    await ctx.send(f"💘 **{ctx.author.mention} y {user.mention} tienen un {porcentaje}% de compatibilidad amorosa!**")
+
+@bot.command(name="ship")
+async def ship_cmd(ctx, user1: discord.Member, user2: discord.Member):
+    import random
+    porcentaje = random.randint(0, 100)
+    heart = "💖" if porcentaje > 70 else "💛" if porcentaje > 40 else "💔"
+    await ctx.send(f"{heart} **{user1.display_name} ❤️ {user2.display_name} = {porcentaje}%** {heart}")
+
+@bot.command(name="banana")
+async def banana_cmd(ctx, user: discord.Member = None):
+    user = user or ctx.author
+
+    # Si es el usuario especial (ID 1382693027600007200)
+    if user.id == 1382693027600007200:
+        tamaño = random.randint(40, 45)
+    else:
+        tamaño = random.randint(1, 45)
+
+    # Crear barra visual proporcional
+    bloques = tamaño // 2  # 1 bloque por cada 2 cm
+    barra = "▮" * bloques
+    if barra == "":
+        barra = "▯"  # por si toca 1 cm, queda gracioso
+
+    description = (f"**La banana de {user.mention} mide `{tamaño} cm`** 😳\n\n"
+                   f"`{barra}` **{tamaño} cm** 🍌")
+    embed = discord.Embed(**BANANA_EMBED, description=description)
+    embed.set_image(url=BANANA_IMAGE)
+    await ctx.send(embed=embed)
+
+@bot.command(name="ticket")
+@commands.guild_only()
+async def ticket_cmd(ctx: commands.Context, *, tipo: Optional[str] = "general"):
+    channel = ctx.channel
+    template_key = ticket_registry.panel_template(channel.id)
+    if template_key is None:
+        # canal panel no registrado (creado antes del registro): deducir por nombre
+        if not is_ticket_channel_name(channel.name):
+            await ctx.reply("Este comando sólo puede usarse dentro de los canales de **Tickets** designados.", mention_author=False)
+            return
+        stripped = normalize_name_for_matching(strip_decor(channel.name))
+        for key in TICKET_TEMPLATES.keys():
+            if key.replace("-", "_") in stripped or key in stripped:
+                template_key = key
+                break
+        if not template_key:
+            template_key = "ticket-ayuda-general"
+    try:
+        task, _ = request_ticket(ctx.guild, ctx.author.id, template_key, member=ctx.author)
+        ticket_chan = await asyncio.shield(task)
+        await ctx.reply(f"✅ He creado tu ticket: {ticket_chan.mention}", mention_author=False)
+    except TicketLimitError as e:
+        await ctx.reply(f"❌ {e}", mention_author=False)
+    except Exception as e:
+        logger.exception("Error al crear ticket")
+        await ctx.reply(f"❌ Error al crear el ticket: `{e}`", mention_author=False)
+
+# ---------------- !clear en segundo plano ----------------
+# Cada !clear es un trabajo por canal: recorre el historial en streaming, borra en lotes de 100 con
+# bulk delete los mensajes de menos de 14 días y los más viejos uno a uno a ritmo controlado.
+# Todos los trabajos comparten un RestRunner con poca concurrencia para no comerse el presupuesto
+# REST del resto del bot. Se cancela con `!clear cancel`.
+CLEAR_BULK_MAX = 100  # máximo de Discord por bulk delete
+CLEAR_BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)  # margen con el límite de 14 días
+CLEAR_OLD_DELETE_INTERVAL = float(os.getenv("CLEAR_OLD_DELETE_INTERVAL", "1.0"))  # seg. entre borrados sueltos
+CLEAR_SCAN_LIMIT = int(os.getenv("CLEAR_SCAN_LIMIT", "5000"))  # mensajes revisados como mucho (filtro por miembro)
+CLEAR_MAX_AMOUNT = 1000
+
+clear_runner = RestRunner({"bulk_delete": 1, "message_delete": 1})
+clear_jobs: Dict[int, "ClearJob"] = {}
+
+class ClearJob:
+    def __init__(self, ctx: commands.Context, amount: int, member: Optional[discord.Member], status: discord.Message):
+        self.ctx = ctx
+        self.amount = amount
+        self.member = member
+        self.progress = ProgressReporter(status, "🧹 Borrando mensajes…")
+        self.deleted = 0
+        self.scanned = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        clear_jobs[self.ctx.channel.id] = self
+        self.task = spawn(self.run())
+
+    async def _bulk(self, batch: List[discord.Message], counted: int):
+        await clear_runner.run("bulk_delete", lambda: self.ctx.channel.delete_messages(batch, reason=f"!clear por {self.ctx.author}"))
+        self.deleted += counted
+        self.progress.update(self.deleted, self.amount)
+
+    async def _single(self, message: discord.Message):
+        try:
+            await clear_runner.run("message_delete", lambda: message.delete())
+            self.deleted += 1
+        except discord.NotFound:
+            pass
+        self.progress.update(self.deleted, self.amount)
+        await asyncio.sleep(CLEAR_OLD_DELETE_INTERVAL)
+
+    async def run(self):
+        channel = self.ctx.channel
+        cutoff = discord.utils.utcnow() - CLEAR_BULK_MAX_AGE
+        # el propio mensaje del comando va en el primer lote, sin contar
+        batch: List[discord.Message] = [self.ctx.message]
+        counted = 0
+        outcome = "done"
+        try:
+            async for m in channel.history(limit=CLEAR_SCAN_LIMIT, before=self.ctx.message):
+                self.scanned += 1
+                if self.member and m.author.id != self.member.id:
+                    continue
+                if m.created_at > cutoff:
+                    batch.append(m)
+                    counted += 1
+                    if len(batch) == CLEAR_BULK_MAX:
+                        await self._bulk(batch, counted)
+                        batch, counted = [], 0
+                else:
+                    # el historial va de nuevo a viejo: a partir de aquí sólo quedan mensajes viejos
+                    if batch:
+                        await self._bulk(batch, counted)
+                        batch, counted = [], 0
+                    await self._single(m)
+                if self.deleted + counted >= self.amount:
+                    break
+            if batch:
+                await self._bulk(batch, counted)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+        except Exception:
+            outcome = "error"
+            logger.exception("Error en !clear en %s", channel)
+        finally:
+            clear_jobs.pop(channel.id, None)
+        await self._finish(outcome)
+
+    async def _finish(self, outcome: str):
+        who = f" de {self.member.mention}" if self.member else ""
+        text = {"done": f"🧹 **Borrados `{self.deleted}` mensajes**{who}",
+                "cancelled": f"⏹️ **!clear cancelado** tras borrar `{self.deleted}` mensajes{who}",
+                "error": f"❌ **!clear interrumpido por un error** tras borrar `{self.deleted}` mensajes{who}"}[outcome]
+        status = await self.progress.finish(text)
+        if status:
+            try:
+                await status.delete(delay=5)
+            except Exception:
+                pass
+        # Log al canal de moderación (usa el canal de logs configurado)
+        embed = discord.Embed(title="🧹 Mensajes Borrados", color=0xff0000)
+        embed.add_field(name="Moderador", value=self.ctx.author.mention, inline=False)
+        embed.add_field(name="Cantidad", value=str(self.deleted), inline=False)
+        if self.member:
+            embed.add_field(name="Mensajes de", value=self.member.mention, inline=False)
+        embed.add_field(name="Canal", value=self.ctx.channel.mention, inline=False)
+        if outcome != "done":
+            embed.add_field(name="Estado", value="Cancelado" if outcome == "cancelled" else "Error", inline=False)
+        log_queue.push(self.ctx.guild, embed)
+
+@bot.command(name="clear")
+@commands.guild_only()
+async def clear_cmd(ctx, amount: Optional[str] = None, member: discord.Member = None):
+
+    # SUPERUSER bypass
+    if ctx.author.id != SUPERUSER_ID:
+        if not ctx.author.guild_permissions.manage_messages:
+            return await ctx.reply("❌ No tienes permisos para borrar mensajes.", mention_author=False)
+
+    job = clear_jobs.get(ctx.channel.id)
+    if amount and amount.lower() in ("cancel", "cancelar", "stop"):
+        if job is None:
+            return await ctx.reply("ℹ️ No hay ningún `!clear` en curso en este canal.", mention_author=False)
+        job.task.cancel()
+        return await ctx.message.add_reaction("⏹️")
+
+    if amount is None or not amount.isdigit() or int(amount) < 1:
+        return await ctx.reply("❌ Uso correcto: `!clear cantidad`, `!clear cantidad @usuario` o `!clear cancel` "
+                               f"(como mucho {CLEAR_MAX_AMOUNT} mensajes por `!clear`)", mention_author=False)
+    if job is not None:
+        return await ctx.reply(f"⏳ Ya hay un `!clear` en curso aquí (`{job.deleted}/{job.amount}`). Usa `!clear cancel` para pararlo.",
+                               mention_author=False)
+
+    amount = int(amount)
+    if amount > CLEAR_MAX_AMOUNT:
+        await ctx.reply(f"ℹ️ Como mucho se borran {CLEAR_MAX_AMOUNT} mensajes por `!clear`: borraré {CLEAR_MAX_AMOUNT} "
+                        f"de los {amount} que pediste.", mention_author=False)
+        amount = CLEAR_MAX_AMOUNT
+    status = await ctx.send(f"🧹 Borrando mensajes… `0/{amount}`")
+    ClearJob(ctx, amount, member, status).start()
+
+def legacy_ticket_owner(channel: discord.abc.GuildChannel) -> Optional[int]:
+    # ticket anterior al registro: el dueño es el miembro con overwrite de lectura. Sin caché de
+    # miembros (perfil lean) discord.py lo devuelve como un discord.Object que no es de tipo Role
+    for target, ow in channel.overwrites.items():
+        is_member = isinstance(target, discord.Member) or (isinstance(target, discord.Object) and target.type is not discord.Role)
+        if is_member and ow.view_channel:
+            return target.id
+    return None
+
+@bot.command(name="close")
+@commands.guild_only()
+async def close_ticket(ctx: commands.Context):
+    channel = ctx.channel
+    # superuser bypass
+    bypass = (ctx.author.id == SUPERUSER_ID)
+    record = ticket_registry.get(channel.id)
+    if record is None and not is_ticket_channel_name(channel.name) and not bypass:
+        await ctx.reply("Este comando sólo funciona dentro de un canal de ticket.", mention_author=False)
+        return
+    owner_id = record["owner"] if record else legacy_ticket_owner(channel)
+    staff_role = cached_role(ctx.guild, STAFF_ROLE_NAME)
+    is_staff = (staff_role in ctx.author.roles) if staff_role else ctx.author.guild_permissions.manage_messages
+    if bypass or ctx.author.id == owner_id or is_staff:
+        if channel.id in _closing_tickets:
+            return
+        _closing_tickets.add(channel.id)
+        try:
+            await ctx.reply("🗂️ Guardando el transcript y cerrando el ticket…", mention_author=False)
+            try:
+                info = await archive_ticket(channel, record, ctx.author)
+            except Exception as e:
+                # sin transcript no se borra nada
+                logger.exception("Error archivando ticket %s", channel.id)
+                return await ctx.reply(f"❌ No pude guardar el transcript, el ticket sigue abierto: `{e}`", mention_author=False)
+            try:
+                await post_transcript(ctx.guild, info)
+            except Exception:
+                logger.warning("No se pudo subir el transcript de %s; queda en %s", channel.name, info["path"])
+            log_action(ctx.guild, "Ticket cerrado", f"{channel.name} cerrado por {ctx.author} ({ctx.author.id}); "
+                                                    f"transcript: {info['messages']} mensajes en `{info['path']}`")
+            await channel.delete(reason=f"Cerrado por {ctx.author}")
+            ticket_registry.close(channel.id)
+        except Exception as e:
+            logger.exception("Error al cerrar ticket")
+            await ctx.reply(f"❌ No pude cerrar el ticket: `{e}`", mention_author=False)
+        finally:
+            _closing_tickets.discard(channel.id)
+    else:
+        await ctx.reply("Sólo el creador del ticket, Staff o el SuperUser pueden cerrar este ticket.", mention_author=False)
+
+@bot.command(name="help")
+async def help_command(ctx: commands.Context):
+    await ctx.send(embed=HELP_EMBED)
+
+# ---------------- Reaction handler (abrir tickets) ----------------
+@bot.event
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if payload.user_id == bot.user.id:
+        return
+    msg_id = str(payload.message_id)
+    if msg_id not in ticket_message_map:
+        return
+    template_key = ticket_message_map[msg_id]
+    expected_emoji = TICKET_TEMPLATES.get(template_key, {}).get("reaction")
+    emoji_repr = str(payload.emoji)
+    if expected_emoji and emoji_repr != expected_emoji:
+        return
+    guild = bot.get_guild(payload.guild_id)
+    if not guild:
+        return
+    try:
+        task, created = request_ticket(guild, payload.user_id, template_key, member=payload.member)
+    except TicketLimitError as e:
+        logger.info("Ticket por reacción rechazado para %s en %s: %s", payload.user_id, guild.name, e)
+        spawn(reject_ticket_reaction(guild, payload, str(e)))
+        return
+    if not created:
+        return  # reacción repetida mientras se crea el mismo ticket
+    try:
+        channel = await task
+        if channel is None:
+            return
+        try:
+            member = await resolve_member(guild, payload.user_id, payload.member)
+            if member:
+                await member.send(f"✅ Se ha creado tu ticket en **{guild.name}**. Revisa el canal en el servidor.")
+        except Exception:
+            pass
+    except Exception:
+        logger.exception("Error creando ticket por reacción")
+
+# ---------------- Anti-Nuke ----------------
+NUKE_THRESHOLD = 2
+NUKE_TIME_WINDOW = 8
+OWNER_PROTECT = SUPERUSER_ID
+NUKE_ACTIONS = {discord.AuditLogAction.channel_delete}
+NUKE_DANGEROUS_PERMS = ("administrator", "manage_guild", "manage_roles", "manage_channels",
+                        "manage_webhooks", "ban_members", "kick_members")
+LOCKDOWN_CONCURRENCY = int(os.getenv("LOCKDOWN_CONCURRENCY", "5"))
+NUKE_LOCKS_FILE = "nuke_locks.json"
+
+# guild_id -> lockdown activo (atacante, permisos originales por rol, tiempos). Persistido para
+# poder restaurar con !nuke-unlock aunque el bot se reinicie durante el incidente.
+nuke_locks = JsonFile(NUKE_LOCKS_FILE, delay=0.5)
+
+class NukeDetector:
+    # guild_id -> executor_id -> timestamps recientes. Las entradas llegan por el gateway
+    # (on_audit_log_entry_create) con el ejecutor real, sin pedir el audit log por REST.
+    def __init__(self, threshold: int, window: float):
+        self.threshold = threshold
+        self.window = window
+        self.windows: Dict[int, Dict[int, deque]] = {}
+
+    def record(self, guild_id: int, executor_id: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        hits = self.windows.setdefault(guild_id, {}).setdefault(executor_id, deque())
+        hits.append(now)
+        while hits and now - hits[0] > self.window:
+            hits.popleft()
+        return len(hits) >= self.threshold
+
+    def drop_guild(self, guild_id: int):
+        self.windows.pop(guild_id, None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for guild_id in list(self.windows):
+            per_guild = self.windows[guild_id]
+            for executor_id in [e for e, hits in per_guild.items() if not hits or now - hits[-1] > self.window]:
+                del per_guild[executor_id]
+                removed += 1
+            if not per_guild:
+                del self.windows[guild_id]
+        return removed
+
+nuke_detector = NukeDetector(NUKE_THRESHOLD, NUKE_TIME_WINDOW)
+
+async def activate_nuke_lock(guild: discord.Guild, executor: discord.abc.Snowflake):
+    # estado por guild: un incidente en un servidor no desactiva la protección de los demás
+    if str(guild.id) in nuke_locks.data:
+        return
+    started = time.monotonic()
+    state = nuke_locks.data[str(guild.id)] = {"executor": executor.id, "started": int(time.time()), "saved": {}, "timings": {}}
+    nuke_locks.mark_dirty()
+    # 1) banear atacante primero (si no es owner protect): corta el ataque en origen
+    if executor.id != OWNER_PROTECT:
+        try:
+            await with_retries(lambda: guild.ban(executor, reason="Ataque detectado — Anti-Nuke", delete_message_seconds=0),
+                               priority=PRIO_SECURITY)
+        except Exception:
+            logger.exception("Anti-Nuke: no se pudo banear a %s", executor.id)
+    state["timings"]["ban"] = round(time.monotonic() - started, 3)
+    # 2) quitar permisos peligrosos, de los roles más altos a los más bajos, en paralelo
+    me = guild.me
+    targets = [r for r in sorted(guild.roles, key=lambda r: r.position, reverse=True)
+               if not r.managed and (me is None or r < me.top_role)
+               and any(getattr(r.permissions, p) for p in NUKE_DANGEROUS_PERMS)]
+    runner = RestRunner({"role_edit": LOCKDOWN_CONCURRENCY}, priority=PRIO_SECURITY)
+
+    async def strip(role: discord.Role):
+        perms = role.permissions
+        state["saved"][str(role.id)] = perms.value
+        perms.update(**{p: False for p in NUKE_DANGEROUS_PERMS})
+        try:
+            await runner.run("role_edit", lambda: role.edit(permissions=perms, reason="Anti-Nuke activado"))
+        except Exception:
+            state["saved"].pop(str(role.id), None)
+            logger.warning("Anti-Nuke: no se pudo editar el rol %s", role.name)
+
+    # el semáforo es FIFO, así que los roles más privilegiados se editan antes
+    await asyncio.gather(*(strip(r) for r in targets))
+    state["timings"]["roles"] = round(time.monotonic() - started, 3)
+    nuke_locks.mark_dirty()
+    logger.warning("Anti-Nuke en %s: ban %.2fs, %d roles bloqueados en %.2fs", guild.name,
+                   state["timings"]["ban"], len(state["saved"]), state["timings"]["roles"])
+    log_action(guild, "🚨 ANTI–NUKE ACTIVADO 🚨",
+               f"Usuario detectado: <@{executor.id}> (`{executor.id}`)\n"
+               f"Se removieron permisos críticos de {len(state['saved'])} roles y se bloqueó el servidor "
+               f"(ban en {state['timings']['ban']}s, contención en {state['timings']['roles']}s).\n"
+               "Usa `!nuke-unlock` para restaurar los permisos cuando el servidor sea seguro.",
+               color=0xff0000, urgent=True)
+
+async def release_nuke_lock(guild: discord.Guild) -> Optional[int]:
+    state = nuke_locks.data.get(str(guild.id))
+    if state is None:
+        return None
+    runner = RestRunner({"role_edit": LOCKDOWN_CONCURRENCY}, priority=PRIO_SECURITY)
+    restored = 0
+
+    async def restore(role_id: str, value: int):
+        nonlocal restored
+        role = guild.get_role(int(role_id))
+        if role is None:
+            return
+        try:
+            await runner.run("role_edit", lambda: role.edit(permissions=discord.Permissions(value), reason="Anti-Nuke desactivado"))
+            restored += 1
+        except Exception:
+            logger.warning("Anti-Nuke: no se pudo restaurar el rol %s", role.name)
+
+    await asyncio.gather(*(restore(rid, value) for rid, value in state["saved"].items()))
+    del nuke_locks.data[str(guild.id)]
+    nuke_locks.mark_dirty()
+    return restored
+
+@bot.command(name="nuke-unlock")
+@commands.guild_only()
+async def nuke_unlock_cmd(ctx: commands.Context):
+    # restaura los permisos guardados al activar el Anti-Nuke y rearma la protección del servidor
+    if ctx.author.id != SUPERUSER_ID and ctx.author.id != ctx.guild.owner_id:
+        return await ctx.reply("❌ Sólo el dueño del servidor o el SuperUser pueden desbloquear el Anti-Nuke.", mention_author=False)
+    restored = await release_nuke_lock(ctx.guild)
+    if restored is None:
+        return await ctx.reply("🟢 El Anti-Nuke no está activo en este servidor.", mention_author=False)
+    await ctx.reply(f"🔓 Anti-Nuke desactivado. Permisos restaurados en {restored} roles.", mention_author=False)
+    log_action(ctx.guild, "Anti-Nuke desactivado", f"Desbloqueado por {ctx.author} ({ctx.author.id}); {restored} roles restaurados.")
+
+@bot.event
+async def on_audit_log_entry_create(entry: discord.AuditLogEntry):
+    if entry.action == discord.AuditLogAction.bot_add:
+        trust_bot_add(entry)
+        return
+    if entry.action not in NUKE_ACTIONS:
+        return
+    executor_id = entry.user_id
+    if executor_id is None or executor_id == bot.user.id or executor_id == OWNER_PROTECT:
+        return
+    if nuke_detector.record(entry.guild.id, executor_id):
+        await activate_nuke_lock(entry.guild, entry.user or discord.Object(id=executor_id))
+
+# ---------------- Activity index (!inactivos) ----------------
+# guild_id -> {"since": inicio del registro, "users": {user_id: último mensaje/entrada a voz}}.
+# Se actualiza en memoria desde on_message y on_voice_state_update y se guarda en lotes, así
+# !inactivos responde para todo el servidor sin leer historial por REST.
+LAST_SEEN_FILE = "last_seen.json"
+LAST_SEEN_FLUSH = 30  # segundos entre escrituras del índice
+INACTIVE_DAYS = 14
+
+last_seen = JsonFile(LAST_SEEN_FILE, delay=LAST_SEEN_FLUSH)
+
+def mark_active(guild_id: int, user_id: int, now: Optional[float] = None):
+    now = int(time.time() if now is None else now)
+    entry = last_seen.data.get(str(guild_id))
+    if entry is None:
+        entry = last_seen.data[str(guild_id)] = {"since": now, "users": {}}
+    entry["users"][str(user_id)] = now
+    last_seen.mark_dirty()
+
+@bot.event
+async def on_voice_state_update(member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+    if after.channel is not None and before.channel != after.channel and not member.bot:
+        mark_active(member.guild.id, member.id)
+
+# ---------------- Anti-Spam & bot-new detection (unificado) ----------------
+SPAM_LIMIT = 6
+SPAM_WINDOW = 4
+SPAM_MUTE_TIME = 60
+SPAM_MAX_TRACKED = int(os.getenv("SPAM_MAX_TRACKED", "10000"))  # tope duro de (guild, usuario) en memoria
+HOUSEKEEPING_INTERVAL = 60
+
+class SpamTracker:
+    # (guild_id, user_id) -> ring buffer con los últimos SPAM_LIMIT timestamps.
+    # El OrderedDict se mantiene en orden de último mensaje, así que los inactivos quedan al principio
+    # y tanto el tope de memoria como el barrido expulsan desde ahí en O(1) por entrada.
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[Tuple[int, int], deque]" = OrderedDict()
+
+    def hit(self, guild_id: int, user_id: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        key = (guild_id, user_id)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.popitem(last=False)
+            bucket = self.buckets[key] = deque(maxlen=self.limit)
+        else:
+            self.buckets.move_to_end(key)
+        bucket.append(now)
+        if len(bucket) == self.limit and now - bucket[0] <= self.window:
+            bucket.clear()  # no volver a disparar con los mismos mensajes
+            return True
+        return False
+
+    def drop_guild(self, guild_id: int):
+        for key in [k for k in self.buckets if k[0] == guild_id]:
+            del self.buckets[key]
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        removed = 0
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if bucket and now - bucket[-1] <= self.window:
+                break
+            del self.buckets[key]
+            removed += 1
+        return removed
+
+spam_tracker = SpamTracker(SPAM_LIMIT, SPAM_WINDOW, SPAM_MAX_TRACKED)
+
+@tasks.loop(seconds=HOUSEKEEPING_INTERVAL)
+async def housekeeping():
+    removed = spam_tracker.sweep()
+    if removed:
+        logger.debug("Anti-spam: %d entradas inactivas eliminadas", removed)
+    nuke_detector.sweep()
+    new_bots.expire()
+
+# Bots recién llegados: (guild, bot) -> caducidad, con un heap para expirar en orden sin recorrer
+# nada. Si un bot escribe dentro de la ventana se banea; si entran muchos bots a la vez (raid)
+# se banean todos los de la oleada en paralelo, con el límite de concurrencia del RestRunner.
+# No cuentan los bots de BOT_ALLOWLIST ni los que invita el dueño del servidor o el SuperUser
+# (entrada bot_add del audit log); como esa entrada puede llegar después del join, cada ban espera
+# BOT_AUDIT_GRACE segundos y se descarta si mientras tanto el bot resultó ser de confianza.
+NEW_BOT_WINDOW = 120
+NEW_BOT_MAX_TRACKED = 5000
+BOT_RAID_THRESHOLD = int(os.getenv("BOT_RAID_THRESHOLD", "5"))  # bots nuevos a la vez en un guild
+BOT_BAN_CONCURRENCY = int(os.getenv("BOT_BAN_CONCURRENCY", "4"))
+BOT_AUDIT_GRACE = float(os.getenv("BOT_AUDIT_GRACE", "2"))
+BOT_ALLOWLIST = {int(x) for x in os.getenv("BOT_ALLOWLIST", "").split(",") if x.strip()}  # ids de bots, separados por comas
+trusted_bots: set = set()  # (guild_id, bot_id) invitados por el dueño o el SuperUser
+
+def is_trusted_bot(guild: discord.Guild, bot_id: int) -> bool:
+    return bot_id in BOT_ALLOWLIST or (guild.id, bot_id) in trusted_bots
+
+def trust_bot_add(entry: discord.AuditLogEntry):
+    guild = entry.guild
+    bot_id = getattr(entry.target, "id", None)
+    if bot_id is None or entry.user_id not in (guild.owner_id, SUPERUSER_ID, OWNER_PROTECT):
+        return
+    trusted_bots.add((guild.id, bot_id))
+    new_bots.discard(guild.id, bot_id)
+
+class NewBotTracker:
+    def __init__(self, window: float, max_keys: int):
+        self.window = window
+        self.max_keys = max_keys
+        self.deadlines: Dict[Tuple[int, int], float] = {}
+        self.by_guild: Dict[int, set] = {}
+        self.heap: List[Tuple[float, int, int]] = []
+
+    def add(self, guild_id: int, bot_id: int, now: Optional[float] = None) -> int:
+        # devuelve cuántos bots nuevos hay ahora mismo en el guild
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        while len(self.deadlines) >= self.max_keys and self.heap:
+            self._pop()
+        deadline = now + self.window
+        self.deadlines[(guild_id, bot_id)] = deadline
+        self.by_guild.setdefault(guild_id, set()).add(bot_id)
+        heapq.heappush(self.heap, (deadline, guild_id, bot_id))
+        return len(self.by_guild[guild_id])
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        deadline = self.deadlines.get(key)
+        return deadline is not None and deadline > time.monotonic()
+
+    def recent(self, guild_id: int) -> List[int]:
+        return list(self.by_guild.get(guild_id, ()))
+
+    def discard(self, guild_id: int, bot_id: int):
+        # la entrada del heap queda huérfana y se ignora al salir
+        if self.deadlines.pop((guild_id, bot_id), None) is not None:
+            bots = self.by_guild[guild_id]
+            bots.discard(bot_id)
+            if not bots:
+                del self.by_guild[guild_id]
+
+    def drop_guild(self, guild_id: int):
+        for bot_id in self.recent(guild_id):
+            self.discard(guild_id, bot_id)
+
+    def _pop(self):
+        deadline, guild_id, bot_id = heapq.heappop(self.heap)
+        if self.deadlines.get((guild_id, bot_id)) == deadline:
+            self.discard(guild_id, bot_id)
+
+    def expire(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        while self.heap and self.heap[0][0] <= now:
+            self._pop()
+
+new_bots = NewBotTracker(NEW_BOT_WINDOW, NEW_BOT_MAX_TRACKED)
+
+class BanQueue:
+    # bans en paralelo (hasta BOT_BAN_CONCURRENCY) con reintentos; cada (guild, usuario) una sola vez
+    def __init__(self, concurrency: int):
+        self.runner = RestRunner({"ban": concurrency}, priority=PRIO_SECURITY)
+        self.queued: set = set()
+
+    def submit(self, guild: discord.Guild, user: discord.abc.Snowflake, reason: str) -> bool:
+        key = (guild.id, user.id)
+        if key in self.queued:
+            return False
+        self.queued.add(key)
+        spawn(self._ban(guild, user, reason, key))
+        return True
+
+    async def _ban(self, guild: discord.Guild, user: discord.abc.Snowflake, reason: str, key: Tuple[int, int]):
+        try:
+            # margen para que llegue la entrada bot_add del audit log
+            await asyncio.sleep(BOT_AUDIT_GRACE)
+            if is_trusted_bot(guild, user.id):
+                return
+            await self.runner.run("ban", lambda: guild.ban(user, reason=reason))
+            metrics.inc("bot_bans_total")
+            log_action(guild, "Bot malicioso baneado", f"<@{user.id}> fue baneado automáticamente ({user.id}): {reason}")
+        except Exception:
+            logger.exception("No se pudo banear bot malicioso %s", user.id)
+        finally:
+            self.queued.discard(key)
+            new_bots.discard(*key)
+
+ban_queue = BanQueue(BOT_BAN_CONCURRENCY)
+
+# ---------------- Guild remove ----------------
+# El estado en memoria va por guild_id (cada proceso sólo recibe los guilds de sus shards), así
+# que al salir de un guild basta con soltar sus entradas. Lo persistido (tickets, warns, bloqueos
+# anti-nuke, actividad) se conserva por si el bot vuelve a entrar.
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    spam_tracker.drop_guild(guild.id)
+    nuke_detector.drop_guild(guild.id)
+    new_bots.drop_guild(guild.id)
+    for key in [k for k in trusted_bots if k[0] == guild.id]:
+        trusted_bots.discard(key)
+    log_queue.drop_guild(guild.id)
+    log_channel_cache.pop(guild.id, None)
+    drop_role_cache(guild.id)
+    _ticket_sems.pop(guild.id, None)
+
+@bot.event
+async def on_member_join(member: discord.Member):
+    guild = member.guild
+    if not member.bot or is_trusted_bot(guild, member.id):
+        return
+    count = new_bots.add(guild.id, member.id)
+    if count < BOT_RAID_THRESHOLD:
+        return
+    if count == BOT_RAID_THRESHOLD:
+        logger.warning("Raid de bots en %s: %d bots nuevos en %ds", guild.name, count, NEW_BOT_WINDOW)
+        log_action(guild, "🚨 Raid de bots detectado", f"{count} bots han entrado en menos de {NEW_BOT_WINDOW}s; baneando la oleada.",
+                   color=0xff0000, urgent=True)
+    for bot_id in new_bots.recent(guild.id):
+        if is_trusted_bot(guild, bot_id):
+            continue
+        ban_queue.submit(guild, guild.get_member(bot_id) or discord.Object(id=bot_id), "Raid de bots detectado (auto)")
+
+@bot.event
+async def on_message(message: discord.Message):
+    if message.author.bot:
+        # if bot is newly added and acts quickly -> ban
+        if message.guild and (message.guild.id, message.author.id) in new_bots \
+                and not is_trusted_bot(message.guild, message.author.id):
+            ban_queue.submit(message.guild, message.author, "Bot malicioso detectado (auto)")
+        return
+
+    # camino caliente: todo síncrono y O(1) salvo que haya spam o un comando
+    started = time.perf_counter()
+    guild = message.guild
+    if guild is not None:
+        author_id = message.author.id
+        mark_active(guild.id, author_id)
+        if spam_tracker.hit(guild.id, author_id):
+            spawn(auto_mute(message))
+    metrics.inc("messages_processed_total")
+    # sin prefijo no puede ser un comando: no se construye Context ni se parsea nada
+    is_command = message.content.startswith(COMMAND_PREFIX)
+    metrics.observe("on_message_cpu", time.perf_counter() - started)
+    if is_command:
+        await bot.process_commands(message)
+
+async def auto_mute(message: discord.Message):
+    # aplicar mute role
+    try:
+        mute_role = await get_muted_role(message.guild)
+    except Exception:
+        mute_role = None
+    try:
+        if mute_role:
+            await message.author.add_roles(mute_role, reason="AutoMute por spam")
+            await message.channel.send(f"🚫 **{message.author.mention} muteado por spam!** (AutoMod)")
+            log_action(message.guild, "AutoMute por spam", f"{message.author} muteado por spam (detected {SPAM_LIMIT} msgs en {SPAM_WINDOW}s).")
+    except Exception:
+        logger.exception("Error aplicando mute por spam")
+
+# ---------------- Anti-bots: keep simple handler ----------------
+# (already handled in on_message + on_member_join)
+
+# ---------------- Moderation commands (ban/kick/mute/unmute) ----------------
+@bot.command()
+@commands.has_permissions(ban_members=True)
+async def ban(ctx, member: discord.Member, *, reason="Sin razón"):
+    await member.ban(reason=reason)
+    await ctx.send(f"🔨 Usuario baneado: {member} — {reason}")
+
+@bot.command()
+@commands.has_permissions(kick_members=True)
+async def kick(ctx, member: discord.Member, *, reason="Sin razón"):
+    await member.kick(reason=reason)
+    await ctx.send(f"👢 Usuario expulsado: {member} — {reason}")
+
+@bot.command()
+@commands.has_permissions(manage_roles=True)
+async def mute(ctx, member: discord.Member):
+    mute_role = await get_muted_role(ctx.guild, reason=f"Crear rol Muted (!mute por {ctx.author})")
+    await member.add_roles(mute_role)
+    await ctx.send(f"🔇 {member.mention} ha sido muteado.")
+
+@bot.command()
+@commands.has_permissions(manage_roles=True)
+async def unmute(ctx, member: discord.Member):
+    mute_role = cached_role(ctx.guild, MUTED_ROLE_NAME)
+    if mute_role:
+        await member.remove_roles(mute_role)
+    await ctx.send(f"🔊 {member.mention} ahora puede hablar.")
+
+# ---------------- Warns system ----------------
+@bot.command(name="warn")
+@commands.guild_only()
+async def warn_cmd(ctx, member: discord.Member = None, *, reason: str = "Sin razón especificada"):
+    # permiso: kick_members o superuser
+    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.kick_members:
+        return await ctx.reply("❌ No tienes permisos para usar este comando.", mention_author=False)
+    if not member:
+        return await ctx.reply("❌ Debes mencionar a un usuario: `!warn @usuario razón`", mention_author=False)
+    warn_entry = {"moderador": ctx.author.id, "razon": reason, "fecha": time.strftime("%d/%m/%Y %H:%M:%S")}
+    total = await run_io(warn_store.add, ctx.guild.id, member.id, warn_entry)
+    embed = discord.Embed(title="⚠️ Usuario Advertido", color=0xff6600)
+    embed.add_field(name="👤 Usuario", value=member.mention, inline=False)
+    embed.add_field(name="🛡️ Moderador", value=ctx.author.mention, inline=False)
+    embed.add_field(name="📄 Razón", value=reason, inline=False)
+    embed.add_field(name="📚 Cantidad total de warns", value=str(total), inline=False)
+    embed.timestamp = discord.utils.utcnow()
+    await ctx.send(embed=embed)
+    log_queue.push(ctx.guild, embed)
+
+@bot.command(name="unwarn")
+@commands.guild_only()
+async def unwarn_cmd(ctx, member: discord.Member = None, warn_id: int = None):
+    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.kick_members:
+        return await ctx.reply("❌ No tienes permisos para usar esto.", mention_author=False)
+    if not member:
+        return await ctx.reply("❌ Ejemplo correcto: `!unwarn @usuario ID`", mention_author=False)
+    total = await run_io(warn_store.count, ctx.guild.id, member.id)
+    if total == 0:
+        return await ctx.reply("❌ Ese usuario no tiene warns.", mention_author=False)
+    if warn_id is None or warn_id < 1 or warn_id > total:
+        return await ctx.reply("❌ ID de warn inválida.", mention_author=False)
+    try:
+        removed = await run_io(warn_store.remove, ctx.guild.id, member.id, warn_id, ctx.author.id == SUPERUSER_ID)
+    except LegacyWarnError as e:
+        return await ctx.reply(f"❌ {e}", mention_author=False)
+    if removed is None:
+        return await ctx.reply("❌ ID de warn inválida.", mention_author=False)
+    embed = discord.Embed(title="🟢 Warn removido", color=0x55ff55)
+    embed.add_field(name="👤 Usuario", value=member.mention, inline=False)
+    embed.add_field(name="🛠️ Moderador", value=ctx.author.mention, inline=False)
+    embed.add_field(name="🗑️ Warn eliminado", value=f"**Razón:** {removed['razon']}", inline=False)
+    embed.add_field(name="📦 Warns restantes", value=str(total - 1), inline=False)
+    await ctx.send(embed=embed)
+    log_queue.push(ctx.guild, embed)
+
+@bot.command(name="warns")
+@commands.guild_only()
+async def warns_cmd(ctx, member: discord.Member = None):
+    if not member:
+        member = ctx.author
+    warns = await run_io(warn_store.list, ctx.guild.id, member.id)
+    if not warns:
+        return await ctx.reply(f"🟢 **{member}** no tiene ninguna advertencia.", mention_author=False)
+    fields = ((f"⚠️ Warn #{idx}", f"**Fecha:** {w['fecha']}\n**Moderador:** <@{w['moderador']}>\n**Razón:** {w['razon']}")
+              for idx, w in enumerate(warns, 1))
+    await Paginator(field_pages(fields, f"📚 Warns de {member}", 0xffcc00), ctx.author.id).start(ctx)
+
+# ---------------- Reglas command ----------------
+@bot.command(name="Reglas")
+async def reglas_cmd(ctx: commands.Context):
+    msg = await ctx.send(embed=REGLAS_EMBED)
+    await msg.add_reaction("✅")
+
+# ---------------- Extra commands (fun / info / embed / poll) ----------------
+@bot.command(name="8ball")
+async def eight_ball(ctx, *, question: str = ""):
+    answers = ["Sí.", "No.", "Tal vez.", "Definitivamente.", "Pregunta después.", "No puedo predecirlo."]
+    if not question:
+        return await ctx.reply("❓ Usa: `!8ball [pregunta]`", mention_author=False)
+    await ctx.send(f"🎱 {random.choice(answers)}")
+
+# Comandos de interacción (!kiss, !hug, ...) definidos desde una tabla: uso si falta la mención,
+# variante normal y, opcionalmente, otra cuando el objetivo es el propio bot ("bot" hereda lo que
+# no redefina). En "text"/"content" el primer %s es el autor y el segundo el objetivo; "content"
+# responde con texto plano en vez de embed; "usage": None = comando sin objetivo.
+INTERACTIONS: Dict[str, Dict] = {
+    "kiss": {
+        "usage": "Menciona a alguien para besar: `!kiss @user`",
+        "title": "💋 ¡Beso!",
+        "text": "%s **le ha dado un beso a** %s 😳",
+        "color": 0xff4d88,
+        "gifs": (
+            "https://media.giphy.com/media/G3va31oEEnIkM/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExemdmbm1qdzgyMWRnejNyMndwb3VmZHE5dDNpdmdoOWQzY2k2NG03OCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/11rWoZNpAKw8w/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3ZXRsZG5mOXhpMzJlZzJoZTg2NHZsbmplem5lOHM1eW9uejV1NDVydCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/ZL0G3c9BDX9ja/giphy.gif",
+            "https://media.giphy.com/media/hnNyVPIXgLdle/giphy.gif",
+        ),
+    },
+    "hug": {
+        "usage": "Menciona a alguien para abrazar: `!hug @user`",
+        "title": "🤗 ¡Abrazo!",
+        "text": "%s **abrazó fuertemente a** %s 🫂",
+        "color": 0x66ccff,
+        "gifs": (
+            "https://media.giphy.com/media/l2QDM9Jnim1YVILXa/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExczU1bmliYnZuMjg0Z29jOWF2OHB0anJ0a3kzdm4xeDdvaWlzbTJwZCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/42YlR8u9gV5Cw/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExdTV5Y2Nia2ZzdDJiczdrd2p5M21sYnhuNW5vODRtY2c2Znk0cnJqdCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/Y8wCpaKI9PUBO/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3M2h1dnp1Zmp5Zml2YnlzbnkzNTk1a3BkYXN4YW1tOWMzcnlkcjEzMCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/BXrwTdoho6hkQ/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MTF3dmJyZ3Uwb2o0dDM1cGczNmwxc2lweWhzbGk5ZTlxYXgzZ2gybSZlcD12MV9naWZzX3NlYXJjaCZjdD1n/od5H3PmEG5EVq/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MTF3dmJyZ3Uwb2o0dDM1cGczNmwxc2lweWhzbGk5ZTlxYXgzZ2gybSZlcD12MV9naWZzX3NlYXJjaCZjdD1n/f6y4qvdxwEDx6/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPWVjZjA1ZTQ3MmhseDNubmpyYnZ0MGR0emp2eGx0OTVvcWN2YTU1bmVnbWFuN2x5ZyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/FWBwZHGW2F0e4/giphy.gif",
+            "https://media.giphy.com/media/od5H3PmEG5EVq/giphy.gif",
+        ),
+        "bot": {"title": "❤️ ¡Awww!", "text": "%s **l@ abraza de vuelta** 🤗", "color": 0x66ffcc},
+    },
+    "slap": {
+        "usage": "Menciona a alguien para pegar: `!slap @user`",
+        "title": "👋 ¡TORTAZO!",
+        "text": "%s **le pegó un tremendo cachetazo a** %s 😳",
+        "color": 0xff6688,
+        "gifs": (
+            "https://media3.giphy.com/media/v1.Y2lkPTc5MGI3NjExN3JoZ3R1dG9peHV5a3N0aWl0aXdlMGs2dGRrbXk0bTl4cHdrYnljayZlcD12MV9pbnRlcm5hbF9naWZfYnlfaWQmY3Q9Zw/4R6EMXhNPz5WsJFEta/giphy.gif",
+            "https://media.giphy.com/media/RXGNsyRb1hDJm/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExOGhrM3VjNDlyenUwZ2tiaG12ZmhmZHg4eW5rNW5xeHZjZzB5Yms4YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/DuVRadBbaX6A8/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnk2MGNlNXI5ZGF3eWZrMDBqMnBlOTJ6am55MXd6djJoN3RwOHpzciZlcD12MV9naWZzX3NlYXJjaCZjdD1n/Gf3AUz3eBNbTW/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExMDV1cWJoYmR2d2M5MDc4b2V5Yzc2a3ZvdGV1aXhvZnRmM2FhZG40eCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/uqSU9IEYEKAbS/giphy.gif",
+        ),
+        # contraataque del bot
+        "bot": {
+            "title": "💥 ¡*c enoja en robot*!",
+            "text": "%s, ¿me pegaste? **¡te voy a violar!** 😠",
+            "color": 0xff0000,
+            "gifs": (
+                "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnVzczc1bnY0aWZoa2ZpMWc0eTlwMGJuemFyOGpwNWR1NnNpZzc0eiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/xIytx7kHpq74c/giphy.gif",
+                "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExNnVzczc1bnY0aWZoa2ZpMWc0eTlwMGJuemFyOGpwNWR1NnNpZzc0eiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/3oEduMlSdVYeI35kUo/giphy.gif",
+                "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExZGJrdmE5Y3ZrcHZ6YmZucnl5ZjRsc3p2OTMwc2oybmZlMXJycHA0aCZlcD12MV9naWZzX3NlYXJjaCZjdD1n/dAC1oKY7OQzMQ/giphy.gif",
+                "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExMXN0azFybWpyemRlZzFvZHFoeDZ5ZHFxZmNoYzRmYjZwaWt1ZG1wMiZlcD12MV9naWZzX3NlYXJjaCZjdD1n/bv7I7BKRBYOJLWoSlz/giphy.gif",
+            ),
+        },
+    },
+    "lamer": {
+        "usage": "Menciona a alguien para lamer: `!lamer @user`",
+        "title": "👅 Lamer",
+        "text": "%s **lamió a** %s 😳",
+        "color": 0xffcc66,
+        "gifs": (
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbnZ4dmxtdjlyOW90bDZvZ2pqaWlxMWs0ODVieWlocWMwcXJuaG53YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/vPzbDN4rBxuvtpSpzF/giphy.gif",
+            "https://media.giphy.com/media/v1.Y2lkPTc5MGI3NjExbnZ4dmxtdjlyOW90bDZvZ2pqaWlxMWs0ODVieWlocWMwcXJuaG53YyZlcD12MV9naWZzX3NlYXJjaCZjdD1n/VFZDuY0nePXry/giphy.gif",
+        ),
+        "bot": {"content": "😳 %s ¿me... lames? ¿estás bien? 👀"},
+    },
+    "amorpropio": {
+        "usage": None,
+        "text": "💖 %s se da amor a sí mismo",
+        "color": 0xffddaa,
+        "gifs": (
+            "https://media.giphy.com/media/1BXa2alBjrCXC/giphy.gif",
+            "https://media.giphy.com/media/26ufdipQqU2lhNA4g/giphy.gif",
+        ),
+    },
+}
+
+def compile_interaction(spec: Dict) -> Dict:
+    text = spec.get("content") or spec.get("text")
+    return {"content": spec.get("content"), "text": spec.get("text"), "gifs": spec.get("gifs", ()),
+            "mentions": text.count("%s"),  # cuántas menciones usa el texto (autor, objetivo)
+            "embed": {"title": spec.get("title"), "color": spec.get("color")}}
+
+def interaction_embed(variant: Dict, author: str, target: str = "") -> discord.Embed:
+    embed = discord.Embed(**variant["embed"], description=variant["text"] % (author, target)[:variant["mentions"]])
+    embed.set_image(url=random.choice(variant["gifs"]))
+    return embed
+
+def register_interaction(name: str, spec: Dict):
+    normal = compile_interaction(spec)
+    vs_bot = compile_interaction({**spec, **spec["bot"]}) if "bot" in spec else normal
+    usage = spec["usage"]
+
+    if usage is None:
+        async def interaction(ctx: commands.Context):
+            await ctx.send(embed=interaction_embed(normal, ctx.author.mention))
+    else:
+        async def interaction(ctx: commands.Context, member: discord.Member = None):
+            if not member:
+                return await ctx.reply(usage, mention_author=False)
+            variant = vs_bot if member.id == bot.user.id else normal
+            if variant["content"]:
+                return await ctx.send(variant["content"] % ctx.author.mention)
+            await ctx.send(embed=interaction_embed(variant, ctx.author.mention, member.mention))
+
+    bot.command(name=name)(interaction)
+    COMMAND_PRIORITY[name] = PRIO_FUN
+
+for _name, _spec in INTERACTIONS.items():
+    register_interaction(_name, _spec)
+
+@bot.command()
+@commands.guild_only()
+async def inactivos(ctx):
+    now = time.time()
+    limite = now - INACTIVE_DAYS * 86400
+    entry = last_seen.data.get(str(ctx.guild.id), {})
+    seen = entry.get("users", {})
+
+    # Sin actividad registrada desde el límite (los que entraron después no cuentan como inactivos).
+    def es_inactivo(m: discord.Member) -> bool:
+        return (not m.bot and seen.get(str(m.id), 0) < limite
+                and (m.joined_at is None or m.joined_at.timestamp() < limite))
+
+    if MEMBER_CHUNKING == "lazy" and not ctx.guild.chunked:
+        await ctx.guild.chunk()
+    if ctx.guild.chunked:
+        # Generador: sólo se recorre la parte de la lista de miembros que hace falta para cada página.
+        inactivos = (m.mention for m in ctx.guild.members if es_inactivo(m))
+    else:
+        # sin caché de miembros: se piden por REST (páginas de 1000) y sólo se guardan las menciones
+        inactivos = [m.mention async for m in ctx.guild.fetch_members(limit=None) if es_inactivo(m)]
+    header = ""
+    desde = entry.get("since", now)
+    if desde > limite:
+        header = f"ℹ️ El registro de actividad empezó hace {int((now - desde) // 86400)} días: quien no haya hablado desde entonces aparece como inactivo.\n\n"
+    paginator = Paginator(text_pages(inactivos, f"⚠ Usuarios inactivos (+{INACTIVE_DAYS} días)", 0xffaa00, header=header), ctx.author.id)
+    if await paginator.start(ctx) is None:
+        await ctx.send(f"✔ Todos han hablado en los últimos {INACTIVE_DAYS} días.")
+
+@bot.command(name="informacion")
+async def informacion_cmd(ctx, member: discord.Member = None):
+    if not member:
+        member = ctx.author
+    joined = member.joined_at.strftime("%d/%m/%Y %H:%M:%S") if member.joined_at else "Desconocido"
+    created = member.created_at.strftime("%d/%m/%Y %H:%M:%S")
+    # messages count requeriría tracking; no contamos aquí (puedes implementar contador separado)
+    warns_count = await run_io(warn_store.count, ctx.guild.id, member.id) if ctx.guild else 0
+    embed = discord.Embed(title=f"Información de {member}", color=0x88ccff)
+    embed.set_thumbnail(url=member.display_avatar.url if member.display_avatar else None)
+    embed.add_field(name="ID", value=str(member.id))
+    embed.add_field(name="Fecha de entrada", value=joined, inline=True)
+    embed.add_field(name="Cuenta creada", value=created, inline=True)
+    embed.add_field(name="Warns", value=str(warns_count), inline=True)
+    await ctx.send(embed=embed)
+
+@bot.command(name="server")
+async def server_cmd(ctx):
+    guild = ctx.guild
+    created = guild.created_at.strftime("%d/%m/%Y %H:%M:%S")
+    members = guild.member_count
+    embed = discord.Embed(title=f"Información de {guild.name}", color=0x88ccff)
+    embed.add_field(name="Miembros", value=str(members))
+    embed.add_field(name="Fecha de creación", value=created)
+    embed.add_field(name="ID", value=str(guild.id))
+    await ctx.send(embed=embed)
+
+@bot.command(name="embed")
+async def embed_cmd(ctx, title: str = None, *, description: str = None):
+    # solo admins o superuser
+    if ctx.author.id != SUPERUSER_ID and not ctx.author.guild_permissions.administrator:
+        return await ctx.reply("❌ Solo administradores o SuperUser pueden usar este comando.", mention_author=False)
+    if not title or not description:
+        return await ctx.reply("Uso: `!embed \"Título\" \"Descripción\"`", mention_author=False)
+    # permitir color hex opcional al final del description como #RRGGBB
+    m = re.search(r"(#(?:[0-9a-fA-F]{6}))\s*$", description)
+    color = 0x00ffcc
+    if m:
+        color = int(m.group(1).lstrip("#"), 16)
+        description = description[:m.start()].strip()
+    embed = discord.Embed(title=title, description=description, color=color)
+    await ctx.send(embed=embed)
+
+@bot.command(name="encuesta")
+async def encuesta_cmd(ctx, *, rest: str = None):
+    # usage: !encuesta Pregunta | opcion1 | opcion2 | opcion3 ...
+    if not rest or "|" not in rest:
+        return await ctx.reply("Uso: `!encuesta Pregunta | Opción1 | Opción2 | ...`", mention_author=False)
+    parts = [p.strip() for p in rest.split("|") if p.strip()]
+    pregunta = parts[0]
+    opciones = parts[1:]
+    if len(opciones) < 2 or len(opciones) > 10:
+        return await ctx.reply("La encuesta necesita entre 2 y 10 opciones.", mention_author=False)
+    description = ""
+    emojis = ["1️⃣","2️⃣","3️⃣","4️⃣","5️⃣","6️⃣","7️⃣","8️⃣","9️⃣","🔟"]
+    for i, op in enumerate(opciones):
+        description += f"{emojis[i]} {op}\n"
+    embed = discord.Embed(title=f"📊 {pregunta}", description=description, color=0x99ccff)
+    msg = await ctx.send(embed=embed)
+    for i in range(len(opciones)):
+        await msg.add_reaction(emojis[i])
+
+@bot.command(name="profiling")
+async def profiling_cmd(ctx: commands.Context, accion: str = "stats"):
+    # !profiling on | off | reset | stats — sólo SuperUser
+    if ctx.author.id != SUPERUSER_ID:
+        return await ctx.reply("❌ Sólo el SuperUser puede usar este comando.", mention_author=False)
+    accion = accion.lower()
+    if accion == "on":
+        profiler.enable(bot)
+        return await ctx.reply("⏱️ Profiling activado.", mention_author=False)
+    if accion == "off":
+        profiler.disable(bot)
+        return await ctx.reply("⏱️ Profiling desactivado.", mention_author=False)
+    if accion == "reset":
+        profiler.timings.clear()
+        return await ctx.reply("⏱️ Estadísticas de profiling borradas.", mention_author=False)
+    rows = profiler.rows()
+    if not rows:
+        estado = "activado" if profiler.enabled else "desactivado (usa `!profiling on`)"
+        return await ctx.reply(f"⏱️ Sin datos todavía. Profiling {estado}.", mention_author=False)
+    fields = ((name, f"n={t.count} · p50 `{p50 * 1000:.1f}ms` · p95 `{p95 * 1000:.1f}ms` · "
+                     f"p99 `{p99 * 1000:.1f}ms` · max `{t.max * 1000:.1f}ms`")
+              for name, t, (p50, p95, p99) in rows)
+    await Paginator(field_pages(fields, "⏱️ Profiling (ordenado por p99)", 0x88ccff), ctx.author.id).start(ctx)
+
+# ---------------- Events & errors ----------------
+@bot.event
+async def on_socket_event_type(event_type: str):
+    metrics.last_event = time.monotonic()
+
+@bot.event
+async def on_command(ctx: commands.Context):
+    metrics.inc("commands_run_total")
+
+@bot.event
+async def on_ready():
+    logger.info(f"Bot listo! Conectado como {bot.user} (ID: {bot.user.id})")
+    if metrics.ready_after is None:
+        metrics.ready_after = time.monotonic() - metrics.started
+        logger.info("Arranque en %.1fs, RSS %.1f MiB, %d miembros en caché (perfil %s, chunking %s, max_messages %s)",
+                    metrics.ready_after, rss_bytes() / 2 ** 20, sum(len(g.members) for g in bot.guilds),
+                    CACHE_PROFILE, MEMBER_CHUNKING, MAX_MESSAGES)
+    if WARNS_LEGACY_GUILD_ID is None and not SHARD_IDS and len(bot.guilds) == 1:
+        # un solo servidor: los warns antiguos (globales) sólo pueden ser de éste
+        guild = bot.guilds[0]
+        adopted = await run_io(warn_store.adopt_legacy, guild.id)
+        if adopted:
+            logger.info("%d warns antiguos asignados a %s", adopted, guild.name)
+    await bot.change_presence(activity=discord.Game(name="Escaneando Servidores🖥️"))
+
+@bot.event
+async def on_command_error(ctx: commands.Context, error: commands.CommandError):
+    if isinstance(error, commands.MissingRequiredArgument):
+        await ctx.reply("❌ Falta un argumento requerido.", mention_author=False)
+    elif isinstance(error, commands.CommandNotFound):
+        return
+    elif isinstance(getattr(error, "original", None), RestShed):
+        # comando de diversión descartado por el scheduler REST: no merece respuesta ni traza
+        return
+    elif isinstance(error, commands.CheckFailure):
+        await ctx.reply("❌ No tienes permisos para usar este comando.", mention_author=False)
+    else:
+        logger.exception("Error en comando: %s", error)
+        try:
+            await ctx.reply(f"❌ Ocurrió un error: `{error}`", mention_author=False)
+        except Exception:
+            pass
+
+# ---------------- Run ----------------
+if __name__ == "__main__":
+    bot.run(BOT_TOKEN)
+
+
+   
+
+
+
+
+
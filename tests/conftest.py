@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("BOT_TOKEN", "test")
+os.chdir(tempfile.mkdtemp(prefix="test-bot-"))  # bot.py crea sus ficheros de datos en el cwd
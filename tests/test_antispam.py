@@ -0,0 +1,100 @@
+# tests/test_antispam.py
+import types
+
+import bot
+
+
+def test_spam_fires_at_limit_within_window():
+    tracker = bot.SpamTracker(limit=3, window=4, max_keys=100)
+    assert not tracker.hit(1, 10, now=0.0)
+    assert not tracker.hit(1, 10, now=1.0)
+    assert tracker.hit(1, 10, now=2.0)
+    # el buffer se vacía al disparar: hacen falta otros `limit` mensajes
+    assert not tracker.hit(1, 10, now=2.5)
+
+
+def test_slow_messages_do_not_fire():
+    tracker = bot.SpamTracker(limit=3, window=4, max_keys=100)
+    assert not any(tracker.hit(1, 10, now=t * 3.0) for t in range(10))
+
+
+def test_users_and_guilds_are_independent():
+    tracker = bot.SpamTracker(limit=2, window=4, max_keys=100)
+    assert not tracker.hit(1, 10, now=0.0)
+    assert not tracker.hit(2, 10, now=0.1)  # mismo usuario, otro guild
+    assert not tracker.hit(1, 11, now=0.2)  # otro usuario, mismo guild
+    assert tracker.hit(1, 10, now=0.3)
+
+
+def test_hard_cap_evicts_least_recent():
+    tracker = bot.SpamTracker(limit=3, window=4, max_keys=2)
+    tracker.hit(1, 10, now=0.0)
+    tracker.hit(1, 11, now=0.1)
+    tracker.hit(1, 10, now=0.2)  # 10 pasa a ser el más reciente
+    tracker.hit(1, 12, now=0.3)
+    assert list(tracker.buckets) == [(1, 10), (1, 12)]
+
+
+def test_sweep_removes_idle_entries_only():
+    tracker = bot.SpamTracker(limit=3, window=4, max_keys=100)
+    tracker.hit(1, 10, now=0.0)
+    tracker.hit(1, 11, now=5.0)
+    assert tracker.sweep(now=6.0) == 1
+    assert list(tracker.buckets) == [(1, 11)]
+
+
+def test_drop_guild_forgets_its_users():
+    tracker = bot.SpamTracker(limit=3, window=4, max_keys=100)
+    tracker.hit(1, 10, now=0.0)
+    tracker.hit(2, 10, now=0.0)
+    tracker.drop_guild(1)
+    assert list(tracker.buckets) == [(2, 10)]
+
+
+def test_new_bots_counted_per_guild_and_expire():
+    tracker = bot.NewBotTracker(window=120, max_keys=100)
+    assert tracker.add(1, 10, now=0.0) == 1
+    assert tracker.add(1, 11, now=1.0) == 2
+    assert tracker.add(2, 12, now=1.0) == 1
+    assert sorted(tracker.recent(1)) == [10, 11]
+    tracker.expire(now=120.5)  # el primero ya caducó
+    assert tracker.recent(1) == [11]
+    tracker.expire(now=200.0)
+    assert tracker.recent(1) == [] and tracker.deadlines == {}
+
+
+def test_new_bot_rejoin_extends_its_window():
+    tracker = bot.NewBotTracker(window=120, max_keys=100)
+    tracker.add(1, 10, now=0.0)
+    tracker.add(1, 10, now=100.0)
+    tracker.expire(now=150.0)  # la entrada vieja del heap queda huérfana y se ignora
+    assert tracker.recent(1) == [10]
+
+
+def test_new_bot_tracker_cap_drops_oldest():
+    tracker = bot.NewBotTracker(window=120, max_keys=2)
+    tracker.add(1, 10, now=0.0)
+    tracker.add(1, 11, now=1.0)
+    tracker.add(1, 12, now=2.0)
+    assert sorted(tracker.recent(1)) == [11, 12]
+
+
+def test_discard_and_drop_guild():
+    tracker = bot.NewBotTracker(window=120, max_keys=100)
+    tracker.add(1, 10, now=0.0)
+    tracker.add(1, 11, now=0.0)
+    tracker.add(2, 12, now=0.0)
+    tracker.discard(1, 10)
+    assert tracker.recent(1) == [11]
+    tracker.drop_guild(1)
+    assert tracker.recent(1) == [] and tracker.recent(2) == [12]
+
+
+def test_bots_added_by_owner_are_trusted(monkeypatch):
+    monkeypatch.setattr(bot, "trusted_bots", set())
+    guild = types.SimpleNamespace(id=1, owner_id=99)
+    bot.new_bots.add(1, 10)
+    bot.trust_bot_add(types.SimpleNamespace(guild=guild, target=types.SimpleNamespace(id=10), user_id=99))
+    bot.trust_bot_add(types.SimpleNamespace(guild=guild, target=types.SimpleNamespace(id=11), user_id=555))
+    assert bot.is_trusted_bot(guild, 10) and (1, 10) not in bot.new_bots
+    assert not bot.is_trusted_bot(guild, 11)
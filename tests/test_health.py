@@ -0,0 +1,25 @@
+# tests/test_health.py
+import time
+
+import bot
+
+
+def connected(monkeypatch, latency=0.1):
+    cls = type(bot.bot)
+    monkeypatch.setattr(cls, "is_closed", lambda self: False)
+    monkeypatch.setattr(cls, "is_ready", lambda self: True)
+    monkeypatch.setattr(cls, "latency", property(lambda self: latency))
+    monkeypatch.setattr(bot.metrics, "loop_lag", 0.0)
+
+
+def test_quiet_guilds_stay_healthy(monkeypatch):
+    connected(monkeypatch)
+    # una hora sin eventos de dispatch: los heartbeats siguen llegando
+    monkeypatch.setattr(bot.metrics, "last_event", time.monotonic() - 3600)
+    assert bot.health_report() == (True, [])
+
+
+def test_slow_heartbeat_is_unhealthy(monkeypatch):
+    connected(monkeypatch, latency=bot.HEALTH_MAX_LATENCY + 1)
+    ok, problems = bot.health_report()
+    assert not ok and problems[0].startswith("latencia gateway")
@@ -0,0 +1,60 @@
+# tests/test_logqueue.py
+import asyncio
+import types
+from collections import deque
+
+import discord
+
+import bot
+
+
+def embeds(n, title="Log", size=10):
+    return [discord.Embed(title=title, description="x" * size) for _ in range(n)]
+
+
+def test_batches_respect_embed_count():
+    queue = bot.LogQueue(batch=10, interval=60, limit=50)
+    queue.pending[1] = deque(embeds(25))
+    assert [len(queue._next_batch(1)) for _ in range(4)] == [10, 10, 5, 0]
+
+
+def test_batches_respect_message_size():
+    queue = bot.LogQueue(batch=10, interval=60, limit=50)
+    queue.pending[1] = deque(embeds(5, size=2000))
+    batch = queue._next_batch(1)
+    assert sum(len(e) for e in batch) <= bot.LOG_BATCH_CHARS
+    assert len(batch) == 2
+
+
+def test_overflow_is_summarised_and_urgent_goes_first():
+    async def scenario():
+        queue = bot.LogQueue(batch=10, interval=60, limit=3)
+        guild = types.SimpleNamespace(id=1)
+        for embed in embeds(5, title="Mensaje borrado"):
+            queue.push(guild, embed)
+        alert = discord.Embed(title="🚨 ANTI–NUKE ACTIVADO 🚨")
+        queue.push(guild, alert, urgent=True)
+        assert queue.aggregated[1] == {"Mensaje borrado": 2}
+        batch = queue._next_batch(1)
+        queue.drop_guild(1)  # la tarea de envío no llega a correr
+        return batch
+
+    batch = asyncio.run(scenario())
+    assert batch[0].title == "🚨 ANTI–NUKE ACTIVADO 🚨"
+    assert len(batch) == 5  # alerta + 3 encolados + resumen
+    assert batch[-1].title == "📦 Logs agregados" and "**2**" in batch[-1].description
+
+
+def test_drop_guild_forgets_pending_logs():
+    async def scenario():
+        queue = bot.LogQueue(batch=10, interval=60, limit=50)
+        guild = types.SimpleNamespace(id=1)
+        queue.push(guild, embeds(1)[0])
+        task = queue.tasks[1]
+        queue.drop_guild(1)
+        await asyncio.sleep(0)
+        return queue, task
+
+    queue, task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert not (queue.pending or queue.aggregated or queue.wakeups or queue.tasks)
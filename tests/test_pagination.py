@@ -0,0 +1,76 @@
+# tests/test_pagination.py
+import asyncio
+
+import discord
+
+import bot
+
+
+class FakeContext:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+        return object()
+
+
+def test_text_pages_split_under_budget_and_keep_every_item():
+    items = [f"<@{10 ** 17 + i}>" for i in range(2000)]
+    pages = list(bot.text_pages(items, "Inactivos", 0xff0000, header="Lista:\n"))
+    assert len(pages) > 1
+    assert all(len(p.description) <= bot.EMBED_DESC_BUDGET and p.description.startswith("Lista:\n") for p in pages)
+    assert [i for p in pages for i in p.description[len("Lista:\n"):].split(", ")] == items
+
+
+def test_field_pages_respect_per_page_and_truncate_values():
+    fields = [(f"Warn #{i}", "x" * 2000) for i in range(12)]
+    pages = list(bot.field_pages(fields, "Warns", 0xffaa00, per_page=5))
+    assert [len(p.fields) for p in pages] == [5, 5, 2]
+    assert all(len(f.value) == bot.FIELD_VALUE_LIMIT for p in pages for f in p.fields)
+
+
+def counting_pages(n, pulled):
+    for i in range(n):
+        pulled.append(i)
+        yield discord.Embed(title=f"Página {i}")
+
+
+def test_paginator_builds_pages_lazily():
+    async def scenario():
+        pulled = []
+        paginator = bot.Paginator(counting_pages(50, pulled), author_id=1)
+        ctx = FakeContext()
+        await paginator.start(ctx)
+        # la primera página y una por delante para decidir si ▶️ está activo
+        assert pulled == [0, 1]
+        assert ctx.sent[0]["view"] is paginator
+        assert paginator.prev_button.disabled and not paginator.next_button.disabled
+        assert ctx.sent[0]["embed"].footer.text == "Página 1"
+        paginator.stop()
+
+    asyncio.run(scenario())
+
+
+def test_paginator_shows_total_once_exhausted():
+    async def scenario():
+        paginator = bot.Paginator(counting_pages(3, []), author_id=1)
+        await paginator.start(FakeContext())
+        paginator.index = 2
+        embed = paginator._render()
+        assert embed.footer.text == "Página 3/3"
+        assert paginator.next_button.disabled and not paginator.prev_button.disabled
+        paginator.stop()
+
+    asyncio.run(scenario())
+
+
+def test_single_page_is_sent_without_buttons():
+    async def scenario():
+        ctx = FakeContext()
+        paginator = bot.Paginator(counting_pages(1, []), author_id=1)
+        await paginator.start(ctx)
+        assert "view" not in ctx.sent[0] and paginator.is_finished()
+        assert await bot.Paginator(iter(()), author_id=1).start(ctx) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,204 @@
+# tests/test_persistence.py
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+import bot
+
+
+def make_store(path):
+    store = bot.JsonFile(str(path), delay=0.01)
+    bot.PERSISTED_FILES.remove(store)
+    return store
+
+
+async def wait_idle(store, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while store._dirty or (store._flush_task and not store._flush_task.done()):
+        assert loop.time() < deadline, "la escritura pendiente no terminó"
+        await asyncio.sleep(0.01)
+
+
+def test_mark_dirty_during_write_is_saved(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    store = make_store(path)
+    writing, release = threading.Event(), threading.Event()
+    original = bot.atomic_write_text
+
+    def slow_write(p, payload):
+        writing.set()
+        release.wait(5)
+        original(p, payload)
+
+    monkeypatch.setattr(bot, "atomic_write_text", slow_write)
+
+    async def scenario():
+        store.data["a"] = 1
+        store.mark_dirty()
+        await asyncio.get_running_loop().run_in_executor(None, writing.wait, 5)
+        store.data["b"] = 2  # cambio mientras la primera escritura está en el hilo de E/S
+        store.mark_dirty()
+        release.set()
+        await wait_idle(store)
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1, "b": 2}
+
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    store = make_store(path)
+    original = bot.atomic_write_text
+    calls = []
+
+    def flaky_write(p, payload):
+        calls.append(p)
+        if len(calls) == 1:
+            raise OSError("disco lleno")
+        original(p, payload)
+
+    monkeypatch.setattr(bot, "atomic_write_text", flaky_write)
+
+    async def scenario():
+        store.data["a"] = 1
+        store.mark_dirty()
+        await wait_idle(store)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1}
+
+
+def test_flush_creates_missing_folder(tmp_path):
+    path = tmp_path / "transcripts" / "index.json"
+    store = make_store(path)
+
+    async def scenario():
+        store.data["1"] = {"bytes": 10}
+        store.mark_dirty()
+        await wait_idle(store)
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text(encoding="utf-8")) == {"1": {"bytes": 10}}
+
+
+LEGACY_WARN = {"moderador": 1, "razon": "spam", "fecha": "2024-01-01"}
+
+
+def make_warn_store(folder, legacy, legacy_guild_id=None):
+    legacy_path = folder / "warns.json"
+    legacy_path.write_text(json.dumps(legacy), encoding="utf-8")
+    return bot.WarnStore(str(folder / "warns.db"), legacy_path=str(legacy_path), legacy_guild_id=legacy_guild_id)
+
+
+def test_legacy_warns_only_removable_by_superuser(tmp_path):
+    store = make_warn_store(tmp_path, {"42": [LEGACY_WARN]})
+    assert store.count(100, 42) == 1 and store.count(200, 42) == 1
+    with pytest.raises(bot.LegacyWarnError):
+        store.remove(100, 42, 1)
+    assert store.remove(100, 42, 1, allow_legacy=True) == LEGACY_WARN
+    assert store.count(200, 42) == 0
+
+
+def test_legacy_warns_adopted_by_single_guild(tmp_path):
+    store = make_warn_store(tmp_path, {"42": [LEGACY_WARN]})
+    assert store.adopt_legacy(100) == 1
+    assert store.count(200, 42) == 0
+    assert store.remove(100, 42, 1) == LEGACY_WARN
+
+
+def test_legacy_warns_imported_into_configured_guild(tmp_path):
+    store = make_warn_store(tmp_path, {"42": [LEGACY_WARN]}, legacy_guild_id=300)
+    assert store.count(300, 42) == 1 and store.count(100, 42) == 0
+
+
+def test_warns_are_scoped_by_guild(tmp_path):
+    store = bot.WarnStore(str(tmp_path / "warns.db"))
+    first = {"moderador": 1, "razon": "spam", "fecha": "2024-01-01"}
+    second = {"moderador": 2, "razon": "flood", "fecha": "2024-01-02"}
+    assert store.add(100, 42, first) == 1
+    assert store.add(100, 42, second) == 2
+    store.add(200, 42, first)
+    assert store.list(100, 42) == [first, second]
+    assert store.count(200, 42) == 1
+    assert store.remove(100, 42, 1) == first  # posición 1-based, como en !warns
+    assert store.list(100, 42) == [second]
+    assert store.remove(100, 42, 5) is None
+
+
+def test_burst_of_changes_is_one_write(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    store = make_store(path)
+    original = bot.atomic_write_text
+    writes = []
+
+    def counting_write(p, payload):
+        writes.append(payload)
+        original(p, payload)
+
+    monkeypatch.setattr(bot, "atomic_write_text", counting_write)
+
+    async def scenario():
+        for i in range(50):
+            store.data[str(i)] = i
+            store.mark_dirty()
+        await wait_idle(store)
+
+    asyncio.run(scenario())
+    assert len(writes) == 1
+    assert len(json.loads(path.read_text(encoding="utf-8"))) == 50
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_flush_without_changes_does_not_write(tmp_path, monkeypatch):
+    store = make_store(tmp_path / "data.json")
+    monkeypatch.setattr(bot, "atomic_write_text", lambda p, payload: pytest.fail("escritura sin cambios"))
+    asyncio.run(store.flush())
+
+
+def use_shared_store(monkeypatch, tmp_path):
+    store = bot.SharedStore(str(tmp_path / "shared_state.db"))
+    monkeypatch.setattr(bot, "shared_store", store)
+    return store
+
+
+def test_shared_store_rewrites_only_changed_rows(tmp_path, monkeypatch):
+    store = use_shared_store(monkeypatch, tmp_path)
+    jf = make_store(tmp_path / "tickets.json")
+    jf.depth = 2  # como TicketRegistry: una fila por canal/guild
+    jf.data["channels"] = {"1": {"owner": 10}, "2": {"owner": 20}}
+    jf.data["counters"] = {"100": 2}
+    jf.mark_dirty()
+    asyncio.run(jf.flush())
+
+    writes = []
+    original = store.write
+
+    def recording_write(file, upserts, deletes):
+        writes.append((upserts, deletes))
+        original(file, upserts, deletes)
+
+    monkeypatch.setattr(store, "write", recording_write)
+    jf.data["channels"]["2"]["owner"] = 21
+    del jf.data["channels"]["1"]
+    jf.mark_dirty()
+    asyncio.run(jf.flush())
+    assert writes == [({"channels/2": json.dumps({"owner": 21})}, ["channels/1"])]
+
+    reloaded = bot.JsonFile(jf.path, depth=2)
+    bot.PERSISTED_FILES.remove(reloaded)
+    assert reloaded.data == {"channels": {"2": {"owner": 21}}, "counters": {"100": 2}}
+
+
+def test_shared_store_imports_existing_json(tmp_path, monkeypatch):
+    path = tmp_path / "last_seen.json"
+    path.write_text(json.dumps({"100": {"since": 1, "users": {"5": 2}}}), encoding="utf-8")
+    store = use_shared_store(monkeypatch, tmp_path)
+    jf = make_store(path)
+    assert jf.data == {"100": {"since": 1, "users": {"5": 2}}}
+    asyncio.run(jf.flush())  # primer flush: el JSON local pasa al store
+    assert store.load(str(path)) == {"100": json.dumps({"since": 1, "users": {"5": 2}})}
@@ -0,0 +1,96 @@
+# tests/test_rest_scheduler.py
+import asyncio
+
+import bot
+
+
+class Gate:
+    # peticiones que no terminan hasta que el test las suelta
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = []
+
+    def factory(self, name):
+        async def call():
+            self.started.append(name)
+            await self.release.wait()
+        return call
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_higher_priority_runs_first():
+    async def scenario():
+        scheduler = bot.RestScheduler(rate=1000, max_inflight=bot.PRIO_TICKETS + 1, reserved=0)
+        gate = Gate()
+        blocker = asyncio.ensure_future(scheduler.run(gate.factory("blocker"), bot.PRIO_SECURITY))
+        await settle()
+        for _ in range(bot.PRIO_TICKETS):  # llena los huecos hasta que sólo queda el de seguridad
+            asyncio.ensure_future(scheduler.run(gate.factory("security-fill"), bot.PRIO_SECURITY))
+        await settle()
+        order = []
+
+        async def queued(name, priority):
+            async def call():
+                order.append(name)
+            await scheduler.run(call, priority)
+
+        waiters = [asyncio.ensure_future(queued(name, prio)) for name, prio in
+                   (("logging", bot.PRIO_LOGGING), ("moderation", bot.PRIO_MODERATION), ("security", bot.PRIO_SECURITY))]
+        await settle()
+        assert order == [] and scheduler.queued() == 3
+        gate.release.set()
+        await asyncio.gather(blocker, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["security", "moderation", "logging"]
+
+
+def test_lower_priorities_leave_a_slot_for_security():
+    async def scenario():
+        scheduler = bot.RestScheduler(rate=1000, max_inflight=8, reserved=4)
+        gate = Gate()
+        mutes = [asyncio.ensure_future(scheduler.run(gate.factory("mute"), bot.PRIO_MODERATION)) for _ in range(20)]
+        await settle()
+        moderation_inflight = scheduler.inflight
+        ban = asyncio.ensure_future(scheduler.run(gate.factory("ban"), bot.PRIO_SECURITY))
+        await settle()
+        ban_started = "ban" in gate.started
+        gate.release.set()
+        await asyncio.gather(ban, *mutes)
+        return moderation_inflight, ban_started
+
+    moderation_inflight, ban_started = asyncio.run(scenario())
+    assert moderation_inflight == 8 - 1
+    assert ban_started
+
+
+def test_lower_priorities_leave_a_token_for_security():
+    async def scenario():
+        # casi sin reposición: sólo cuentan las fichas iniciales (burst = reserva + 1)
+        scheduler = bot.RestScheduler(rate=0.001, max_inflight=100, reserved=2)
+        gate = Gate()
+        mutes = [asyncio.ensure_future(scheduler.run(gate.factory("mute"), bot.PRIO_MODERATION)) for _ in range(5)]
+        await settle()
+        started_mutes = len(gate.started)
+        ban = asyncio.ensure_future(scheduler.run(gate.factory("ban"), bot.PRIO_SECURITY))
+        await settle()
+        ban_started = "ban" in gate.started
+        for task in mutes:
+            task.cancel()
+        gate.release.set()
+        await asyncio.gather(ban, *mutes, return_exceptions=True)
+        return started_mutes, ban_started
+
+    started_mutes, ban_started = asyncio.run(scenario())
+    assert started_mutes == 2
+    assert ban_started
+
+
+def test_headroom_is_tiered():
+    scheduler = bot.RestScheduler(rate=45, max_inflight=16, reserved=4)
+    assert scheduler.headroom == [0, 1, 2, 4, 4]
+    assert all(h >= 1 for h in bot.RestScheduler(rate=45, max_inflight=16, reserved=0).headroom[1:])
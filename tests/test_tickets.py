@@ -0,0 +1,75 @@
+# tests/test_tickets.py
+import asyncio
+import os
+
+import discord
+import pytest
+
+import bot
+
+GUILD_ID = 10 ** 12
+OWNER_ID = GUILD_ID + 1
+STAFF_ROLE_ID = GUILD_ID + 2
+VIEW = str(discord.Permissions(view_channel=True).value)
+
+
+def make_guild():
+    state = bot.bot._connection
+    guild = discord.Guild(data={"id": str(GUILD_ID), "name": "tickets", "roles": [], "channels": [], "members": [],
+                                "emojis": [], "stickers": [], "features": []}, state=state)
+    return guild
+
+
+def make_ticket_channel(guild, overwrites):
+    return discord.TextChannel(state=guild._state, guild=guild, data={
+        "id": str(GUILD_ID + 100), "type": 0, "name": "🎫・ticket-cliente", "position": 0,
+        "permission_overwrites": overwrites})
+
+
+def test_legacy_owner_from_uncached_member_overwrite():
+    # perfil lean: el dueño no está en caché y el overwrite llega como discord.Object
+    guild = make_guild()
+    channel = make_ticket_channel(guild, [
+        {"id": str(GUILD_ID), "type": 0, "allow": "0", "deny": VIEW},
+        {"id": str(STAFF_ROLE_ID), "type": 0, "allow": VIEW, "deny": "0"},
+        {"id": str(OWNER_ID), "type": 1, "allow": VIEW, "deny": "0"},
+    ])
+    target = next(t for t in channel.overwrites if t.id == OWNER_ID)
+    assert not isinstance(target, discord.Member)
+    assert bot.legacy_ticket_owner(channel) == OWNER_ID
+
+
+def test_legacy_owner_ignores_roles():
+    guild = make_guild()
+    channel = make_ticket_channel(guild, [
+        {"id": str(GUILD_ID), "type": 0, "allow": "0", "deny": VIEW},
+        {"id": str(STAFF_ROLE_ID), "type": 0, "allow": VIEW, "deny": "0"},
+    ])
+    assert bot.legacy_ticket_owner(channel) is None
+
+
+def test_failed_archive_removes_partial_file(monkeypatch):
+    # el historial falla a mitad de lectura, como un Forbidden o un error HTTP de Discord
+    async def broken_iter(channel):
+        yield {"type": "message", "id": 1, "content": "hola"}
+        raise OSError("historial no disponible")
+
+    monkeypatch.setattr(bot, "iter_transcript", broken_iter)
+    channel = make_ticket_channel(make_guild(), [])
+    with pytest.raises(OSError):
+        asyncio.run(bot.archive_ticket(channel, None, discord.Object(id=OWNER_ID)))
+    folder = os.path.join(bot.TRANSCRIPTS_DIR, str(GUILD_ID))
+    assert os.listdir(folder) == []
+
+
+def test_registry_tracks_open_tickets_only(tmp_path):
+    registry = bot.TicketRegistry(str(tmp_path / "tickets.json"))
+    bot.PERSISTED_FILES.remove(registry.store)
+    channel = make_ticket_channel(make_guild(), [])
+    record = registry.open(channel, OWNER_ID, "ticket-ayuda-general")
+    assert "status" not in record
+    assert registry.get(channel.id) is record
+    assert registry.open_count(GUILD_ID, OWNER_ID) == 1
+    assert registry.next_number(GUILD_ID) == 1 and registry.next_number(GUILD_ID) == 2
+    assert registry.close(channel.id) is record
+    assert registry.get(channel.id) is None and registry.open_count(GUILD_ID, OWNER_ID) == 0